@@ -1,8 +1,11 @@
+import click
 from flask import Flask
-from .models import db
+from .models import db, actualizar_esquema
+from . import autocompletado, busqueda_difusa, busqueda_texto, cache, concurrencia, cuota, enriquecimiento, indice_espacial, ranking, replica, services, siembra
 from .routes import (
     obtener_barberias, crear_barberia, obtener_barberia, 
-    calificar_barberia, buscar_barberias, buscar_barberias_cercanas,
+    calificar_barberia, obtener_estadisticas_barberia, buscar_barberias, buscar_barberias_cercanas,
+    buscar_barberias_cercanas_google, autocompletar_barberias,
     usuarios_bp
 )
 import sys
@@ -22,18 +25,36 @@ def create_app(config_name='default'):
     
     # Inicializar extensiones
     db.init_app(app)
+    cache.init_app(app)
+    concurrencia.init_app(app)
+    cuota.init_app(app)
+    replica.init_app(app)
+    enriquecimiento.init_app(app)
+    services.init_app(app)
+    autocompletado.init_app(app)
+    ranking.init_app(app)
     
     # Registrar rutas de barberías
     app.add_url_rule('/api/barberias', 'obtener_barberias', obtener_barberias, methods=['GET'])
     app.add_url_rule('/api/barberias', 'crear_barberia', crear_barberia, methods=['POST'])
     app.add_url_rule('/api/barberias/<int:barberia_id>', 'obtener_barberia', obtener_barberia, methods=['GET'])
+    app.add_url_rule('/api/barberias/<int:barberia_id>/estadisticas', 'obtener_estadisticas_barberia', obtener_estadisticas_barberia, methods=['GET'])
     app.add_url_rule('/api/barberias/<int:barberia_id>/calificar', 'calificar_barberia', calificar_barberia, methods=['POST'])
     app.add_url_rule('/api/barberias/buscar', 'buscar_barberias', buscar_barberias, methods=['GET'])
+    app.add_url_rule('/api/barberias/autocompletar', 'autocompletar_barberias', autocompletar_barberias, methods=['GET'])
     app.add_url_rule('/api/barberias/cercanas', 'buscar_barberias_cercanas', buscar_barberias_cercanas, methods=['GET'])
+    app.add_url_rule('/api/barberias/cercanas/google', 'buscar_barberias_cercanas_google', buscar_barberias_cercanas_google, methods=['GET'])
     
     # Registrar blueprint de usuarios
     app.register_blueprint(usuarios_bp)
     
+    # Precargar el índice espacial de barberías locales
+    indice_espacial.init_app(app)
+    
+    # Índice de texto (FTS5) para la búsqueda por nombre y dirección
+    busqueda_texto.init_app(app)
+    busqueda_difusa.init_app(app)
+    
     return app
 
 # Crear instancia de la aplicación
@@ -42,7 +63,7 @@ app = create_app()
 def init_db() -> None:
     """Inicializa la base de datos"""
     with app.app_context():
-        db.create_all()
+        actualizar_esquema()
         print("✓ Base de datos inicializada")
 
 @app.cli.command("crear-db")
@@ -50,6 +71,47 @@ def crear_tablas_comando() -> None:
     """Comando CLI para crear las tablas de la base de datos"""
     init_db()
 
+@app.cli.command("sembrar-ciudad")
+@click.option('--lat-min', type=float, required=True, help='Latitud sur del rectángulo')
+@click.option('--lat-max', type=float, required=True, help='Latitud norte del rectángulo')
+@click.option('--lng-min', type=float, required=True, help='Longitud oeste del rectángulo')
+@click.option('--lng-max', type=float, required=True, help='Longitud este del rectángulo')
+@click.option('--radio', type=int, default=5000, show_default=True, help='Radio de cada búsqueda de siembra (metros)')
+@click.option('--por-segundo', type=float, default=1.0, show_default=True, help='Búsquedas de siembra por segundo como máximo')
+@click.option('--max-llamadas', type=int, default=None, help='Presupuesto de llamadas a Google para esta corrida')
+def sembrar_ciudad_comando(lat_min: float, lat_max: float, lng_min: float, lng_max: float,
+                           radio: int, por_segundo: float, max_llamadas: int | None) -> None:
+    """Precarga en la réplica local los resultados de Google Places de una ciudad (reanudable)"""
+    if not services.GOOGLE_API_KEY:
+        print("API Key de Google no configurada. No se puede sembrar.")
+        return
+    init_db()
+    with app.app_context():
+        siembra.sembrar_ciudad(
+            lat_min, lat_max, lng_min, lng_max,
+            radio=radio,
+            por_segundo=por_segundo,
+            max_llamadas=max_llamadas,
+            costo_por_llamada=app.config.get('GOOGLE_COSTO_POR_LLAMADA', 0.032)
+        )
+
+@app.cli.command("cuota-estado")
+def cuota_estado_comando() -> None:
+    """Muestra el consumo de Google de hoy por tipo de llamada y su costo estimado"""
+    estado = cuota.estadisticas()
+    if not estado.get('activo', True) or 'error' in estado:
+        print(f"Gobernador de cuota no disponible: {estado.get('error', 'desactivado (CUOTA_ACTIVA=false)')}")
+        return
+    costo_por_llamada = app.config.get('GOOGLE_COSTO_POR_LLAMADA', 0.032)
+    tope = f"de {estado['diaria']}" if estado['diaria'] else '(sin tope diario)'
+    print(f"Cuota de Google del {estado['dia']} (UTC): {estado['usadas']} llamadas {tope}, "
+          f"costo estimado ${estado['usadas'] * costo_por_llamada:.2f}")
+    print(f"Tasa: {estado['por_segundo']}/s, ráfaga {estado['rafaga']}, fichas disponibles {estado['fichas']}")
+    for endpoint, uso in estado['endpoints'].items():
+        print(f"  {endpoint:<10} usadas {uso['usadas']:>6}  limitadas {uso['limitadas']:>6}  agotadas {uso['agotadas']:>6}")
+    circuito = services.circuito_places.estadisticas()
+    print(f"Circuito de Places en este proceso: {circuito['estado']}")
+
 if __name__ == '__main__':
     init_db()
     app.run(host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
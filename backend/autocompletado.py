@@ -0,0 +1,378 @@
+"""
+Autocompletado del buscador de barberías, servido desde memoria.
+
+Los nombres normalizados (busqueda_difusa.normalizar) se guardan en un trie
+compacto (radix: cada arista lleva un fragmento de texto, no una letra). Se
+indexa el nombre completo y también a partir de cada palabra, así "guero"
+sugiere "Barbería El Güero". Cada nodo guarda las mejores barberías de su
+subárbol según su calificación, de modo que una sugerencia cuesta recorrer el
+prefijo y ordenar unas pocas candidatas por calificación y cercanía, sin tocar
+la base de datos ni Google.
+
+Además del trie global hay uno por región geográfica (celdas de 0.01° y de
+0.05°). Con ubicación, las candidatas son las mejores del trie global más las
+mejores de las regiones alrededor del usuario, así una barbería cercana con
+menos calificación también compite aunque no esté entre las mejores de la ciudad.
+
+El trie es una foto por proceso que se reconstruye en segundo plano cada
+`reconstruir` segundos; una barbería nueva tarda a lo sumo eso en sugerirse.
+También se sugieren las consultas frecuentes del buscador.
+"""
+
+import math
+import threading
+import time
+from collections import Counter
+from typing import Any, Iterable
+
+import numpy as np
+from sqlalchemy.exc import SQLAlchemyError
+
+from .busqueda_difusa import palabras
+from .models import db, Barberia
+from .ranking import calificacion_ponderada
+from .services import calcular_distancias
+
+# Configuración por defecto; se sobreescribe desde config.py en init_app
+_config: dict[str, Any] = {
+    'candidatos': 32,            # mejores barberías guardadas por nodo
+    'reconstruir': 300,          # segundos de vida de la foto del trie
+    'peso_proximidad': 0.5,      # 0 = solo calificación, 1 = solo cercanía
+}
+
+LONGITUD_MAXIMA_CLAVE = 40
+ESCALA_CERCANIA_KM = 2.0  # a esta distancia la cercanía vale la mitad
+
+# Tamaños (grados) de las regiones con trie propio; se consulta la del usuario y sus 8 vecinas
+REGIONES_GRADOS = (0.01, 0.05)
+
+# Segundos entre reconstrucciones del trie de consultas frecuentes
+REFRESCO_CONSULTAS = 10.0
+
+
+# ==================== TRIE ====================
+
+class _Nodo:
+    __slots__ = ('hijos', 'mejores')
+
+    def __init__(self) -> None:
+        # primera letra de la arista -> (fragmento, nodo hijo)
+        self.hijos: dict[str, tuple[str, '_Nodo']] = {}
+        # ids de las mejores barberías del subárbol, de mayor a menor puntaje
+        self.mejores: list[int] = []
+
+
+class TrieSugerencias:
+    """
+    Trie radix de claves de texto -> ids (de barberías o de consultas
+    frecuentes). Las claves deben insertarse en orden
+    decreciente de puntaje: así cada nodo conserva las primeras `capacidad` sin
+    tener que reordenar.
+    """
+
+    def __init__(self, capacidad: int = 32):
+        self.capacidad = capacidad
+        self._raiz = _Nodo()
+        self.claves = 0
+
+    def _agregar(self, nodo: _Nodo, barberia_id: int) -> None:
+        # Las claves de una barbería se insertan seguidas: basta revisar la última
+        if len(nodo.mejores) < self.capacidad and (not nodo.mejores or nodo.mejores[-1] != barberia_id):
+            nodo.mejores.append(barberia_id)
+
+    def insertar(self, clave: str, barberia_id: int) -> None:
+        self.claves += 1
+        nodo = self._raiz
+        self._agregar(nodo, barberia_id)
+        resto = clave
+        while resto:
+            par = nodo.hijos.get(resto[0])
+            if par is None:
+                hoja = _Nodo()
+                self._agregar(hoja, barberia_id)
+                nodo.hijos[resto[0]] = (resto, hoja)
+                return
+            fragmento, hijo = par
+            comun = 1
+            tope = min(len(fragmento), len(resto))
+            while comun < tope and fragmento[comun] == resto[comun]:
+                comun += 1
+            if comun < len(fragmento):
+                # La clave se separa a mitad de la arista: se parte en dos
+                intermedio = _Nodo()
+                intermedio.mejores = list(hijo.mejores)
+                intermedio.hijos[fragmento[comun]] = (fragmento[comun:], hijo)
+                nodo.hijos[resto[0]] = (fragmento[:comun], intermedio)
+                hijo = intermedio
+            self._agregar(hijo, barberia_id)
+            nodo = hijo
+            resto = resto[comun:]
+
+    def buscar(self, prefijo: str) -> list[int]:
+        """Mejores ids cuyas claves empiezan con el prefijo"""
+        nodo = self._raiz
+        resto = prefijo
+        while resto:
+            par = nodo.hijos.get(resto[0])
+            if par is None:
+                return []
+            fragmento, hijo = par
+            if resto.startswith(fragmento):
+                resto = resto[len(fragmento):]
+                nodo = hijo
+            elif fragmento.startswith(resto):
+                return hijo.mejores
+            else:
+                return []
+        return nodo.mejores
+
+
+def claves_de_nombre(nombre: str | None) -> list[str]:
+    """El nombre normalizado desde cada una de sus palabras: 'el guero', 'guero'..."""
+    partes = palabras(nombre)
+    return [' '.join(partes[i:])[:LONGITUD_MAXIMA_CLAVE] for i in range(len(partes))]
+
+
+class IndiceAutocompletado:
+    """Foto inmutable del trie y de los datos que se devuelven en cada sugerencia"""
+
+    def __init__(self, filas: Iterable[Any], capacidad: int):
+        registros = []
+        promedios = []
+        totales = []
+        for fila in filas:
+            if fila.google_place_id:
+                promedio, total = fila.calificacion_google, fila.total_calificaciones_google
+                id_publico, fuente = f'gm_{fila.google_place_id}', 'google'
+            else:
+                promedio, total = fila.calificacion_promedio, fila.total_calificaciones
+                id_publico, fuente = fila.id, 'local'
+            registros.append({
+                'id': id_publico,
+                'nombre': fila.nombre,
+                'direccion': fila.direccion,
+                'latitud': fila.latitud,
+                'longitud': fila.longitud,
+                'calificacion_promedio': round(promedio or 0.0, 1),
+                'total_calificaciones': total or 0,
+                'fuente': fuente,
+            })
+            promedios.append(promedio)
+            totales.append(total)
+        puntajes = calificacion_ponderada(np.array(promedios, dtype=float), np.array(totales, dtype=float))
+        for registro, puntaje in zip(registros, puntajes.tolist()):
+            registro['_puntaje'] = puntaje
+        registros.sort(key=lambda r: r['_puntaje'], reverse=True)
+
+        self.trie = TrieSugerencias(capacidad)
+        self.regiones: dict[tuple[float, int, int], TrieSugerencias] = {}
+        for posicion, registro in enumerate(registros):
+            claves = claves_de_nombre(registro['nombre'])
+            tries = [self.trie]
+            if registro['latitud'] is not None and registro['longitud'] is not None:
+                tries += [
+                    self.regiones.setdefault(region, TrieSugerencias(capacidad))
+                    for region in _regiones(registro['latitud'], registro['longitud'])
+                ]
+            for trie in tries:
+                for clave in claves:
+                    trie.insertar(clave, posicion)
+        self.registros = registros
+        self.puntajes = np.array([r['_puntaje'] for r in registros], dtype=float)
+        self.latitudes = np.array([r['latitud'] for r in registros], dtype=float)
+        self.longitudes = np.array([r['longitud'] for r in registros], dtype=float)
+        self.construido_en = time.monotonic()
+
+    def sugerir(self, texto: str, limite: int, lat: float | None = None, lng: float | None = None) -> list[dict[str, Any]]:
+        prefijo = ' '.join(palabras(texto))[:LONGITUD_MAXIMA_CLAVE]
+        if not prefijo:
+            return []
+        # Sin repetir y en orden: primero las mejores de la ciudad, luego las de la zona
+        encontrados = dict.fromkeys(self.trie.buscar(prefijo))
+        if lat is not None and lng is not None:
+            for region in _regiones(lat, lng, vecinas=True):
+                trie = self.regiones.get(region)
+                if trie is not None:
+                    encontrados.update(dict.fromkeys(trie.buscar(prefijo)))
+        candidatos = np.array(list(encontrados), dtype=np.int64)
+        if candidatos.size == 0:
+            return []
+
+        puntajes = self.puntajes[candidatos] / 5.0
+        distancias = None
+        if lat is not None and lng is not None:
+            distancias = calcular_distancias(lat, lng, self.latitudes[candidatos], self.longitudes[candidatos])
+            cercania = np.nan_to_num(1.0 / (1.0 + distancias / ESCALA_CERCANIA_KM), nan=0.0)
+            peso = _config['peso_proximidad']
+            puntajes = (1 - peso) * puntajes + peso * cercania
+
+        orden = np.argsort(-puntajes, kind='stable')[:limite]
+        sugerencias = []
+        for i in orden:
+            registro = self.registros[candidatos[i]]
+            sugerencia = {'tipo': 'barberia', **{k: v for k, v in registro.items() if k != '_puntaje'}}
+            if distancias is not None:
+                distancia = distancias[i]
+                sugerencia['distancia'] = None if math.isnan(distancia) else round(float(distancia), 2)
+            sugerencias.append(sugerencia)
+        return sugerencias
+
+
+def _regiones(lat: float, lng: float, vecinas: bool = False) -> list[tuple[float, int, int]]:
+    """Regiones (tamaño, fila, columna) que contienen el punto y, si se pide, sus vecinas"""
+    alcance = (-1, 0, 1) if vecinas else (0,)
+    regiones = []
+    for grados in REGIONES_GRADOS:
+        fila, columna = math.floor(lat / grados), math.floor(lng / grados)
+        regiones += [(grados, fila + df, columna + dc) for df in alcance for dc in alcance]
+    return regiones
+
+
+# ==================== CONSULTAS FRECUENTES ====================
+
+class ConsultasFrecuentes:
+    """
+    Conteo acotado de las consultas del buscador (se olvidan las menos usadas).
+    Las sugerencias salen de un TrieSugerencias con las consultas ordenadas por
+    veces, reconstruido a lo sumo cada REFRESCO_CONSULTAS segundos.
+    """
+
+    def __init__(self, maximo: int = 5000, capacidad: int = 32):
+        self.maximo = maximo
+        self.capacidad = capacidad
+        self._conteo: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        # (trie, consultas con sus veces): los ids del trie son posiciones en la lista
+        self._foto: tuple[TrieSugerencias, list[tuple[str, int]]] = (TrieSugerencias(capacidad), [])
+        self._foto_en = 0.0
+        self._cambios = False
+
+    def registrar(self, texto: str) -> None:
+        consulta = ' '.join(palabras(texto))
+        if len(consulta) < 3:
+            return
+        with self._lock:
+            self._conteo[consulta] += 1
+            self._cambios = True
+            if len(self._conteo) > self.maximo:
+                # Se conserva la mitad más usada
+                self._conteo = Counter(dict(self._conteo.most_common(self.maximo // 2)))
+
+    def _actualizar_trie(self) -> None:
+        with self._lock:
+            if not self._cambios or time.monotonic() - self._foto_en < REFRESCO_CONSULTAS:
+                return
+            consultas = sorted(self._conteo.items(), key=lambda p: (-p[1], p[0]))
+            self._cambios = False
+            self._foto_en = time.monotonic()
+        trie = TrieSugerencias(self.capacidad)
+        for posicion, (consulta, _) in enumerate(consultas):
+            trie.insertar(consulta[:LONGITUD_MAXIMA_CLAVE], posicion)
+        self._foto = (trie, consultas)
+
+    def sugerir(self, texto: str, limite: int, minimo: int = 2) -> list[dict[str, Any]]:
+        prefijo = ' '.join(palabras(texto))
+        if not prefijo:
+            return []
+        self._actualizar_trie()
+        trie, foto = self._foto
+        sugerencias = []
+        for posicion in trie.buscar(prefijo[:LONGITUD_MAXIMA_CLAVE]):
+            consulta, veces = foto[posicion]
+            if veces < minimo:
+                break
+            if consulta != prefijo and consulta.startswith(prefijo):
+                sugerencias.append({'tipo': 'consulta', 'texto': consulta, 'veces': veces})
+                if len(sugerencias) == limite:
+                    break
+        return sugerencias
+
+
+consultas_frecuentes = ConsultasFrecuentes()
+
+_indice: IndiceAutocompletado | None = None
+_lock_indice = threading.Lock()
+_reconstruyendo = False
+_ultimo_intento = 0.0
+_app: Any = None
+
+# Segundos antes de reintentar la primera construcción si falló (p. ej. sin tablas aún)
+ESPERA_REINTENTO_INDICE = 30.0
+
+
+def construir_indice() -> IndiceAutocompletado:
+    """Lee las barberías y reemplaza la foto del trie. Requiere contexto de aplicación."""
+    global _indice
+    filas = db.session.query(
+        Barberia.id, Barberia.nombre, Barberia.direccion, Barberia.latitud, Barberia.longitud,
+        Barberia.google_place_id, Barberia.calificacion_promedio, Barberia.total_calificaciones,
+        Barberia.calificacion_google, Barberia.total_calificaciones_google
+    ).all()
+    _indice = IndiceAutocompletado(filas, _config['candidatos'])
+    return _indice
+
+
+def _reconstruir_en_segundo_plano() -> None:
+    global _reconstruyendo
+    try:
+        with _app.app_context():
+            try:
+                construir_indice()
+            except SQLAlchemyError as e:
+                print(f"No se pudo reconstruir el autocompletado: {e}")
+            finally:
+                db.session.remove()
+    finally:
+        _reconstruyendo = False
+
+
+def _lanzar_reconstruccion() -> None:
+    """Arma una foto nueva en un hilo, salvo que ya haya uno trabajando"""
+    global _reconstruyendo, _ultimo_intento
+    if _app is None:
+        return
+    with _lock_indice:
+        if _reconstruyendo:
+            return
+        _reconstruyendo = True
+        _ultimo_intento = time.monotonic()
+    threading.Thread(target=_reconstruir_en_segundo_plano, name='autocompletado', daemon=True).start()
+
+
+def obtener_indice() -> IndiceAutocompletado | None:
+    """
+    La foto vigente del trie, o None mientras se construye la primera (se lanza
+    desde init_app). Cuando envejece se sigue usando mientras un hilo arma la nueva.
+    """
+    indice = _indice
+    if indice is None:
+        if time.monotonic() - _ultimo_intento > ESPERA_REINTENTO_INDICE:
+            _lanzar_reconstruccion()
+    elif time.monotonic() - indice.construido_en > _config['reconstruir']:
+        _lanzar_reconstruccion()
+    return indice
+
+
+def sugerir(texto: str, limite: int = 8, lat: float | None = None, lng: float | None = None,
+            max_consultas: int = 3) -> list[dict[str, Any]]:
+    """
+    Barberías (por calificación y cercanía) y después consultas frecuentes que
+    empiezan con el texto. Hasta que exista la primera foto del trie solo se
+    sugieren consultas frecuentes.
+    """
+    indice = obtener_indice()
+    sugerencias = indice.sugerir(texto, limite, lat, lng) if indice is not None else []
+    return sugerencias + consultas_frecuentes.sugerir(texto, max_consultas)
+
+
+def init_app(app: Any) -> None:
+    """Toma la configuración y empieza a construir el trie en segundo plano"""
+    global _app
+    _app = app
+    _config.update({
+        'candidatos': app.config.get('AUTOCOMPLETAR_CANDIDATOS', _config['candidatos']),
+        'reconstruir': app.config.get('AUTOCOMPLETAR_RECONSTRUIR', _config['reconstruir']),
+        'peso_proximidad': app.config.get('AUTOCOMPLETAR_PESO_PROXIMIDAD', _config['peso_proximidad']),
+    })
+    if _indice is None:
+        _lanzar_reconstruccion()
@@ -0,0 +1,379 @@
+"""
+Búsqueda tolerante a errores de escritura ("barveria" encuentra "Barbería").
+
+El nombre y la dirección se normalizan (minúsculas y sin acentos) y se indexan
+por trigramas. Una consulta toma como candidatas solo las barberías que
+comparten trigramas con lo que escribió el usuario, y después cada palabra se
+verifica con distancia de edición (Levenshtein) dentro de un presupuesto que
+crece con la longitud de la palabra.
+
+- En SQLite los trigramas viven en una tabla FTS5 de contenido externo
+  (barberia_trigramas, con el tokenizador trigram) sincronizada con triggers:
+  persiste entre reinicios y la comparten todos los procesos.
+- En otros motores se usa un índice en memoria por proceso, sincronizado con
+  los commits de la sesión igual que la rejilla de indice_espacial.
+"""
+
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Any, Iterable
+
+from flask import current_app
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from .models import db, Barberia
+
+TABLA_TRIGRAMAS = 'barberia_trigramas'
+
+_CLAVE_PENDIENTES = 'busqueda_difusa_pendientes'
+
+# Configuración por defecto; se sobreescribe desde config.py en init_app
+_config: dict[str, Any] = {
+    'max_distancia': 2,   # errores tolerados en palabras largas
+    'candidatos': 200,    # filas que pasan del índice a la verificación
+    'minimo': 5,          # con menos resultados exactos se completa con la búsqueda difusa
+}
+
+def normalizar(texto: str | None) -> str:
+    """Minúsculas y sin acentos ni diéresis ("Peluquería Doña" -> "peluqueria dona")"""
+    descompuesto = unicodedata.normalize('NFD', (texto or '').lower())
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def palabras(texto: str | None) -> list[str]:
+    return re.findall(r'\w+', normalizar(texto))
+
+
+def trigramas(palabra: str) -> set[str]:
+    return {palabra[i:i + 3] for i in range(len(palabra) - 2)}
+
+
+def presupuesto(palabra: str) -> int:
+    """Errores tolerados en una palabra: ninguno en las muy cortas, uno en las medianas"""
+    if len(palabra) < 3:
+        return 0
+    if len(palabra) <= 5:
+        return min(1, _config['max_distancia'])
+    return _config['max_distancia']
+
+
+def distancia_acotada(a: str, b: str, tope: int) -> int:
+    """
+    Distancia de Levenshtein entre a y b, o tope + 1 en cuanto se sabe que la
+    supera (se corta la fila de la matriz cuyo mínimo ya pasó el tope).
+    """
+    if abs(len(a) - len(b)) > tope:
+        return tope + 1
+    anterior = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        actual = [i]
+        for j, cb in enumerate(b, start=1):
+            actual.append(min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (ca != cb)))
+        if min(actual) > tope:
+            return tope + 1
+        anterior = actual
+    return min(anterior[-1], tope + 1)
+
+
+def _distancia_palabra(consulta: str, candidatas: list[str]) -> int:
+    """
+    Menor distancia entre una palabra de la consulta y alguna palabra del texto,
+    comparando también con su prefijo para que funcione mientras se escribe.
+    """
+    tope = presupuesto(consulta)
+    mejor = tope + 1
+    for palabra in candidatas:
+        if palabra.startswith(consulta):
+            return 0
+        mejor = min(mejor, distancia_acotada(consulta, palabra, tope))
+        if len(palabra) > len(consulta):
+            mejor = min(mejor, distancia_acotada(consulta, palabra[:len(consulta)], tope))
+    return mejor
+
+
+def puntuar(consulta: list[str], nombre: str | None, direccion: str | None) -> tuple[int, int] | None:
+    """
+    (errores totales, palabras encontradas solo en la dirección) si todas las
+    palabras de la consulta caben en su presupuesto; None si alguna no.
+    """
+    en_nombre = palabras(nombre)
+    en_direccion = palabras(direccion)
+    errores = 0
+    fuera_del_nombre = 0
+    for palabra in consulta:
+        distancia = _distancia_palabra(palabra, en_nombre)
+        if distancia > presupuesto(palabra):
+            distancia = _distancia_palabra(palabra, en_direccion)
+            fuera_del_nombre += 1
+        if distancia > presupuesto(palabra):
+            return None
+        errores += distancia
+    return errores, fuera_del_nombre
+
+
+# ==================== ÍNDICE EN MEMORIA ====================
+
+class IndiceTrigramas:
+    """Trigrama -> ids de barberías (y los trigramas de cada id, para quitarlos) protegido por un lock"""
+
+    def __init__(self) -> None:
+        self.construido = False
+        self._por_trigrama: dict[str, set[int]] = {}
+        self._trigramas: dict[int, set[str]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._trigramas)
+
+    @staticmethod
+    def _de_texto(nombre: str | None, direccion: str | None) -> set[str]:
+        resultado: set[str] = set()
+        for palabra in palabras(nombre) + palabras(direccion):
+            resultado |= trigramas(palabra)
+        return resultado
+
+    def construir(self, filas: Iterable[tuple[int, str | None, str | None]]) -> None:
+        """Reconstruye el índice completo a partir de filas (id, nombre, direccion)"""
+        por_trigrama: dict[str, set[int]] = {}
+        por_id: dict[int, set[str]] = {}
+        for barberia_id, nombre, direccion in filas:
+            propios = self._de_texto(nombre, direccion)
+            por_id[barberia_id] = propios
+            for trigrama in propios:
+                por_trigrama.setdefault(trigrama, set()).add(barberia_id)
+
+        with self._lock:
+            self._por_trigrama = por_trigrama
+            self._trigramas = por_id
+            self.construido = True
+
+    def actualizar(self, barberia_id: int, nombre: str | None, direccion: str | None) -> None:
+        with self._lock:
+            self._quitar(barberia_id)
+            propios = self._de_texto(nombre, direccion)
+            self._trigramas[barberia_id] = propios
+            for trigrama in propios:
+                self._por_trigrama.setdefault(trigrama, set()).add(barberia_id)
+
+    def eliminar(self, barberia_id: int) -> None:
+        with self._lock:
+            self._quitar(barberia_id)
+
+    def _quitar(self, barberia_id: int) -> None:
+        for trigrama in self._trigramas.pop(barberia_id, ()):
+            ids = self._por_trigrama.get(trigrama)
+            if ids is not None:
+                ids.discard(barberia_id)
+                if not ids:
+                    del self._por_trigrama[trigrama]
+
+    def candidatos(self, buscados: set[str], limite: int) -> list[int]:
+        """Ids que comparten más trigramas con la consulta, de más a menos"""
+        conteo: Counter[int] = Counter()
+        with self._lock:
+            for trigrama in buscados:
+                conteo.update(self._por_trigrama.get(trigrama, ()))
+        return [barberia_id for barberia_id, _ in conteo.most_common(limite)]
+
+
+# Índice compartido por todo el proceso
+indice_trigramas = IndiceTrigramas()
+
+
+def construir_indice() -> None:
+    """Carga nombre y dirección de todas las barberías en el índice"""
+    indice_trigramas.construir(db.session.query(Barberia.id, Barberia.nombre, Barberia.direccion).all())
+
+
+def asegurar_indice() -> IndiceTrigramas:
+    """Construye el índice la primera vez que se necesita"""
+    if not indice_trigramas.construido:
+        construir_indice()
+    return indice_trigramas
+
+
+# ==================== SINCRONIZACIÓN CON LA SESIÓN ====================
+# Igual que la rejilla espacial: los cambios se aplican al confirmar la transacción
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_cambios_barberias(session: Session, flush_context: Any) -> None:
+    if not indice_trigramas.construido:
+        return
+    pendientes = session.info.setdefault(_CLAVE_PENDIENTES, {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Barberia):
+            pendientes[obj.id] = (obj.nombre, obj.direccion)
+    for obj in session.deleted:
+        if isinstance(obj, Barberia):
+            pendientes[obj.id] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def _aplicar_cambios_barberias(session: Session) -> None:
+    pendientes = session.info.pop(_CLAVE_PENDIENTES, None)
+    if not pendientes or not indice_trigramas.construido:
+        return
+    for barberia_id, textos in pendientes.items():
+        if textos is None:
+            indice_trigramas.eliminar(barberia_id)
+        else:
+            indice_trigramas.actualizar(barberia_id, *textos)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_cambios_barberias(session: Session) -> None:
+    session.info.pop(_CLAVE_PENDIENTES, None)
+
+
+# ==================== TRIGRAMAS FTS5 EN SQLITE ====================
+
+_DDL_TRIGRAMAS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_TRIGRAMAS} USING fts5(
+        nombre, direccion,
+        content='barberia', content_rowid='id',
+        tokenize='trigram'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_TRIGRAMAS}_insert AFTER INSERT ON barberia
+        BEGIN
+            INSERT INTO {TABLA_TRIGRAMAS} (rowid, nombre, direccion) VALUES (NEW.id, NEW.nombre, NEW.direccion);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_TRIGRAMAS}_update AFTER UPDATE OF id, nombre, direccion ON barberia
+        BEGIN
+            INSERT INTO {TABLA_TRIGRAMAS} ({TABLA_TRIGRAMAS}, rowid, nombre, direccion) VALUES ('delete', OLD.id, OLD.nombre, OLD.direccion);
+            INSERT INTO {TABLA_TRIGRAMAS} (rowid, nombre, direccion) VALUES (NEW.id, NEW.nombre, NEW.direccion);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_TRIGRAMAS}_delete AFTER DELETE ON barberia
+        BEGIN
+            INSERT INTO {TABLA_TRIGRAMAS} ({TABLA_TRIGRAMAS}, rowid, nombre, direccion) VALUES ('delete', OLD.id, OLD.nombre, OLD.direccion);
+        END""",
+]
+
+# El tokenizador trigram ignora mayúsculas pero no acentos (remove_diacritics
+# llegó en SQLite 3.45): cada trigrama se busca también con sus variantes acentuadas
+_VARIANTES = {'a': 'aá', 'e': 'eé', 'i': 'ií', 'o': 'oó', 'u': 'uúü', 'n': 'nñ'}
+
+
+def variantes(trigrama: str) -> list[str]:
+    """'ria' -> ['ria', 'riá', 'ría', 'ríá']"""
+    resultado = ['']
+    for letra in trigrama:
+        resultado = [previo + opcion for previo in resultado for opcion in _VARIANTES.get(letra, letra)]
+    return resultado
+
+
+_CONSULTA_TRIGRAMAS = text(f"""
+    SELECT rowid FROM {TABLA_TRIGRAMAS}
+    WHERE {TABLA_TRIGRAMAS} MATCH :consulta
+    ORDER BY bm25({TABLA_TRIGRAMAS}, 10.0, 1.0)
+    LIMIT :limite
+""")
+
+
+def _crear_trigramas(conexion: Any) -> None:
+    """Crea la tabla de trigramas y sus triggers; si es nueva, indexa las filas existentes"""
+    existia = conexion.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nombre"),
+        {'nombre': TABLA_TRIGRAMAS}
+    ).first() is not None
+    for sentencia in _DDL_TRIGRAMAS:
+        conexion.execute(text(sentencia))
+    if not existia:
+        conexion.execute(text(f"INSERT INTO {TABLA_TRIGRAMAS} ({TABLA_TRIGRAMAS}) VALUES ('rebuild')"))
+
+
+@event.listens_for(Barberia.__table__, 'after_create')
+def _crear_trigramas_con_tabla(tabla: Any, conexion: Any, **kw: Any) -> None:
+    if conexion.dialect.name == 'sqlite':
+        _crear_trigramas(conexion)
+
+
+def asegurar_trigramas() -> None:
+    """Crea la tabla de trigramas si la tabla barberia ya existe; si no, la creará el evento after_create"""
+    with db.engine.begin() as conexion:
+        tabla_existe = conexion.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'barberia'")
+        ).first() is not None
+        if tabla_existe:
+            _crear_trigramas(conexion)
+
+
+# ==================== BÚSQUEDA ====================
+
+def _candidatos(consulta: list[str]) -> list[int]:
+    buscados: set[str] = set()
+    for palabra in consulta:
+        buscados |= trigramas(palabra)
+    if not buscados:
+        return []
+    if current_app.extensions.get('busqueda_difusa') != 'fts5':
+        return asegurar_indice().candidatos(buscados, _config['candidatos'])
+    # Los trigramas solo tienen letras y números: se pueden poner entre comillas tal cual
+    expresion = ' OR '.join(
+        f'"{variante}"' for trigrama in sorted(buscados) for variante in variantes(trigrama)
+    )
+    filas = db.session.execute(_CONSULTA_TRIGRAMAS, {'consulta': expresion, 'limite': _config['candidatos']})
+    return [fila.rowid for fila in filas]
+
+
+def buscar_difuso(texto: str, limite: int = 50) -> list[Barberia]:
+    """
+    Barberías cuyo nombre o dirección contienen todas las palabras de la consulta
+    salvo unos pocos errores, de menos a más errores (y primero las que coinciden
+    en el nombre). Las palabras de menos de tres letras deben coincidir exactas.
+    """
+    consulta = palabras(texto)
+    ids = _candidatos(consulta)
+    if not ids:
+        return []
+    barberias = Barberia.query.filter(Barberia.id.in_(ids)).all()
+    orden = {barberia_id: posicion for posicion, barberia_id in enumerate(ids)}
+
+    puntuadas = []
+    for barberia in barberias:
+        puntaje = puntuar(consulta, barberia.nombre, barberia.direccion)
+        if puntaje is not None:
+            puntuadas.append((puntaje, orden[barberia.id], barberia))
+    puntuadas.sort(key=lambda p: (p[0], p[1]))
+    return [barberia for _, _, barberia in puntuadas[:limite]]
+
+
+def completar_con_difusa(texto: str, encontradas: list[Barberia], limite: int = 50) -> list[Barberia]:
+    """
+    Si la búsqueda exacta devolvió pocas barberías, agrega después las que
+    coinciden con errores de escritura (sin repetir). Si no, las deja igual.
+    """
+    if len(encontradas) >= _config['minimo']:
+        return encontradas
+    vistas = {barberia.id for barberia in encontradas}
+    extra = [b for b in buscar_difuso(texto, limite) if b.id not in vistas]
+    return (encontradas + extra)[:limite]
+
+
+def init_app(app: Any) -> None:
+    """
+    En SQLite asegura la tabla de trigramas en disco; en otros motores (o si el
+    tokenizador trigram no está disponible) precarga el índice en memoria.
+    """
+    _config.update({
+        'max_distancia': app.config.get('BUSQUEDA_DIFUSA_MAX_DISTANCIA', _config['max_distancia']),
+        'candidatos': app.config.get('BUSQUEDA_DIFUSA_CANDIDATOS', _config['candidatos']),
+        'minimo': app.config.get('BUSQUEDA_DIFUSA_MINIMO', _config['minimo']),
+    })
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            try:
+                asegurar_trigramas()
+                app.extensions['busqueda_difusa'] = 'fts5'
+                return
+            except SQLAlchemyError as e:
+                print(f"Tokenizador trigram no disponible, se usará el índice en memoria: {e}")
+
+        app.extensions['busqueda_difusa'] = 'memoria'
+        try:
+            construir_indice()
+        except SQLAlchemyError:
+            print("Índice de trigramas no precargado; se construirá en la primera búsqueda.")
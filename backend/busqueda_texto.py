@@ -0,0 +1,135 @@
+"""
+Búsqueda de texto en nombre y dirección de las barberías locales.
+
+En SQLite se usa una tabla virtual FTS5 (barberia_fts) de contenido externo
+sobre la tabla barberia, sincronizada con triggers. El tokenizador unicode61
+con remove_diacritics 2 ignora acentos ("peluqueria" encuentra "peluquería") y
+los resultados se ordenan por BM25, con más peso en el nombre. En otros motores
+(o si FTS5 no está disponible) se usa LIKE sobre nombre y dirección.
+"""
+
+import re
+from typing import Any
+
+from flask import current_app
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from .models import db, Barberia
+
+TABLA_FTS = 'barberia_fts'
+
+# Peso de cada columna en BM25 (nombre, direccion)
+PESOS_BM25 = (10.0, 1.0)
+
+_DDL_FTS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5(
+        nombre, direccion,
+        content='barberia', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_insert AFTER INSERT ON barberia
+        BEGIN
+            INSERT INTO {TABLA_FTS} (rowid, nombre, direccion) VALUES (NEW.id, NEW.nombre, NEW.direccion);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_update AFTER UPDATE OF id, nombre, direccion ON barberia
+        BEGIN
+            INSERT INTO {TABLA_FTS} ({TABLA_FTS}, rowid, nombre, direccion) VALUES ('delete', OLD.id, OLD.nombre, OLD.direccion);
+            INSERT INTO {TABLA_FTS} (rowid, nombre, direccion) VALUES (NEW.id, NEW.nombre, NEW.direccion);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_delete AFTER DELETE ON barberia
+        BEGIN
+            INSERT INTO {TABLA_FTS} ({TABLA_FTS}, rowid, nombre, direccion) VALUES ('delete', OLD.id, OLD.nombre, OLD.direccion);
+        END""",
+]
+
+_CONSULTA_FTS = text(f"""
+    SELECT rowid, bm25({TABLA_FTS}, {PESOS_BM25[0]}, {PESOS_BM25[1]}) AS rango FROM {TABLA_FTS}
+    WHERE {TABLA_FTS} MATCH :consulta
+    ORDER BY rango
+    LIMIT :limite
+""")
+
+
+def consulta_fts(texto: str) -> str | None:
+    """
+    Convierte lo que escribe el usuario en una consulta FTS5: cada palabra entre
+    comillas (sin operadores ni sintaxis de FTS) y como prefijo, para buscar
+    mientras se escribe. Devuelve None si no queda ninguna palabra.
+    """
+    palabras = re.findall(r'\w+', texto.lower())
+    if not palabras:
+        return None
+    return ' '.join(f'"{palabra}"*' for palabra in palabras)
+
+
+# ==================== FTS5 EN SQLITE ====================
+
+def _crear_fts(conexion: Any) -> None:
+    """Crea la tabla FTS5 y sus triggers; si es nueva, indexa las filas existentes"""
+    existia = conexion.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nombre"),
+        {'nombre': TABLA_FTS}
+    ).first() is not None
+    for sentencia in _DDL_FTS:
+        conexion.execute(text(sentencia))
+    if not existia:
+        conexion.execute(text(f"INSERT INTO {TABLA_FTS} ({TABLA_FTS}) VALUES ('rebuild')"))
+
+
+@event.listens_for(Barberia.__table__, 'after_create')
+def _crear_fts_con_tabla(tabla: Any, conexion: Any, **kw: Any) -> None:
+    if conexion.dialect.name == 'sqlite':
+        _crear_fts(conexion)
+
+
+def asegurar_fts() -> None:
+    """Crea la tabla FTS5 si la tabla barberia ya existe; si no, la creará el evento after_create"""
+    with db.engine.begin() as conexion:
+        tabla_existe = conexion.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'barberia'")
+        ).first() is not None
+        if tabla_existe:
+            _crear_fts(conexion)
+
+
+def buscar_por_texto(texto: str, limite: int = 50) -> tuple[list[Barberia], list[float] | None]:
+    """
+    Barberías cuyo nombre o dirección coinciden con el texto, de la más a la menos
+    relevante (BM25 con FTS5; con LIKE, en el orden de la tabla), y el valor de
+    bm25() de cada una (negativo: más bajo, más relevante; None con LIKE).
+    """
+    if current_app.extensions.get('busqueda_texto') != 'fts5':
+        patron = f'%{texto.lower()}%'
+        return Barberia.query.filter(
+            db.or_(
+                db.func.lower(Barberia.nombre).ilike(patron),
+                db.func.lower(Barberia.direccion).ilike(patron)
+            )
+        ).limit(limite).all(), None
+
+    consulta = consulta_fts(texto)
+    if consulta is None:
+        return [], []
+    rangos = {
+        fila.rowid: fila.rango
+        for fila in db.session.execute(_CONSULTA_FTS, {'consulta': consulta, 'limite': limite})
+    }
+    if not rangos:
+        return [], []
+    por_id = {b.id: b for b in Barberia.query.filter(Barberia.id.in_(list(rangos))).all()}
+    ids = [i for i in rangos if i in por_id]
+    return [por_id[i] for i in ids], [rangos[i] for i in ids]
+
+
+def init_app(app: Any) -> None:
+    """En SQLite asegura la tabla FTS5; si no se puede, la búsqueda usa LIKE"""
+    app.extensions['busqueda_texto'] = 'like'
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            return
+        try:
+            asegurar_fts()
+            app.extensions['busqueda_texto'] = 'fts5'
+        except SQLAlchemyError as e:
+            print(f"FTS5 no disponible, la búsqueda de texto usará LIKE: {e}")
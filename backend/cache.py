@@ -0,0 +1,428 @@
+"""
+Caché de la aplicación con backends intercambiables.
+
+- CacheTTL: en memoria del proceso, LRU con expiración por entrada.
+- CacheSQLite: archivo SQLite compartido por todos los procesos del equipo.
+- CacheRedis: cualquier servidor que hable el protocolo de Redis (RESP).
+
+El código de la aplicación usa objetos Cache, que agregan un prefijo, un TTL
+por defecto y contadores de aciertos/fallos sobre el backend configurado con
+configurar_backend(). Los valores deben ser serializables a JSON.
+"""
+
+import json
+import math
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+from urllib.parse import urlparse
+
+# Tamaño de la celda geográfica (~1.1 km de latitud)
+CELDA_GRADOS = 0.01
+
+# Radios (metros) a los que se redondea hacia arriba el radio solicitado
+CUBETAS_RADIO = (1000, 2000, 5000, 10000, 25000, 50000)
+
+
+def cuantizar_ubicacion(lat: float, lng: float, radio: int, celda: float = CELDA_GRADOS) -> tuple[float, float, int]:
+    """
+    Ajusta la ubicación al centro de su celda y el radio a la cubeta inmediata superior.
+    Devuelve (lat_centro, lng_centro, radio_cubeta).
+    """
+    fila = math.floor(lat / celda)
+    columna = math.floor(lng / celda)
+    radio_cubeta = next((r for r in CUBETAS_RADIO if r >= radio), CUBETAS_RADIO[-1])
+    return (
+        round((fila + 0.5) * celda, 6),
+        round((columna + 0.5) * celda, 6),
+        radio_cubeta
+    )
+
+
+# ==================== BACKENDS ====================
+
+class CacheTTL:
+    """Caché LRU con TTL por entrada en memoria del proceso, segura para hilos"""
+
+    def __init__(self, max_entradas: int = 512, ttl: float = 300):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self._datos: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configurar(self, max_entradas: int | None = None, ttl: float | None = None) -> None:
+        with self._lock:
+            if max_entradas is not None:
+                self.max_entradas = max_entradas
+            if ttl is not None:
+                self.ttl = ttl
+            self._recortar()
+
+    def obtener(self, clave: str) -> Any | None:
+        """Devuelve el valor vigente o None si no existe o ya expiró"""
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            expira, valor = entrada
+            if expira <= time.monotonic():
+                del self._datos[clave]
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+
+    def guardar(self, clave: str, valor: Any, ttl: float | None = None) -> None:
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + (self.ttl if ttl is None else ttl), valor)
+            self._datos.move_to_end(clave)
+            self._recortar()
+
+    def eliminar(self, clave: str) -> None:
+        with self._lock:
+            self._datos.pop(clave, None)
+
+    def limpiar(self, prefijo: str = '') -> None:
+        with self._lock:
+            for clave in [c for c in self._datos if c.startswith(prefijo)]:
+                del self._datos[clave]
+
+    def _recortar(self) -> None:
+        while len(self._datos) > self.max_entradas:
+            self._datos.popitem(last=False)
+            self.desalojos += 1
+
+    def estadisticas(self) -> dict[str, Any]:
+        """Contadores de uso de la caché"""
+        with self._lock:
+            total = self.aciertos + self.fallos
+            return {
+                'backend': 'memoria',
+                'entradas': len(self._datos),
+                'max_entradas': self.max_entradas,
+                'ttl': self.ttl,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'desalojos': self.desalojos,
+                'tasa_aciertos': round(self.aciertos / total, 3) if total else 0.0
+            }
+
+
+class CacheSQLite:
+    """
+    Caché en un archivo SQLite compartido entre procesos. Usa WAL para que las
+    lecturas no bloqueen y desaloja por último acceso cuando supera el límite.
+    """
+
+    def __init__(self, ruta: str, max_entradas: int = 10000, ttl: float = 300):
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._local = threading.local()
+        self._escrituras = 0
+        self._conexion().execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " clave TEXT PRIMARY KEY, valor TEXT NOT NULL,"
+            " expira REAL NOT NULL, accedido REAL NOT NULL)"
+        )
+        self._conexion().execute("CREATE INDEX IF NOT EXISTS cache_accedido ON cache (accedido)")
+
+    def _conexion(self) -> sqlite3.Connection:
+        # sqlite3 no comparte conexiones entre hilos: una por hilo
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+        return conexion
+
+    def obtener(self, clave: str) -> Any | None:
+        ahora = time.time()
+        try:
+            fila = self._conexion().execute(
+                "SELECT valor FROM cache WHERE clave = ? AND expira > ?", (clave, ahora)
+            ).fetchone()
+            if fila is None:
+                return None
+            self._conexion().execute("UPDATE cache SET accedido = ? WHERE clave = ?", (ahora, clave))
+        except sqlite3.Error as e:
+            print(f"Caché SQLite no disponible: {e}")
+            return None
+        return json.loads(fila[0])
+
+    def guardar(self, clave: str, valor: Any, ttl: float | None = None) -> None:
+        ahora = time.time()
+        try:
+            self._conexion().execute(
+                "INSERT OR REPLACE INTO cache (clave, valor, expira, accedido) VALUES (?, ?, ?, ?)",
+                (clave, json.dumps(valor), ahora + (self.ttl if ttl is None else ttl), ahora)
+            )
+            # Recortar de vez en cuando en lugar de en cada escritura
+            self._escrituras += 1
+            if self._escrituras % 100 == 0:
+                self._recortar()
+        except sqlite3.Error as e:
+            print(f"Caché SQLite no disponible: {e}")
+
+    def eliminar(self, clave: str) -> None:
+        try:
+            self._conexion().execute("DELETE FROM cache WHERE clave = ?", (clave,))
+        except sqlite3.Error as e:
+            print(f"Caché SQLite no disponible: {e}")
+
+    def limpiar(self, prefijo: str = '') -> None:
+        try:
+            self._conexion().execute(
+                "DELETE FROM cache WHERE substr(clave, 1, ?) = ?", (len(prefijo), prefijo)
+            )
+        except sqlite3.Error as e:
+            print(f"Caché SQLite no disponible: {e}")
+
+    def _recortar(self) -> None:
+        conexion = self._conexion()
+        conexion.execute("DELETE FROM cache WHERE expira <= ?", (time.time(),))
+        conexion.execute(
+            "DELETE FROM cache WHERE clave IN ("
+            " SELECT clave FROM cache ORDER BY accedido DESC LIMIT -1 OFFSET ?)",
+            (self.max_entradas,)
+        )
+
+    def estadisticas(self) -> dict[str, Any]:
+        try:
+            entradas = self._conexion().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Caché SQLite no disponible: {e}")
+            entradas = None
+        return {
+            'backend': 'sqlite',
+            'ruta': self.ruta,
+            'entradas': entradas,
+            'max_entradas': self.max_entradas,
+            'ttl': self.ttl
+        }
+
+
+class ErrorRESP(Exception):
+    """Respuesta de error enviada por el servidor RESP"""
+
+
+class ClienteRESP:
+    """Cliente mínimo del protocolo de Redis sobre una única conexión con lock"""
+
+    def __init__(self, host: str = 'localhost', puerto: int = 6379, db: int = 0,
+                 password: str | None = None, timeout: float = 1.0):
+        self.host = host
+        self.puerto = puerto
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._socket: socket.socket | None = None
+        self._lector: Any = None
+        self._lock = threading.Lock()
+
+    def _conectar(self) -> None:
+        self._socket = socket.create_connection((self.host, self.puerto), timeout=self.timeout)
+        self._lector = self._socket.makefile('rb')
+        if self.password:
+            self._enviar('AUTH', self.password)
+        if self.db:
+            self._enviar('SELECT', self.db)
+
+    def _cerrar(self) -> None:
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+        self._socket = None
+        self._lector = None
+
+    def _enviar(self, *argumentos: Any) -> Any:
+        partes = [f'*{len(argumentos)}\r\n'.encode()]
+        for argumento in argumentos:
+            datos = argumento if isinstance(argumento, bytes) else str(argumento).encode('utf-8')
+            partes.append(b'$%d\r\n%s\r\n' % (len(datos), datos))
+        self._socket.sendall(b''.join(partes))
+        return self._leer_respuesta()
+
+    def _leer_respuesta(self) -> Any:
+        linea = self._lector.readline()
+        if not linea:
+            raise ConnectionError('Conexión cerrada por el servidor RESP')
+        tipo, contenido = linea[:1], linea[1:-2]
+        if tipo == b'+':
+            return contenido.decode('utf-8')
+        if tipo == b'-':
+            raise ErrorRESP(contenido.decode('utf-8'))
+        if tipo == b':':
+            return int(contenido)
+        if tipo == b'$':
+            longitud = int(contenido)
+            if longitud < 0:
+                return None
+            datos = self._lector.read(longitud + 2)
+            return datos[:-2]
+        if tipo == b'*':
+            cantidad = int(contenido)
+            if cantidad < 0:
+                return None
+            return [self._leer_respuesta() for _ in range(cantidad)]
+        raise ErrorRESP(f'Respuesta RESP desconocida: {linea!r}')
+
+    def comando(self, *argumentos: Any) -> Any:
+        """Ejecuta un comando; reintenta una vez reconectando si la conexión se perdió"""
+        with self._lock:
+            for intento in range(2):
+                try:
+                    if self._socket is None:
+                        self._conectar()
+                    return self._enviar(*argumentos)
+                except (OSError, ConnectionError):
+                    self._cerrar()
+                    if intento:
+                        raise
+
+
+class CacheRedis:
+    """Caché sobre un servidor Redis (o compatible). Si no responde, se comporta como fallo"""
+
+    def __init__(self, url: str = 'redis://localhost:6379/0', ttl: float = 300, timeout: float = 1.0):
+        partes = urlparse(url)
+        self.ttl = ttl
+        self.url = url
+        self.cliente = ClienteRESP(
+            host=partes.hostname or 'localhost',
+            puerto=partes.port or 6379,
+            db=int(partes.path.lstrip('/') or 0),
+            password=partes.password,
+            timeout=timeout
+        )
+
+    def obtener(self, clave: str) -> Any | None:
+        try:
+            valor = self.cliente.comando('GET', clave)
+        except (OSError, ErrorRESP) as e:
+            print(f"Caché Redis no disponible: {e}")
+            return None
+        return None if valor is None else json.loads(valor)
+
+    def guardar(self, clave: str, valor: Any, ttl: float | None = None) -> None:
+        milisegundos = max(int((self.ttl if ttl is None else ttl) * 1000), 1)
+        try:
+            self.cliente.comando('SET', clave, json.dumps(valor), 'PX', milisegundos)
+        except (OSError, ErrorRESP) as e:
+            print(f"Caché Redis no disponible: {e}")
+
+    def eliminar(self, clave: str) -> None:
+        try:
+            self.cliente.comando('DEL', clave)
+        except (OSError, ErrorRESP) as e:
+            print(f"Caché Redis no disponible: {e}")
+
+    def limpiar(self, prefijo: str = '') -> None:
+        try:
+            cursor = '0'
+            while True:
+                cursor, claves = self.cliente.comando('SCAN', cursor, 'MATCH', f'{prefijo}*', 'COUNT', 500)
+                cursor = cursor.decode() if isinstance(cursor, bytes) else str(cursor)
+                if claves:
+                    self.cliente.comando('DEL', *claves)
+                if cursor == '0':
+                    break
+        except (OSError, ErrorRESP) as e:
+            print(f"Caché Redis no disponible: {e}")
+
+    def estadisticas(self) -> dict[str, Any]:
+        return {'backend': 'redis', 'url': self.url, 'ttl': self.ttl}
+
+
+def crear_backend(tipo: str, url: str | None = None, max_entradas: int = 512, ttl: float = 300) -> Any:
+    """Construye el backend indicado: 'memoria', 'sqlite' (url = ruta del archivo) o 'redis'"""
+    if tipo == 'memoria':
+        return CacheTTL(max_entradas=max_entradas, ttl=ttl)
+    if tipo == 'sqlite':
+        if not url:
+            raise ValueError('CACHE_URL debe indicar la ruta del archivo SQLite')
+        return CacheSQLite(url, max_entradas=max_entradas, ttl=ttl)
+    if tipo == 'redis':
+        return CacheRedis(url or 'redis://localhost:6379/0', ttl=ttl)
+    raise ValueError(f'Backend de caché desconocido: {tipo}')
+
+
+# ==================== CACHÉS CON NOMBRE ====================
+
+_backend: Any = CacheTTL()
+
+
+def configurar_backend(backend: Any) -> None:
+    """Reemplaza el backend usado por todas las cachés con nombre"""
+    global _backend
+    _backend = backend
+
+
+def init_app(app: Any) -> None:
+    """Crea el backend a partir de CACHE_BACKEND / CACHE_URL de la configuración"""
+    tipo = app.config.get('CACHE_BACKEND', 'memoria')
+    url = app.config.get('CACHE_URL')
+    if tipo == 'sqlite' and not url:
+        os.makedirs(app.instance_path, exist_ok=True)
+        url = os.path.join(app.instance_path, 'cache.db')
+    configurar_backend(crear_backend(
+        tipo,
+        url=url,
+        max_entradas=app.config.get('CACHE_MAX_ENTRADAS', 512),
+        ttl=app.config.get('CACHE_TIMEOUT', 300)
+    ))
+
+
+class Cache:
+    """Espacio de nombres sobre el backend configurado, con TTL propio y contadores"""
+
+    def __init__(self, prefijo: str, ttl: float = 300):
+        self.prefijo = prefijo
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+
+    def _clave(self, clave: str) -> str:
+        return f'{self.prefijo}:{clave}'
+
+    def obtener(self, clave: str) -> Any | None:
+        valor = _backend.obtener(self._clave(clave))
+        with self._lock:
+            if valor is None:
+                self.fallos += 1
+            else:
+                self.aciertos += 1
+        return valor
+
+    def guardar(self, clave: str, valor: Any, ttl: float | None = None) -> None:
+        _backend.guardar(self._clave(clave), valor, self.ttl if ttl is None else ttl)
+
+    def eliminar(self, clave: str) -> None:
+        _backend.eliminar(self._clave(clave))
+
+    def limpiar(self) -> None:
+        _backend.limpiar(f'{self.prefijo}:')
+
+    def estadisticas(self) -> dict[str, Any]:
+        total = self.aciertos + self.fallos
+        return {
+            'prefijo': self.prefijo,
+            'ttl': self.ttl,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'tasa_aciertos': round(self.aciertos / total, 3) if total else 0.0,
+            'backend': _backend.estadisticas()
+        }
@@ -0,0 +1,82 @@
+"""
+Planificador de cobertura para búsquedas de radio grande.
+
+Places Nearby devuelve como máximo 20 resultados por llamada y prioriza los más
+"prominentes", así que un solo círculo enorme pierde muchos lugares. Aquí el
+círculo de búsqueda se cubre con subcírculos más pequeños dispuestos en una
+malla hexagonal, ordenados del centro hacia afuera.
+"""
+
+import math
+
+from .indice_espacial import KM_POR_GRADO_LATITUD
+
+RADIO_MAXIMO_NEARBY = 50000  # metros, límite de Places Nearby
+
+
+def planificar_cobertura(lat: float, lng: float, radio: int, radio_subcirculo: int,
+                         max_subcirculos: int) -> tuple[list[tuple[float, float]], int]:
+    """
+    Cubre el círculo (lat, lng, radio) con subcírculos en malla hexagonal.
+    Si harían falta más de max_subcirculos, se agranda el radio de los subcírculos
+    hasta que quepan (sin pasar del máximo de Places Nearby). Lanza ValueError si
+    ni así alcanzan para cubrir el círculo (ver radio_maximo_cubrible).
+    Devuelve (centros ordenados por distancia al centro, radio de los subcírculos).
+    """
+    radio_sub = float(min(max(radio_subcirculo, 1), RADIO_MAXIMO_NEARBY))
+    while True:
+        centros = _malla_hexagonal(radio, radio_sub)
+        if len(centros) <= max_subcirculos or radio_sub >= RADIO_MAXIMO_NEARBY or radio_sub >= radio:
+            break
+        radio_sub = min(radio_sub * 1.25, RADIO_MAXIMO_NEARBY)
+
+    if len(centros) > max_subcirculos:
+        raise ValueError(f'Un radio de {radio} m no se cubre con {max_subcirculos} subcírculos')
+    centros.sort(key=lambda c: c[0] ** 2 + c[1] ** 2)
+
+    # Convertir desplazamientos en metros a coordenadas
+    metros_por_grado_lat = KM_POR_GRADO_LATITUD * 1000
+    metros_por_grado_lng = metros_por_grado_lat * max(math.cos(math.radians(lat)), 1e-6)
+    coordenadas = [
+        (round(lat + dy / metros_por_grado_lat, 6), round(lng + dx / metros_por_grado_lng, 6))
+        for dx, dy in centros
+    ]
+    return coordenadas, int(math.ceil(radio_sub))
+
+
+def radio_maximo_cubrible(max_subcirculos: int) -> int:
+    """Mayor radio (metros, múltiplo de 1 km) que cubren max_subcirculos subcírculos del tamaño máximo"""
+    minimo, maximo = RADIO_MAXIMO_NEARBY // 1000, 20000  # en km
+    while minimo < maximo:
+        medio = (minimo + maximo + 1) // 2
+        if len(_malla_hexagonal(medio * 1000, RADIO_MAXIMO_NEARBY)) <= max_subcirculos:
+            minimo = medio
+        else:
+            maximo = medio - 1
+    return minimo * 1000
+
+
+def _malla_hexagonal(radio: float, radio_sub: float) -> list[tuple[float, float]]:
+    """
+    Centros (dx, dy) en metros de una malla hexagonal de subcírculos de radio
+    radio_sub que cubre por completo un círculo de radio `radio`.
+    """
+    if radio_sub >= radio:
+        return [(0.0, 0.0)]
+
+    separacion_x = math.sqrt(3) * radio_sub
+    separacion_y = 1.5 * radio_sub
+    # Todo punto del círculo queda a <= radio_sub de algún centro a <= radio + radio_sub
+    alcance = radio + radio_sub
+    filas = int(math.ceil(alcance / separacion_y))
+    columnas = int(math.ceil(alcance / separacion_x)) + 1
+
+    centros: list[tuple[float, float]] = []
+    for fila in range(-filas, filas + 1):
+        desfase = separacion_x / 2 if fila % 2 else 0.0
+        dy = fila * separacion_y
+        for columna in range(-columnas, columnas + 1):
+            dx = columna * separacion_x + desfase
+            if math.hypot(dx, dy) < alcance:
+                centros.append((dx, dy))
+    return centros
@@ -0,0 +1,178 @@
+"""
+Ejecución concurrente de llamadas externas (Google Places) sobre un pool de
+hilos acotado, con un plazo máximo por petición, coalescencia de llamadas
+idénticas en curso (single-flight) y limitación de tasa.
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, TypeVar
+
+T = TypeVar('T')
+
+# Configuración por defecto; se sobreescribe desde config.py en init_app
+_config: dict[str, Any] = {
+    'max_hilos': 8,
+    'plazo': 3.0,
+}
+
+_executor: ThreadPoolExecutor | None = None
+_lock_executor = threading.Lock()
+
+
+def init_app(app: Any) -> None:
+    """Toma el tamaño del pool y el plazo por petición de la configuración"""
+    global _executor
+    with _lock_executor:
+        _config['max_hilos'] = app.config.get('GOOGLE_MAX_HILOS', _config['max_hilos'])
+        _config['plazo'] = app.config.get('GOOGLE_PLAZO_SEGUNDOS', _config['plazo'])
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+
+
+def obtener_executor() -> ThreadPoolExecutor:
+    """Pool de hilos compartido por el proceso para llamadas externas"""
+    global _executor
+    if _executor is not None:
+        return _executor
+    with _lock_executor:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_config['max_hilos'],
+                thread_name_prefix='google-places'
+            )
+        return _executor
+
+
+def plazo_por_defecto() -> float:
+    return _config['plazo']
+
+
+def max_hilos() -> int:
+    return _config['max_hilos']
+
+
+def ejecutar_con_plazo(tareas: list[Callable[[], T]], plazo: float | None = None) -> list[T | None]:
+    """
+    Ejecuta las tareas en paralelo y espera como máximo `plazo` segundos.
+    Devuelve los resultados en el mismo orden que las tareas; las que fallan o no
+    terminan a tiempo quedan como None (las pendientes se cancelan si aún no
+    empezaron y, si ya corren, su resultado se ignora).
+    """
+    if not tareas:
+        return []
+
+    executor = obtener_executor()
+    futuros: list[Future[T]] = [executor.submit(tarea) for tarea in tareas]
+    _, pendientes = wait(futuros, timeout=plazo_por_defecto() if plazo is None else plazo)
+    for futuro in pendientes:
+        futuro.cancel()
+
+    resultados: list[T | None] = []
+    for futuro in futuros:
+        if futuro in pendientes:
+            resultados.append(None)
+            continue
+        try:
+            resultados.append(futuro.result())
+        except Exception as e:
+            print(f"Error en tarea concurrente: {e}")
+            resultados.append(None)
+    if pendientes:
+        print(f"Plazo agotado: {len(pendientes)} de {len(futuros)} llamadas externas ignoradas")
+    return resultados
+
+
+class LlamadaUnica:
+    """
+    Coalescencia de llamadas (single-flight): si varios hilos piden la misma clave
+    a la vez, solo el primero ejecuta la función y el resto espera y comparte su
+    resultado (o su excepción).
+    """
+
+    def __init__(self):
+        self.ejecutadas = 0
+        self.coalescidas = 0
+        self._en_curso: dict[str, Future[Any]] = {}
+        self._lock = threading.Lock()
+
+    def ejecutar(self, clave: str, funcion: Callable[[], T]) -> T:
+        with self._lock:
+            futuro = self._en_curso.get(clave)
+            es_lider = futuro is None
+            if es_lider:
+                futuro = Future()
+                self._en_curso[clave] = futuro
+                self.ejecutadas += 1
+            else:
+                self.coalescidas += 1
+
+        if not es_lider:
+            return futuro.result()
+
+        try:
+            resultado = funcion()
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        else:
+            futuro.set_result(resultado)
+            return resultado
+        finally:
+            with self._lock:
+                self._en_curso.pop(clave, None)
+
+    def estadisticas(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                'en_curso': len(self._en_curso),
+                'ejecutadas': self.ejecutadas,
+                'coalescidas': self.coalescidas
+            }
+
+
+class LimitadorTasa:
+    """
+    Cubeta de fichas en memoria: como máximo `por_segundo` llamadas por segundo,
+    con ráfagas de hasta `rafaga` llamadas. esperar() bloquea lo necesario.
+    """
+
+    def __init__(self, por_segundo: float, rafaga: int = 1):
+        self.por_segundo = por_segundo
+        self.rafaga = rafaga
+        self.llamadas = 0
+        self.segundos_esperados = 0.0
+        self._fichas = float(rafaga)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def configurar(self, por_segundo: float | None = None, rafaga: int | None = None) -> None:
+        with self._lock:
+            if por_segundo is not None:
+                self.por_segundo = por_segundo
+            if rafaga is not None:
+                self.rafaga = rafaga
+                self._fichas = min(self._fichas, float(rafaga))
+
+    def esperar(self) -> None:
+        with self._lock:
+            ahora = time.monotonic()
+            self._fichas = min(float(self.rafaga), self._fichas + (ahora - self._ultimo) * self.por_segundo)
+            self._ultimo = ahora
+            # Se reserva la ficha ya; si no alcanza, se duerme hasta que se genere
+            self._fichas -= 1
+            espera = 0.0 if self._fichas >= 0 else -self._fichas / self.por_segundo
+            self.llamadas += 1
+            self.segundos_esperados += espera
+        if espera > 0:
+            time.sleep(espera)
+
+    def estadisticas(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                'por_segundo': self.por_segundo,
+                'llamadas': self.llamadas,
+                'segundos_esperados': round(self.segundos_esperados, 3)
+            }
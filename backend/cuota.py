@@ -0,0 +1,199 @@
+"""
+Gobernador de cuota para las llamadas a Google, compartido por todos los procesos.
+
+Una cubeta de fichas (llamadas por segundo con ráfaga) y un tope diario viven en
+un archivo SQLite; cada llamada reserva su ficha en una transacción inmediata,
+así que varios workers de gunicorn/flask respetan el mismo presupuesto.
+
+Las prioridades reservan capacidad para lo interactivo: las llamadas de menor
+prioridad solo toman fichas si la cubeta está por encima de una reserva y solo
+pueden gastar una fracción del tope diario. El día se cuenta en UTC.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+from .resiliencia import LlamadaRechazada
+
+# Fracción de la ráfaga que una prioridad deja libre para las superiores
+RESERVA_RAFAGA = {'alta': 0.0, 'media': 0.25, 'baja': 0.5}
+# Fracción del tope diario que puede gastar cada prioridad
+FRACCION_DIARIA = {'alta': 1.0, 'media': 0.9, 'baja': 0.7}
+
+
+class CuotaAgotada(LlamadaRechazada):
+    """No hay fichas o presupuesto diario para la llamada; se sirven datos locales"""
+
+
+class GobernadorCuota:
+    """Cubeta de fichas y consumo diario en un archivo SQLite compartido entre procesos"""
+
+    def __init__(self, ruta: str, por_segundo: float = 10.0, rafaga: int = 20, diaria: int = 0):
+        self.ruta = ruta
+        self.por_segundo = por_segundo
+        self.rafaga = rafaga
+        self.diaria = diaria  # 0 = sin tope diario
+        self._local = threading.local()
+        conexion = self._conexion()
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS cubeta ("
+            " nombre TEXT PRIMARY KEY, fichas REAL NOT NULL, actualizado REAL NOT NULL)"
+        )
+        conexion.execute(
+            "CREATE TABLE IF NOT EXISTS consumo ("
+            " dia TEXT NOT NULL, endpoint TEXT NOT NULL,"
+            " usadas INTEGER NOT NULL DEFAULT 0, limitadas INTEGER NOT NULL DEFAULT 0,"
+            " agotadas INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (dia, endpoint))"
+        )
+        conexion.execute(
+            "INSERT OR IGNORE INTO cubeta (nombre, fichas, actualizado) VALUES ('google', ?, ?)",
+            (float(rafaga), time.time())
+        )
+
+    def _conexion(self) -> sqlite3.Connection:
+        # sqlite3 no comparte conexiones entre hilos: una por hilo
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+        return conexion
+
+    @staticmethod
+    def _dia() -> str:
+        return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+    def _intentar(self, endpoint: str, prioridad: str) -> tuple[str, float]:
+        """
+        Intenta reservar una ficha. Devuelve ('permitida', 0), ('limitada', segundos
+        hasta que haya ficha) o ('agotada', 0) si se acabó el presupuesto diario.
+        """
+        conexion = self._conexion()
+        dia = self._dia()
+        conexion.execute("BEGIN IMMEDIATE")
+        try:
+            if self.diaria:
+                usadas = conexion.execute("SELECT COALESCE(SUM(usadas), 0) FROM consumo WHERE dia = ?", (dia,)).fetchone()[0]
+                if usadas >= self.diaria * FRACCION_DIARIA.get(prioridad, 1.0):
+                    self._contar(conexion, dia, endpoint, 'agotadas')
+                    conexion.execute("COMMIT")
+                    return 'agotada', 0.0
+
+            ahora = time.time()
+            fichas, actualizado = conexion.execute(
+                "SELECT fichas, actualizado FROM cubeta WHERE nombre = 'google'"
+            ).fetchone()
+            fichas = min(float(self.rafaga), fichas + max(ahora - actualizado, 0.0) * self.por_segundo)
+            reserva = self.rafaga * RESERVA_RAFAGA.get(prioridad, 0.0)
+
+            if fichas - 1 < reserva:
+                conexion.execute("UPDATE cubeta SET fichas = ?, actualizado = ? WHERE nombre = 'google'", (fichas, ahora))
+                conexion.execute("COMMIT")
+                return 'limitada', (reserva + 1 - fichas) / self.por_segundo
+
+            conexion.execute("UPDATE cubeta SET fichas = ?, actualizado = ? WHERE nombre = 'google'", (fichas - 1, ahora))
+            self._contar(conexion, dia, endpoint, 'usadas')
+            conexion.execute("COMMIT")
+            return 'permitida', 0.0
+        except BaseException:
+            conexion.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _contar(conexion: sqlite3.Connection, dia: str, endpoint: str, columna: str) -> None:
+        conexion.execute(
+            f"INSERT INTO consumo (dia, endpoint, {columna}) VALUES (?, ?, 1) "
+            f"ON CONFLICT (dia, endpoint) DO UPDATE SET {columna} = {columna} + 1",
+            (dia, endpoint)
+        )
+
+    def adquirir(self, endpoint: str, prioridad: str = 'alta', espera_maxima: float = 0.0) -> bool:
+        """
+        Reserva una llamada a `endpoint`. Si la cubeta está vacía espera hasta
+        espera_maxima segundos; devuelve False si no se pudo (tasa o tope diario).
+        Si el archivo no está disponible se deja pasar la llamada.
+        """
+        limite = time.monotonic() + espera_maxima
+        try:
+            while True:
+                resultado, espera = self._intentar(endpoint, prioridad)
+                if resultado == 'permitida':
+                    return True
+                if resultado == 'agotada':
+                    return False
+                if time.monotonic() + espera > limite:
+                    conexion = self._conexion()
+                    self._contar(conexion, self._dia(), endpoint, 'limitadas')
+                    return False
+                time.sleep(espera)
+        except sqlite3.Error as e:
+            print(f"Gobernador de cuota no disponible, se permite la llamada: {e}")
+            return True
+
+    def estadisticas(self) -> dict[str, Any]:
+        try:
+            conexion = self._conexion()
+            dia = self._dia()
+            filas = conexion.execute(
+                "SELECT endpoint, usadas, limitadas, agotadas FROM consumo WHERE dia = ? ORDER BY endpoint", (dia,)
+            ).fetchall()
+            fichas, actualizado = conexion.execute(
+                "SELECT fichas, actualizado FROM cubeta WHERE nombre = 'google'"
+            ).fetchone()
+        except sqlite3.Error as e:
+            return {'error': str(e)}
+        fichas = min(float(self.rafaga), fichas + max(time.time() - actualizado, 0.0) * self.por_segundo)
+        return {
+            'dia': dia,
+            'por_segundo': self.por_segundo,
+            'rafaga': self.rafaga,
+            'diaria': self.diaria,
+            'fichas': round(fichas, 2),
+            'usadas': sum(f[1] for f in filas),
+            'endpoints': {
+                endpoint: {'usadas': usadas, 'limitadas': limitadas, 'agotadas': agotadas}
+                for endpoint, usadas, limitadas, agotadas in filas
+            }
+        }
+
+
+# ==================== GOBERNADOR DEL PROCESO ====================
+
+_gobernador: GobernadorCuota | None = None
+
+
+def init_app(app: Any) -> None:
+    """Abre el gobernador en CUOTA_URL (por defecto instance/cuota.db) si CUOTA_ACTIVA"""
+    global _gobernador
+    if not app.config.get('CUOTA_ACTIVA', True):
+        _gobernador = None
+        return
+    ruta = app.config.get('CUOTA_URL')
+    if not ruta:
+        os.makedirs(app.instance_path, exist_ok=True)
+        ruta = os.path.join(app.instance_path, 'cuota.db')
+    try:
+        _gobernador = GobernadorCuota(
+            ruta,
+            por_segundo=app.config.get('CUOTA_POR_SEGUNDO', 10.0),
+            rafaga=app.config.get('CUOTA_RAFAGA', 20),
+            diaria=app.config.get('CUOTA_DIARIA', 0)
+        )
+    except sqlite3.Error as e:
+        print(f"Gobernador de cuota desactivado: {e}")
+        _gobernador = None
+
+
+def consumir(endpoint: str, prioridad: str = 'alta', espera_maxima: float = 0.0) -> None:
+    """Reserva una llamada a Google o lanza CuotaAgotada"""
+    if _gobernador is not None and not _gobernador.adquirir(endpoint, prioridad, espera_maxima):
+        raise CuotaAgotada(f'Cuota de Google agotada ({endpoint}, prioridad {prioridad})')
+
+
+def estadisticas() -> dict[str, Any]:
+    return _gobernador.estadisticas() if _gobernador is not None else {'activo': False}
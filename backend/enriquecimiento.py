@@ -0,0 +1,131 @@
+"""
+Enriquecimiento en segundo plano de las barberías replicadas de Google Places.
+
+Places Nearby no devuelve teléfono ni horario. Un hilo pide Place Details para
+las filas replicadas que aún no los tienen (o cuyos detalles ya son viejos),
+respetando un límite de llamadas por segundo, y escribe los resultados por
+lotes. Las rutas nunca esperan estas llamadas: leen lo que ya esté guardado.
+"""
+
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy import update
+from sqlalchemy.exc import SQLAlchemyError
+
+from .concurrencia import LimitadorTasa
+from .models import db, Barberia
+from .resiliencia import LlamadaRechazada
+
+# Configuración por defecto; se sobreescribe desde config.py en init_app
+_config: dict[str, Any] = {
+    'activo': True,
+    'lote': 20,          # Place Details por tanda (y filas por escritura)
+    'intervalo': 60,     # segundos entre revisiones si nadie avisa
+    'ttl_dias': 30,      # antigüedad a partir de la cual se vuelven a pedir los detalles
+}
+
+limitador_detalles = LimitadorTasa(por_segundo=2.0)
+
+_hay_pendientes = threading.Event()
+_hilo: threading.Thread | None = None
+_lock_hilo = threading.Lock()
+_app: Any = None
+
+
+def init_app(app: Any) -> None:
+    """Toma la configuración del enriquecimiento; el hilo se inicia con el primer aviso"""
+    global _app
+    _app = app
+    _config.update({
+        'activo': app.config.get('DETALLES_ACTIVO', _config['activo']),
+        'lote': app.config.get('DETALLES_LOTE', _config['lote']),
+        'intervalo': app.config.get('DETALLES_INTERVALO', _config['intervalo']),
+        'ttl_dias': app.config.get('DETALLES_TTL_DIAS', _config['ttl_dias']),
+    })
+    limitador_detalles.configurar(por_segundo=app.config.get('DETALLES_POR_SEGUNDO'))
+
+
+def avisar() -> None:
+    """Indica que hay filas nuevas por enriquecer; se puede llamar desde cualquier hilo"""
+    global _hilo
+    if not _config['activo'] or _app is None:
+        return
+    _hay_pendientes.set()
+    with _lock_hilo:
+        if _hilo is None or not _hilo.is_alive():
+            _hilo = threading.Thread(target=_enriquecer_periodicamente, name='enriquecimiento-detalles', daemon=True)
+            _hilo.start()
+
+
+def enriquecer_pendientes(limite: int | None = None) -> int:
+    """
+    Pide Place Details para una tanda de filas sin detalles (o con detalles
+    vencidos) y guarda teléfono y horario en una sola escritura por lotes.
+    Requiere contexto de aplicación. Devuelve el número de filas actualizadas.
+    """
+    # Importación diferida: services importa la réplica, que avisa a este módulo
+    from . import services
+
+    if not services.GOOGLE_API_KEY:
+        return 0
+
+    vencidos = (datetime.now(timezone.utc) - timedelta(days=_config['ttl_dias'])).replace(tzinfo=None)
+    pendientes = db.session.query(Barberia.id, Barberia.google_place_id).filter(
+        Barberia.google_place_id.isnot(None),
+        db.or_(Barberia.fecha_detalles.is_(None), Barberia.fecha_detalles < vencidos)
+    ).order_by(Barberia.fecha_detalles.is_not(None), Barberia.fecha_detalles).limit(limite or _config['lote']).all()
+    # Se termina la transacción de lectura antes de las llamadas lentas a Google
+    db.session.commit()
+
+    ahora = datetime.now(timezone.utc)
+    cambios: list[dict[str, Any]] = []
+    for barberia_id, place_id in pendientes:
+        if not services.circuito_places.permite_llamada():
+            break
+        limitador_detalles.esperar()
+        try:
+            contacto = services.circuito_places.llamar(lambda: services.consultar_contacto_place(place_id))
+        except LlamadaRechazada:
+            # Circuito abierto o cuota agotada: se reintenta en la próxima pasada
+            break
+        except Exception as e:
+            print(f"Error en Place Details de {place_id}: {e}")
+            continue
+
+        # Si el lugar ya no existe solo se marca; el refresco de la réplica decide si se borra
+        cambio = {'id': barberia_id, 'fecha_detalles': ahora}
+        # Solo se sobreescribe lo que Google devolvió
+        cambio.update({campo: valor for campo, valor in (contacto or {}).items() if valor})
+        cambios.append(cambio)
+
+    if cambios:
+        _guardar_cambios(cambios)
+    return len(cambios)
+
+
+def _guardar_cambios(cambios: list[dict[str, Any]]) -> None:
+    """UPDATE por clave primaria en lote, agrupado por las columnas que cambian"""
+    grupos: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+    for cambio in cambios:
+        grupos.setdefault(tuple(sorted(cambio)), []).append(cambio)
+    for filas in grupos.values():
+        db.session.execute(update(Barberia), filas)
+    db.session.commit()
+
+
+def _enriquecer_periodicamente() -> None:
+    while True:
+        _hay_pendientes.wait(timeout=_config['intervalo'])
+        _hay_pendientes.clear()
+        with _app.app_context():
+            try:
+                # Se sigue por tandas mientras la anterior haya estado completa
+                while enriquecer_pendientes() >= _config['lote']:
+                    pass
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                print(f"Error al guardar teléfonos y horarios de Google: {e}")
+            finally:
+                db.session.remove()
@@ -0,0 +1,76 @@
+"""
+Distribución de calificaciones por barbería (cuántas de 1 a 5 estrellas).
+
+La tabla estadistica_barberia se mantiene al calificar con un upsert que
+incrementa el contador de la estrella dada, en la misma transacción que la
+reseña, así que leer el resumen nunca recorre la tabla de calificaciones.
+"""
+
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import insert as insert_postgresql
+from sqlalchemy.dialects.sqlite import insert as insert_sqlite
+
+from .models import db, Barberia, EstadisticaBarberia
+
+ESTRELLAS = (1, 2, 3, 4, 5)
+
+
+def registrar_calificacion(barberia_id: int, estrellas: int, fecha: datetime) -> None:
+    """
+    Suma una calificación de `estrellas` al histograma de la barbería (lo crea si
+    no existe). No confirma la transacción: eso lo hace quien guarda la reseña.
+    """
+    columna = f'estrellas_{estrellas}'
+    tabla = EstadisticaBarberia.__table__
+    dialecto = db.engine.dialect.name
+    if dialecto in ('sqlite', 'postgresql'):
+        insertar = insert_sqlite if dialecto == 'sqlite' else insert_postgresql
+        sentencia = insertar(tabla).values(barberia_id=barberia_id, ultima_calificacion=fecha, **{columna: 1})
+        sentencia = sentencia.on_conflict_do_update(
+            index_elements=[tabla.c.barberia_id],
+            set_={columna: tabla.c[columna] + 1, 'ultima_calificacion': sentencia.excluded.ultima_calificacion}
+        )
+        db.session.execute(sentencia)
+        return
+
+    # Motores sin ON CONFLICT: incrementar y, si no había fila, crearla
+    resultado = db.session.execute(
+        update(EstadisticaBarberia)
+        .where(EstadisticaBarberia.barberia_id == barberia_id)
+        .values({columna: getattr(EstadisticaBarberia, columna) + 1, 'ultima_calificacion': fecha})
+        .execution_options(synchronize_session=False)
+    )
+    if resultado.rowcount == 0:
+        db.session.add(EstadisticaBarberia(barberia_id=barberia_id, ultima_calificacion=fecha, **{columna: 1}))
+
+
+def resumen_estadisticas(barberia: Barberia) -> dict[str, Any]:
+    """
+    Histograma, total, promedio y fecha de la última reseña de una barbería.
+    El total y el promedio son los de las columnas de Barberia (los mismos que
+    en el resto de la API); el histograma solo da la distribución y los porcentajes.
+    Si la barbería se cargó con joinedload(Barberia.estadistica) no hace consultas.
+    """
+    estadistica = barberia.estadistica
+    distribucion = {
+        str(estrellas): (getattr(estadistica, f'estrellas_{estrellas}') if estadistica else 0)
+        for estrellas in ESTRELLAS
+    }
+    en_histograma = sum(distribucion.values())
+    return {
+        'barberia_id': barberia.id,
+        'total_calificaciones': barberia.total_calificaciones or 0,
+        'calificacion_promedio': round(barberia.calificacion_promedio or 0.0, 1),
+        'distribucion': distribucion,
+        'porcentajes': {
+            estrellas: round(100 * cantidad / en_histograma, 1) if en_histograma else 0.0
+            for estrellas, cantidad in distribucion.items()
+        },
+        'ultima_calificacion': (
+            estadistica.ultima_calificacion.strftime('%d/%m/%Y %H:%M')
+            if estadistica and estadistica.ultima_calificacion else None
+        ),
+    }
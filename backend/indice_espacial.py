@@ -0,0 +1,282 @@
+"""
+Índices espaciales para las barberías locales.
+
+- En SQLite se usa una tabla virtual R*Tree (barberia_rtree) sincronizada con la
+  tabla barberia mediante triggers, compartida por todos los procesos.
+- En otros motores se usa una rejilla en memoria por proceso: las coordenadas se
+  agrupan en celdas de tamaño fijo (en grados) para que las búsquedas por radio
+  solo revisen las celdas que tocan el área de búsqueda.
+"""
+
+import math
+import threading
+from typing import Any, Iterable
+
+from flask import current_app
+from sqlalchemy import event, text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from .models import db, Barberia
+
+TAMANO_CELDA_GRADOS = 0.05  # ~5.5 km de latitud por celda
+KM_POR_GRADO_LATITUD = 111.32
+
+_CLAVE_PENDIENTES = 'indice_espacial_pendientes'
+
+TABLA_RTREE = 'barberia_rtree'
+
+_DDL_RTREE = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_RTREE} USING rtree(id, lat_min, lat_max, lng_min, lng_max)",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_RTREE}_insert AFTER INSERT ON barberia
+        WHEN NEW.latitud IS NOT NULL AND NEW.longitud IS NOT NULL
+        BEGIN
+            INSERT OR REPLACE INTO {TABLA_RTREE} VALUES (NEW.id, NEW.latitud, NEW.latitud, NEW.longitud, NEW.longitud);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_RTREE}_update AFTER UPDATE OF id, latitud, longitud ON barberia
+        BEGIN
+            DELETE FROM {TABLA_RTREE} WHERE id = OLD.id;
+            INSERT INTO {TABLA_RTREE}
+                SELECT NEW.id, NEW.latitud, NEW.latitud, NEW.longitud, NEW.longitud
+                WHERE NEW.latitud IS NOT NULL AND NEW.longitud IS NOT NULL;
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_RTREE}_delete AFTER DELETE ON barberia
+        BEGIN
+            DELETE FROM {TABLA_RTREE} WHERE id = OLD.id;
+        END""",
+]
+
+_CONSULTA_RTREE = text(f"""
+    SELECT b.id, b.latitud, b.longitud
+    FROM {TABLA_RTREE} AS r JOIN barberia AS b ON b.id = r.id
+    WHERE r.lat_max >= :lat_min AND r.lat_min <= :lat_max
+      AND r.lng_max >= :lng_min AND r.lng_min <= :lng_max
+""")
+
+
+def rectangulo_de_busqueda(lat: float, lng: float, radio_m: float) -> tuple[float, float, float, float]:
+    """Rectángulo (lat_min, lat_max, lng_min, lng_max) que envuelve el círculo de búsqueda"""
+    radio_km = radio_m / 1000
+    delta_lat = radio_km / KM_POR_GRADO_LATITUD
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    delta_lng = min(radio_km / (KM_POR_GRADO_LATITUD * cos_lat), 180.0)
+    return lat - delta_lat, lat + delta_lat, lng - delta_lng, lng + delta_lng
+
+
+class IndiceEspacial:
+    """Rejilla de celdas lat/lng -> {id: (lat, lng)} protegida por un lock"""
+
+    def __init__(self, tamano_celda: float = TAMANO_CELDA_GRADOS):
+        self.tamano_celda = tamano_celda
+        self.construido = False
+        self._celdas: dict[tuple[int, int], dict[int, tuple[float, float]]] = {}
+        self._posiciones: dict[int, tuple[float, float]] = {}
+        self._lock = threading.RLock()
+
+    def _celda(self, lat: float, lng: float) -> tuple[int, int]:
+        return math.floor(lat / self.tamano_celda), math.floor(lng / self.tamano_celda)
+
+    def __len__(self) -> int:
+        return len(self._posiciones)
+
+    def construir(self, filas: Iterable[tuple[int, float | None, float | None]]) -> None:
+        """Reconstruye el índice completo a partir de filas (id, latitud, longitud)"""
+        celdas: dict[tuple[int, int], dict[int, tuple[float, float]]] = {}
+        posiciones: dict[int, tuple[float, float]] = {}
+        for barberia_id, lat, lng in filas:
+            if lat is None or lng is None:
+                continue
+            posiciones[barberia_id] = (lat, lng)
+            celdas.setdefault(self._celda(lat, lng), {})[barberia_id] = (lat, lng)
+
+        with self._lock:
+            self._celdas = celdas
+            self._posiciones = posiciones
+            self.construido = True
+
+    def actualizar(self, barberia_id: int, lat: float | None, lng: float | None) -> None:
+        """Inserta o mueve una barbería; sin coordenadas se elimina del índice"""
+        with self._lock:
+            self._quitar(barberia_id)
+            if lat is None or lng is None:
+                return
+            self._posiciones[barberia_id] = (lat, lng)
+            self._celdas.setdefault(self._celda(lat, lng), {})[barberia_id] = (lat, lng)
+
+    def eliminar(self, barberia_id: int) -> None:
+        with self._lock:
+            self._quitar(barberia_id)
+
+    def _quitar(self, barberia_id: int) -> None:
+        posicion = self._posiciones.pop(barberia_id, None)
+        if posicion is None:
+            return
+        celda = self._celda(*posicion)
+        contenido = self._celdas.get(celda)
+        if contenido is not None:
+            contenido.pop(barberia_id, None)
+            if not contenido:
+                del self._celdas[celda]
+
+    def buscar_en_radio(self, lat: float, lng: float, radio_m: float) -> list[tuple[int, float, float]]:
+        """
+        Devuelve los candidatos (id, lat, lng) dentro del rectángulo que envuelve
+        el círculo de búsqueda. El filtrado exacto por distancia lo hace quien llama.
+        """
+        lat_min, lat_max, lng_min, lng_max = rectangulo_de_busqueda(lat, lng, radio_m)
+
+        with self._lock:
+            # Cerca del antimeridiano el rectángulo se parte en dos: revisar todo
+            if lng_min < -180 or lng_max > 180:
+                return [(i, la, ln) for i, (la, ln) in self._posiciones.items()]
+
+            fila_min, col_min = self._celda(lat_min, lng_min)
+            fila_max, col_max = self._celda(lat_max, lng_max)
+            total_celdas = (fila_max - fila_min + 1) * (col_max - col_min + 1)
+
+            if total_celdas > len(self._celdas):
+                # Radio enorme: es más barato recorrer solo las celdas ocupadas
+                celdas = [
+                    contenido for (fila, col), contenido in self._celdas.items()
+                    if fila_min <= fila <= fila_max and col_min <= col <= col_max
+                ]
+            else:
+                celdas = [
+                    self._celdas[(fila, col)]
+                    for fila in range(fila_min, fila_max + 1)
+                    for col in range(col_min, col_max + 1)
+                    if (fila, col) in self._celdas
+                ]
+
+            return [
+                (barberia_id, la, ln)
+                for contenido in celdas
+                for barberia_id, (la, ln) in contenido.items()
+                if lat_min <= la <= lat_max and lng_min <= ln <= lng_max
+            ]
+
+
+# Índice compartido por todo el proceso
+indice_barberias = IndiceEspacial()
+
+
+def construir_indice() -> None:
+    """Carga todas las coordenadas de la tabla Barberia en el índice"""
+    filas = db.session.query(Barberia.id, Barberia.latitud, Barberia.longitud).all()
+    indice_barberias.construir(filas)
+
+
+def asegurar_indice() -> IndiceEspacial:
+    """Construye el índice la primera vez que se necesita"""
+    if not indice_barberias.construido:
+        construir_indice()
+    return indice_barberias
+
+
+# ==================== SINCRONIZACIÓN CON LA SESIÓN ====================
+# Solo aplica a la rejilla en memoria (el R*Tree se mantiene con triggers). Los
+# cambios se acumulan en cada flush y se aplican cuando la transacción se
+# confirma, para que un rollback no deje el índice desfasado.
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_cambios_barberias(session: Session, flush_context: Any) -> None:
+    if not indice_barberias.construido:
+        return
+    pendientes = session.info.setdefault(_CLAVE_PENDIENTES, {})
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Barberia):
+            pendientes[obj.id] = (obj.latitud, obj.longitud)
+    for obj in session.deleted:
+        if isinstance(obj, Barberia):
+            pendientes[obj.id] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def _aplicar_cambios_barberias(session: Session) -> None:
+    pendientes = session.info.pop(_CLAVE_PENDIENTES, None)
+    if not pendientes or not indice_barberias.construido:
+        return
+    for barberia_id, posicion in pendientes.items():
+        if posicion is None:
+            indice_barberias.eliminar(barberia_id)
+        else:
+            indice_barberias.actualizar(barberia_id, *posicion)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_cambios_barberias(session: Session) -> None:
+    session.info.pop(_CLAVE_PENDIENTES, None)
+
+
+# ==================== R*TREE EN SQLITE ====================
+
+def _crear_rtree(conexion: Any) -> None:
+    """Crea la tabla R*Tree y sus triggers; si es nueva, la llena con las filas existentes"""
+    existia = conexion.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :nombre"),
+        {'nombre': TABLA_RTREE}
+    ).first() is not None
+    for sentencia in _DDL_RTREE:
+        conexion.execute(text(sentencia))
+    if not existia:
+        conexion.execute(text(f"""
+            INSERT OR REPLACE INTO {TABLA_RTREE}
+            SELECT id, latitud, latitud, longitud, longitud FROM barberia
+            WHERE latitud IS NOT NULL AND longitud IS NOT NULL
+        """))
+
+
+@event.listens_for(Barberia.__table__, 'after_create')
+def _crear_rtree_con_tabla(tabla: Any, conexion: Any, **kw: Any) -> None:
+    if conexion.dialect.name == 'sqlite':
+        _crear_rtree(conexion)
+
+
+def asegurar_rtree() -> None:
+    """Crea el R*Tree si la tabla barberia ya existe; si no, lo creará el evento after_create"""
+    with db.engine.begin() as conexion:
+        tabla_existe = conexion.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'barberia'")
+        ).first() is not None
+        if tabla_existe:
+            _crear_rtree(conexion)
+
+
+def buscar_candidatos(lat: float, lng: float, radio_m: float) -> list[tuple[int, float, float]]:
+    """
+    Candidatos (id, lat, lng) dentro del rectángulo del círculo de búsqueda, usando
+    el R*Tree si la aplicación lo tiene disponible y el índice en memoria si no.
+    """
+    if current_app.extensions.get('indice_espacial') != 'rtree':
+        return asegurar_indice().buscar_en_radio(lat, lng, radio_m)
+
+    lat_min, lat_max, lng_min, lng_max = rectangulo_de_busqueda(lat, lng, radio_m)
+    if lng_min < -180 or lng_max > 180:
+        # Cruza el antimeridiano: se amplía a todas las longitudes
+        lng_min, lng_max = -180.0, 180.0
+    filas = db.session.execute(_CONSULTA_RTREE, {
+        'lat_min': lat_min, 'lat_max': lat_max, 'lng_min': lng_min, 'lng_max': lng_max
+    })
+    return [(fila.id, fila.latitud, fila.longitud) for fila in filas]
+
+
+def init_app(app: Any) -> None:
+    """
+    Prepara el índice espacial al arrancar. En SQLite se asegura el R*Tree en disco;
+    en otros motores se precarga la rejilla en memoria (o bajo demanda si la tabla
+    aún no existe).
+    """
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            try:
+                asegurar_rtree()
+                app.extensions['indice_espacial'] = 'rtree'
+                return
+            except SQLAlchemyError as e:
+                print(f"R*Tree no disponible, se usará el índice en memoria: {e}")
+
+        app.extensions['indice_espacial'] = 'memoria'
+        try:
+            construir_indice()
+        except SQLAlchemyError:
+            print("Índice espacial no precargado; se construirá en la primera búsqueda.")
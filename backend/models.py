@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy import inspect, text
 from datetime import datetime, timezone
 import bcrypt
 
@@ -53,13 +54,45 @@ class Barberia(db.Model):
     longitud = db.Column(db.Float)
     calificacion_promedio = db.Column(db.Float, default=0.0)
     total_calificaciones = db.Column(db.Integer, default=0)
+    suma_calificaciones = db.Column(db.Integer, default=0)  # para actualizar el promedio sin leer las reseñas
     fecha_creacion = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     google_place_id = db.Column(db.String(255), unique=True, nullable=True)
     
+    # Réplica local de Google Places (solo filas con google_place_id)
+    calificacion_google = db.Column(db.Float)
+    total_calificaciones_google = db.Column(db.Integer)
+    ultima_actualizacion = db.Column(db.DateTime, index=True)
+    fecha_detalles = db.Column(db.DateTime, index=True)  # último Place Details (teléfono y horario)
+    
     # Relación con calificaciones
     calificaciones = db.relationship('Calificacion', backref='barberia', lazy=True, cascade='all, delete-orphan')
+    estadistica = db.relationship('EstadisticaBarberia', uselist=False, lazy=True, cascade='all, delete-orphan')
+
+class EstadisticaBarberia(db.Model):
+    """Cuántas calificaciones de cada estrella tiene una barbería; se actualiza al calificar"""
+    barberia_id = db.Column(db.Integer, db.ForeignKey('barberia.id'), primary_key=True)
+    estrellas_1 = db.Column(db.Integer, nullable=False, default=0)
+    estrellas_2 = db.Column(db.Integer, nullable=False, default=0)
+    estrellas_3 = db.Column(db.Integer, nullable=False, default=0)
+    estrellas_4 = db.Column(db.Integer, nullable=False, default=0)
+    estrellas_5 = db.Column(db.Integer, nullable=False, default=0)
+    ultima_calificacion = db.Column(db.DateTime)
+
+class CeldaPlaces(db.Model):
+    """Celdas de búsqueda cercana de Google Places ya copiadas a la tabla Barberia"""
+    id = db.Column(db.Integer, primary_key=True)
+    clave = db.Column(db.String(64), unique=True, nullable=False)  # 'lat:lng:radio' de la celda
+    total_resultados = db.Column(db.Integer, default=0)
+    completa = db.Column(db.Boolean, default=False)  # se recorrieron todas las páginas
+    ultima_actualizacion = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
 class Calificacion(db.Model):
+    # Paginación por clave (fecha, id) de las reseñas de una barbería y de un usuario
+    __table_args__ = (
+        db.Index('ix_calificacion_barberia_fecha_id', 'barberia_id', 'fecha', 'id'),
+        db.Index('ix_calificacion_usuario_fecha_id', 'usuario_id', 'fecha', 'id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     barberia_id = db.Column(db.Integer, db.ForeignKey('barberia.id'), nullable=False)
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuario.id'), nullable=False)
@@ -68,4 +101,60 @@ class Calificacion(db.Model):
     fecha = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     
     # Mantener compatibilidad con el campo anterior
-    nombre_usuario = db.Column(db.String(50), nullable=True)  # Para calificaciones antiguas 
\ No newline at end of file
+    nombre_usuario = db.Column(db.String(50), nullable=True)  # Para calificaciones antiguas 
+
+
+# Columnas agregadas a tablas que ya existen en bases de datos anteriores:
+# (tabla, columna, tipo SQL)
+COLUMNAS_AGREGADAS = [
+    ('barberia', 'calificacion_google', 'FLOAT'),
+    ('barberia', 'total_calificaciones_google', 'INTEGER'),
+    ('barberia', 'ultima_actualizacion', 'DATETIME'),
+    ('barberia', 'fecha_detalles', 'DATETIME'),
+    ('barberia', 'suma_calificaciones', 'INTEGER DEFAULT 0'),
+]
+
+# Sentencias que llenan una columna recién agregada a partir de los datos existentes
+RELLENOS_COLUMNAS = {
+    ('barberia', 'suma_calificaciones'): '''
+        UPDATE barberia SET suma_calificaciones = COALESCE(
+            (SELECT SUM(calificacion) FROM calificacion WHERE calificacion.barberia_id = barberia.id), 0
+        )
+    ''',
+}
+
+# Sentencias que llenan una tabla nueva a partir de los datos existentes
+RELLENOS_TABLAS = {
+    'estadistica_barberia': '''
+        INSERT INTO estadistica_barberia
+            (barberia_id, estrellas_1, estrellas_2, estrellas_3, estrellas_4, estrellas_5, ultima_calificacion)
+        SELECT barberia_id,
+               SUM(CASE WHEN calificacion = 1 THEN 1 ELSE 0 END),
+               SUM(CASE WHEN calificacion = 2 THEN 1 ELSE 0 END),
+               SUM(CASE WHEN calificacion = 3 THEN 1 ELSE 0 END),
+               SUM(CASE WHEN calificacion = 4 THEN 1 ELSE 0 END),
+               SUM(CASE WHEN calificacion = 5 THEN 1 ELSE 0 END),
+               MAX(fecha)
+        FROM calificacion GROUP BY barberia_id
+    ''',
+}
+
+def actualizar_esquema() -> None:
+    """Crea las tablas que falten y agrega las columnas e índices nuevos a las tablas existentes"""
+    tablas_previas = set(inspect(db.engine).get_table_names())
+    db.create_all()
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conexion:
+        for tabla, sentencia in RELLENOS_TABLAS.items():
+            if tabla not in tablas_previas:
+                conexion.execute(text(sentencia))
+        for tabla, columna, tipo in COLUMNAS_AGREGADAS:
+            existentes = {c['name'] for c in inspector.get_columns(tabla)}
+            if columna not in existentes:
+                conexion.execute(text(f'ALTER TABLE {tabla} ADD COLUMN {columna} {tipo}'))
+                if (tabla, columna) in RELLENOS_COLUMNAS:
+                    conexion.execute(text(RELLENOS_COLUMNAS[(tabla, columna)]))
+        # create_all no agrega índices nuevos a tablas que ya existían
+        for tabla_modelo in db.metadata.sorted_tables:
+            for indice in tabla_modelo.indexes:
+                indice.create(conexion, checkfirst=True)
@@ -0,0 +1,153 @@
+"""
+Ordenamiento común de resultados de búsqueda y de barberías cercanas.
+
+Cada candidata recibe un puntaje en [0, 1] que combina, con pesos
+configurables, cercanía, calificación (promedio bayesiano), popularidad
+(número de reseñas) y relevancia del texto. Todo se calcula en lote sobre
+arreglos de NumPy.
+
+Las normalizaciones son absolutas (escalas fijas, no el mínimo y máximo del
+lote), así que el puntaje de una barbería no depende de las demás: sirve como
+posición estable para los cursores de paginación. La excepción es la relevancia
+BM25 de la búsqueda por texto, que solo tiene sentido dentro de una consulta y
+se normaliza contra la mejor del lote (esa búsqueda no se pagina).
+"""
+
+from typing import Any, Iterable
+
+import numpy as np
+
+from .busqueda_difusa import palabras, puntuar
+from .models import db, Barberia
+
+# Configuración por defecto; se sobreescribe desde config.py en init_app
+_config: dict[str, Any] = {
+    'peso_distancia': 0.4,
+    'peso_calificacion': 0.3,
+    'peso_popularidad': 0.1,
+    'peso_texto': 0.2,
+    'escala_km': 2.0,  # a esta distancia la cercanía vale la mitad
+}
+
+# Promedio bayesiano: pocas reseñas acercan la calificación a la media
+CALIFICACION_PREVIA = 3.0
+RESENAS_PREVIAS = 5
+# Con este número de reseñas la popularidad vale 1
+RESENAS_REFERENCIA = 1000
+
+
+def calificacion_ponderada(promedio: Any, total: Any) -> Any:
+    """Promedio bayesiano de la calificación; acepta números o arreglos"""
+    promedio = np.nan_to_num(np.asarray(promedio, dtype=float))
+    total = np.nan_to_num(np.asarray(total, dtype=float))
+    return (promedio * total + CALIFICACION_PREVIA * RESENAS_PREVIAS) / (total + RESENAS_PREVIAS)
+
+
+def relevancia_bm25(rangos: Any) -> np.ndarray:
+    """
+    Rangos de bm25() de FTS5 (negativos, más bajo = más relevante) llevados a
+    [0, 1] dentro del lote: la más relevante vale 1.
+    """
+    puntajes = np.maximum(-np.asarray(rangos, dtype=float), 0.0)
+    mejor = puntajes.max() if puntajes.size else 0.0
+    return puntajes / mejor if mejor > 0 else np.ones(puntajes.size)
+
+
+def relevancia_texto(consulta: str, nombres: Iterable[str | None], direcciones: Iterable[str | None]) -> np.ndarray:
+    """
+    1 si todas las palabras de la consulta están en el nombre; baja con cada
+    error de escritura o palabra que solo aparece en la dirección, y es 0 si
+    alguna palabra no aparece (p. ej. resultados de Google por categoría).
+    Compara palabra por palabra en Python: es para las filas sin rango BM25.
+    """
+    buscadas = palabras(consulta)
+    resultado = []
+    for nombre, direccion in zip(nombres, direcciones):
+        puntaje = puntuar(buscadas, nombre, direccion) if buscadas else None
+        resultado.append(0.0 if puntaje is None else 1.0 / (1.0 + puntaje[0] + 0.5 * puntaje[1]))
+    return np.array(resultado, dtype=float)
+
+
+def puntuar_lote(distancias: np.ndarray | None = None, calificaciones: Any = None, totales: Any = None,
+                 relevancias: np.ndarray | None = None) -> np.ndarray:
+    """
+    Puntaje combinado de cada candidata. Los componentes ausentes (None) no
+    cuentan y su peso se reparte entre los demás; distancias NaN valen 0.
+    """
+    componentes = []
+    if distancias is not None:
+        cercania = 1.0 / (1.0 + np.asarray(distancias, dtype=float) / _config['escala_km'])
+        componentes.append((_config['peso_distancia'], np.nan_to_num(cercania, nan=0.0)))
+    if calificaciones is not None:
+        componentes.append((_config['peso_calificacion'], calificacion_ponderada(calificaciones, totales) / 5.0))
+        popularidad = np.log1p(np.nan_to_num(np.asarray(totales, dtype=float))) / np.log1p(RESENAS_REFERENCIA)
+        componentes.append((_config['peso_popularidad'], np.minimum(popularidad, 1.0)))
+    if relevancias is not None:
+        componentes.append((_config['peso_texto'], relevancias))
+
+    peso_total = sum(peso for peso, _ in componentes)
+    if not componentes or peso_total <= 0:
+        largo = next((len(valores) for _, valores in componentes), 0)
+        return np.zeros(largo)
+    return sum(peso * valores for peso, valores in componentes) / peso_total
+
+
+def puntuar_barberias(barberias: list[dict[str, Any]], distancias: np.ndarray | None = None,
+                      consulta: str | None = None, rangos: list[float | None] | None = None) -> np.ndarray:
+    """
+    Puntaje de barberías ya serializadas (locales o de Google, mismo formato).
+    `rangos` trae el bm25() de las primeras (las encontradas por FTS5, None en
+    las demás); las que no tienen rango se puntúan con relevancia_texto.
+    """
+    relevancias = None
+    if consulta:
+        rangos = list(rangos or [])[:len(barberias)]
+        con_rango = np.zeros(len(barberias), dtype=bool)
+        con_rango[:len(rangos)] = [rango is not None for rango in rangos]
+        relevancias = np.zeros(len(barberias))
+        if con_rango.any():
+            relevancias[con_rango] = relevancia_bm25([rango for rango in rangos if rango is not None])
+        resto = np.flatnonzero(~con_rango)
+        if resto.size:
+            relevancias[resto] = relevancia_texto(
+                consulta, [barberias[i].get('nombre') for i in resto], [barberias[i].get('direccion') for i in resto]
+            )
+    return puntuar_lote(
+        distancias,
+        [b.get('calificacion_promedio') or 0.0 for b in barberias],
+        [b.get('total_calificaciones') or 0 for b in barberias],
+        relevancias
+    )
+
+
+def calificaciones_locales(ids: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (promedios, totales) de barberías locales en el orden de `ids`, leyendo solo
+    esas dos columnas. Las replicadas de Google usan su calificación de Google.
+    """
+    por_id: dict[int, tuple[float, int]] = {}
+    lista = [int(i) for i in ids]
+    for inicio in range(0, len(lista), 500):
+        filas = db.session.query(
+            Barberia.id, Barberia.google_place_id, Barberia.calificacion_promedio, Barberia.total_calificaciones,
+            Barberia.calificacion_google, Barberia.total_calificaciones_google
+        ).filter(Barberia.id.in_(lista[inicio:inicio + 500])).all()
+        for fila in filas:
+            if fila.google_place_id:
+                por_id[fila.id] = (fila.calificacion_google or 0.0, fila.total_calificaciones_google or 0)
+            else:
+                por_id[fila.id] = (fila.calificacion_promedio or 0.0, fila.total_calificaciones or 0)
+    promedios = np.array([por_id.get(i, (0.0, 0))[0] for i in lista], dtype=float)
+    totales = np.array([por_id.get(i, (0.0, 0))[1] for i in lista], dtype=float)
+    return promedios, totales
+
+
+def init_app(app: Any) -> None:
+    """Toma los pesos del ordenamiento de la configuración"""
+    _config.update({
+        'peso_distancia': app.config.get('RANKING_PESO_DISTANCIA', _config['peso_distancia']),
+        'peso_calificacion': app.config.get('RANKING_PESO_CALIFICACION', _config['peso_calificacion']),
+        'peso_popularidad': app.config.get('RANKING_PESO_POPULARIDAD', _config['peso_popularidad']),
+        'peso_texto': app.config.get('RANKING_PESO_TEXTO', _config['peso_texto']),
+        'escala_km': app.config.get('RANKING_ESCALA_KM', _config['escala_km']),
+    })
@@ -0,0 +1,307 @@
+"""
+Réplica local de los resultados de Google Places en la tabla Barberia.
+
+Los resultados que devuelve Google se encolan y un hilo en segundo plano los
+guarda por lotes con un upsert por google_place_id. También se registran las
+celdas de búsqueda cercana ya copiadas (CeldaPlaces), de modo que una búsqueda
+sobre una celda completa y reciente se responde solo con la base de datos.
+Otro hilo revisita periódicamente las filas obsoletas con Place Details.
+"""
+
+import queue
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from sqlalchemy.dialects.postgresql import insert as insert_postgresql
+from sqlalchemy.dialects.sqlite import insert as insert_sqlite
+from sqlalchemy.exc import SQLAlchemyError
+
+from . import enriquecimiento
+from .busqueda_difusa import indice_trigramas
+from .indice_espacial import indice_barberias
+from .models import db, Barberia, CeldaPlaces
+from .resiliencia import LlamadaRechazada
+
+# Configuración por defecto; se sobreescribe desde config.py en init_app
+_config: dict[str, Any] = {
+    'activa': True,
+    'ttl_horas': 72,             # antigüedad a partir de la cual una fila o celda está obsoleta
+    'lote': 200,                 # filas por sentencia de upsert
+    'intervalo_refresco': 600,   # segundos entre pasadas del refresco
+    'refresco_lote': 20,         # filas obsoletas revisadas por pasada
+}
+
+# Una fila cuyo refresco falla se vuelve a intentar tras esta espera, no en la
+# siguiente pasada: si no, al ser la más antigua bloquearía siempre el lote
+ESPERA_REINTENTO_REFRESCO = timedelta(hours=1)
+
+# Columnas que Google actualiza; calificacion_promedio/total_calificaciones son
+# de las calificaciones locales y telefono/horario vienen de Place Details
+_COLUMNAS_GOOGLE = ('nombre', 'direccion', 'latitud', 'longitud',
+                    'calificacion_google', 'total_calificaciones_google', 'ultima_actualizacion')
+
+_cola: queue.Queue = queue.Queue()
+_hilos: dict[str, threading.Thread] = {}
+_lock_hilos = threading.Lock()
+_app: Any = None
+
+
+def init_app(app: Any) -> None:
+    """Toma la configuración de la réplica; los hilos se inician con el primer resultado"""
+    global _app
+    _app = app
+    _config.update({
+        'activa': app.config.get('REPLICA_ACTIVA', _config['activa']),
+        'ttl_horas': app.config.get('REPLICA_TTL_HORAS', _config['ttl_horas']),
+        'lote': app.config.get('REPLICA_LOTE', _config['lote']),
+        'intervalo_refresco': app.config.get('REPLICA_INTERVALO_REFRESCO', _config['intervalo_refresco']),
+        'refresco_lote': app.config.get('REPLICA_REFRESCO_LOTE', _config['refresco_lote']),
+    })
+
+
+def _ahora() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _limite_obsoleto() -> datetime:
+    # SQLite guarda las fechas sin zona horaria
+    return (_ahora() - timedelta(hours=_config['ttl_horas'])).replace(tzinfo=None)
+
+
+# ==================== ESCRITURA POR LOTES ====================
+
+def _fila_de_place(barberia: dict[str, Any], ahora: datetime) -> dict[str, Any] | None:
+    if not barberia.get('google_place_id') or barberia.get('latitud') is None or barberia.get('longitud') is None:
+        return None
+    return {
+        'google_place_id': barberia['google_place_id'],
+        'nombre': barberia.get('nombre') or 'Establecimiento',
+        'direccion': barberia.get('direccion') or 'Dirección no disponible',
+        'latitud': barberia['latitud'],
+        'longitud': barberia['longitud'],
+        'calificacion_google': barberia.get('calificacion_promedio', 0.0),
+        'total_calificaciones_google': barberia.get('total_calificaciones', 0),
+        'ultima_actualizacion': ahora,
+        'calificacion_promedio': 0.0,
+        'total_calificaciones': 0,
+        'fecha_creacion': ahora,
+    }
+
+
+def guardar_en_replica(barberias: list[dict[str, Any]]) -> int:
+    """
+    Inserta o actualiza (upsert por google_place_id) barberías en formato de
+    Google, en sentencias de hasta `lote` filas. Requiere contexto de aplicación.
+    Devuelve el número de filas escritas.
+    """
+    ahora = _ahora()
+    filas: dict[str, dict[str, Any]] = {}
+    for barberia in barberias:
+        fila = _fila_de_place(barberia, ahora)
+        if fila is not None:
+            filas[fila['google_place_id']] = fila
+    if not filas:
+        return 0
+
+    dialecto = db.engine.dialect.name
+    if dialecto == 'sqlite':
+        insertar = insert_sqlite
+    elif dialecto == 'postgresql':
+        insertar = insert_postgresql
+    else:
+        insertar = None
+
+    valores = list(filas.values())
+    for inicio in range(0, len(valores), _config['lote']):
+        lote = valores[inicio:inicio + _config['lote']]
+        if insertar is None:
+            _guardar_lote_generico(lote)
+            continue
+        sentencia = insertar(Barberia.__table__).values(lote)
+        sentencia = sentencia.on_conflict_do_update(
+            index_elements=['google_place_id'],
+            set_={columna: sentencia.excluded[columna] for columna in _COLUMNAS_GOOGLE}
+        )
+        db.session.execute(sentencia)
+    db.session.commit()
+
+    # Los upserts no pasan por los eventos del ORM: sincronizar los índices en memoria
+    if indice_barberias.construido or indice_trigramas.construido:
+        escritas = db.session.query(
+            Barberia.id, Barberia.latitud, Barberia.longitud, Barberia.nombre, Barberia.direccion
+        ).filter(Barberia.google_place_id.in_(list(filas))).all()
+        for barberia_id, lat, lng, nombre, direccion in escritas:
+            if indice_barberias.construido:
+                indice_barberias.actualizar(barberia_id, lat, lng)
+            if indice_trigramas.construido:
+                indice_trigramas.actualizar(barberia_id, nombre, direccion)
+    return len(valores)
+
+
+def _guardar_lote_generico(lote: list[dict[str, Any]]) -> None:
+    """Upsert para motores sin ON CONFLICT: una consulta para los existentes y el resto se inserta"""
+    existentes = {
+        b.google_place_id: b
+        for b in Barberia.query.filter(Barberia.google_place_id.in_([f['google_place_id'] for f in lote])).all()
+    }
+    for fila in lote:
+        barberia = existentes.get(fila['google_place_id'])
+        if barberia is None:
+            db.session.add(Barberia(**fila))
+        else:
+            for columna in _COLUMNAS_GOOGLE:
+                setattr(barberia, columna, fila[columna])
+
+
+def registrar_celda(clave_celda: str, pagina: int, total: int, completa: bool) -> None:
+    """Marca una celda de búsqueda cercana como copiada (completa si no quedan páginas)"""
+    celda = CeldaPlaces.query.filter_by(clave=clave_celda).first()
+    if celda is None:
+        celda = CeldaPlaces(clave=clave_celda, total_resultados=0)
+        db.session.add(celda)
+    if pagina <= 1:
+        celda.total_resultados = total
+    else:
+        celda.total_resultados = (celda.total_resultados or 0) + total
+    celda.completa = completa
+    celda.ultima_actualizacion = _ahora()
+    db.session.commit()
+
+
+def celdas_reflejadas(claves: list[str]) -> set[str]:
+    """Claves de celda completas y recientes; sus búsquedas se pueden responder localmente"""
+    if not _config['activa'] or not claves:
+        return set()
+    try:
+        filas = db.session.query(CeldaPlaces.clave).filter(
+            CeldaPlaces.clave.in_(claves),
+            CeldaPlaces.completa.is_(True),
+            CeldaPlaces.ultima_actualizacion >= _limite_obsoleto()
+        ).all()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        print(f"Error al consultar celdas de la réplica: {e}")
+        return set()
+    return {fila.clave for fila in filas}
+
+
+def ids_replicados(place_ids: list[str]) -> dict[str, int]:
+    """google_place_id -> id de Barberia para los de la lista que ya tienen fila replicada"""
+    if not place_ids:
+        return {}
+    filas = db.session.query(Barberia.google_place_id, Barberia.id).filter(Barberia.google_place_id.in_(place_ids)).all()
+    return {fila.google_place_id: fila.id for fila in filas}
+
+
+# ==================== COLA Y ESCRITOR EN SEGUNDO PLANO ====================
+
+def encolar(barberias: list[dict[str, Any]], clave_celda: str | None = None,
+            pagina: int = 1, completa: bool = False) -> None:
+    """
+    Encola resultados de Google para guardarlos en la réplica. Se puede llamar
+    desde cualquier hilo (no necesita contexto de aplicación).
+    """
+    if not _config['activa'] or _app is None:
+        return
+    _cola.put((barberias, clave_celda, pagina, completa))
+    _iniciar_hilos()
+
+
+def _iniciar_hilos() -> None:
+    with _lock_hilos:
+        for nombre, destino in (('replica-escritor', _escribir_pendientes), ('replica-refresco', _refrescar_periodicamente)):
+            hilo = _hilos.get(nombre)
+            if hilo is None or not hilo.is_alive():
+                hilo = threading.Thread(target=destino, name=nombre, daemon=True)
+                hilo.start()
+                _hilos[nombre] = hilo
+
+
+def _escribir_pendientes() -> None:
+    """Agrupa lo que haya en la cola y lo escribe en una sola transacción por tanda"""
+    while True:
+        pendientes = [_cola.get()]
+        while len(pendientes) < _config['lote']:
+            try:
+                pendientes.append(_cola.get_nowait())
+            except queue.Empty:
+                break
+
+        barberias = [b for lote, _, _, _ in pendientes for b in lote]
+        with _app.app_context():
+            try:
+                if guardar_en_replica(barberias):
+                    # Teléfono y horario de las nuevas se piden aparte, con límite de tasa
+                    enriquecimiento.avisar()
+                for lote, clave_celda, pagina, completa in pendientes:
+                    if clave_celda is not None:
+                        registrar_celda(clave_celda, pagina, len(lote), completa)
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                print(f"Error al guardar resultados de Google en la réplica: {e}")
+            finally:
+                db.session.remove()
+
+
+# ==================== REFRESCO DE FILAS OBSOLETAS ====================
+
+def refrescar_obsoletas(limite: int | None = None) -> int:
+    """
+    Revisa con Place Details las filas replicadas más antiguas que el TTL.
+    Las que Google ya no conoce se borran si no tienen calificaciones locales.
+    Requiere contexto de aplicación. Devuelve el número de filas revisadas.
+    """
+    # Importación diferida: services encola resultados en este módulo
+    from . import services
+
+    if not services.GOOGLE_API_KEY:
+        return 0
+
+    obsoletas = Barberia.query.filter(
+        Barberia.google_place_id.isnot(None),
+        db.or_(Barberia.ultima_actualizacion.is_(None), Barberia.ultima_actualizacion < _limite_obsoleto())
+    ).order_by(Barberia.ultima_actualizacion).limit(limite or _config['refresco_lote']).all()
+
+    actualizadas: list[dict[str, Any]] = []
+    revisadas = 0
+    for barberia in obsoletas:
+        if not services.circuito_places.permite_llamada():
+            break
+        try:
+            detalle = services.circuito_places.llamar(lambda: services.consultar_detalle_place(barberia.google_place_id))
+        except LlamadaRechazada:
+            # Circuito abierto o cuota agotada: se reintenta en la próxima pasada
+            break
+        except Exception as e:
+            print(f"Error al refrescar {barberia.google_place_id}: {e}")
+            barberia.ultima_actualizacion = _ahora() - timedelta(hours=_config['ttl_horas']) + ESPERA_REINTENTO_REFRESCO
+            continue
+        revisadas += 1
+        if detalle is not None:
+            actualizadas.append(detalle)
+        elif barberia.calificaciones:
+            # Google ya no lo conoce, pero tiene calificaciones locales: se conserva
+            barberia.ultima_actualizacion = _ahora()
+        else:
+            db.session.delete(barberia)
+
+    db.session.commit()
+    guardar_en_replica(actualizadas)
+    return revisadas
+
+
+def _refrescar_periodicamente() -> None:
+    while True:
+        time.sleep(_config['intervalo_refresco'])
+        with _app.app_context():
+            try:
+                revisadas = refrescar_obsoletas()
+                if revisadas:
+                    print(f"Réplica de Google Places: {revisadas} filas obsoletas revisadas")
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                print(f"Error en el refresco de la réplica: {e}")
+            finally:
+                db.session.remove()
@@ -0,0 +1,111 @@
+"""
+Interruptor de circuito (circuit breaker) para las llamadas a APIs externas.
+
+Tras varios fallos seguidos el circuito se abre y las llamadas se rechazan de
+inmediato durante un tiempo; después se deja pasar una sola llamada de prueba
+(semiabierto) y, según su resultado, el circuito se cierra o vuelve a abrirse.
+"""
+
+import threading
+import time
+from typing import Any, Callable, TypeVar
+
+T = TypeVar('T')
+
+CERRADO = 'cerrado'
+ABIERTO = 'abierto'
+SEMIABIERTO = 'semiabierto'
+
+
+class LlamadaRechazada(Exception):
+    """La llamada no llegó al servicio por una decisión local; no cuenta como fallo"""
+
+
+class CircuitoAbierto(LlamadaRechazada):
+    """La llamada se rechazó sin ejecutarse porque el circuito está abierto"""
+
+
+class InterruptorCircuito:
+    """Interruptor de circuito seguro para hilos"""
+
+    def __init__(self, nombre: str, umbral_fallos: int = 5, tiempo_abierto: float = 30):
+        self.nombre = nombre
+        self.umbral_fallos = umbral_fallos
+        self.tiempo_abierto = tiempo_abierto
+        self.estado = CERRADO
+        self.fallos_consecutivos = 0
+        self.rechazadas = 0
+        self._abierto_hasta = 0.0
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    def configurar(self, umbral_fallos: int | None = None, tiempo_abierto: float | None = None) -> None:
+        with self._lock:
+            if umbral_fallos is not None:
+                self.umbral_fallos = umbral_fallos
+            if tiempo_abierto is not None:
+                self.tiempo_abierto = tiempo_abierto
+
+    def permite_llamada(self) -> bool:
+        """Indica si una llamada puede salir ahora (sin reservar la llamada de prueba)"""
+        with self._lock:
+            if self.estado == ABIERTO:
+                return time.monotonic() >= self._abierto_hasta
+            if self.estado == SEMIABIERTO:
+                return not self._prueba_en_curso
+            return True
+
+    def _reservar(self) -> None:
+        with self._lock:
+            if self.estado == ABIERTO and time.monotonic() >= self._abierto_hasta:
+                self.estado = SEMIABIERTO
+                self._prueba_en_curso = False
+            if self.estado == ABIERTO or (self.estado == SEMIABIERTO and self._prueba_en_curso):
+                self.rechazadas += 1
+                raise CircuitoAbierto(f'Circuito {self.nombre} abierto')
+            if self.estado == SEMIABIERTO:
+                self._prueba_en_curso = True
+
+    def _registrar_exito(self) -> None:
+        with self._lock:
+            self.estado = CERRADO
+            self.fallos_consecutivos = 0
+            self._prueba_en_curso = False
+
+    def _liberar(self) -> None:
+        with self._lock:
+            self._prueba_en_curso = False
+
+    def _registrar_fallo(self) -> None:
+        with self._lock:
+            self.fallos_consecutivos += 1
+            self._prueba_en_curso = False
+            if self.estado == SEMIABIERTO or self.fallos_consecutivos >= self.umbral_fallos:
+                if self.estado != ABIERTO:
+                    print(f"Circuito {self.nombre} abierto tras {self.fallos_consecutivos} fallos")
+                self.estado = ABIERTO
+                self._abierto_hasta = time.monotonic() + self.tiempo_abierto
+
+    def llamar(self, funcion: Callable[[], T]) -> T:
+        """Ejecuta la función a través del circuito; lanza CircuitoAbierto si está abierto"""
+        self._reservar()
+        try:
+            resultado = funcion()
+        except LlamadaRechazada:
+            # p. ej. cuota agotada: el servicio no se llegó a probar
+            self._liberar()
+            raise
+        except Exception:
+            self._registrar_fallo()
+            raise
+        self._registrar_exito()
+        return resultado
+
+    def estadisticas(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                'nombre': self.nombre,
+                'estado': self.estado,
+                'fallos_consecutivos': self.fallos_consecutivos,
+                'rechazadas': self.rechazadas
+            }
@@ -1,10 +1,29 @@
-from flask import request, jsonify, Blueprint
+from flask import request, jsonify, Blueprint, Response
 from typing import Any
+import base64
+import binascii
+import heapq
+import json
+import math
+from concurrent.futures import TimeoutError as FuturoVencido
+from datetime import datetime, timezone
+import numpy as np
+from sqlalchemy import tuple_, update
+from sqlalchemy.orm import joinedload
 from .models import db, Barberia, Calificacion, Usuario
+from .autocompletado import consultas_frecuentes, sugerir
+from .busqueda_difusa import completar_con_difusa
+from .busqueda_texto import buscar_por_texto
+from .concurrencia import obtener_executor, plazo_por_defecto
+from .estadisticas import ESTRELLAS, registrar_calificacion, resumen_estadisticas
+from .indice_espacial import buscar_candidatos
+from .ranking import calificaciones_locales, puntuar_barberias, puntuar_lote
+from .replica import celdas_reflejadas, ids_replicados
 from .services import (
-    buscar_barberias_google_places, buscar_barberias_por_texto, calcular_distancia,
+    buscar_barberias_google_places, buscar_barberias_por_texto, buscar_barberias_por_cobertura,
+    calcular_distancias, clave_celda_places, pagina_places_disponible, buscar_pagina_places, radio_maximo_cobertura,
     crear_usuario, autenticar_usuario, verificar_token_jwt, obtener_usuario_por_id,
-    actualizar_usuario, cambiar_password
+    actualizar_usuario, cambiar_password, cache_respuestas
 )
 from functools import wraps
 
@@ -43,10 +62,97 @@ def token_required(f):
 
 # ==================== RUTAS DE BARBERÍAS (EXISTENTES) ====================
 
+LIMITE_CERCANAS = 20
+LIMITE_CERCANAS_MAXIMO = 100
+LIMITE_BUSQUEDA_LOCAL = 50
+LIMITE_SUGERENCIAS = 8
+LIMITE_SUGERENCIAS_MAXIMO = 20
+LIMITE_CALIFICACIONES = 20
+LIMITE_CALIFICACIONES_MAXIMO = 100
+
+def _codificar_cursor(valor: float, clave: str) -> str:
+    """Cursor opaco con la posición (valor de orden, clave) del último resultado entregado"""
+    contenido = json.dumps([valor, clave], separators=(',', ':'))
+    return base64.urlsafe_b64encode(contenido.encode('utf-8')).decode('ascii').rstrip('=')
+
+def _decodificar_cursor(cursor: str | None) -> tuple[float, str] | None:
+    """Inverso de _codificar_cursor; lanza ValueError si el cursor no es válido"""
+    if not cursor:
+        return None
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valor, clave = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        return float(valor), str(clave)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError('Cursor inválido') from e
+
+def _pagina_calificaciones(consulta: Any, limite_por_defecto: int = LIMITE_CALIFICACIONES) -> tuple[list[Calificacion], str | None]:
+    """
+    Una página de reseñas, de la más reciente a la más antigua, paginada por
+    clave con ?antes=<fecha,id>&limite=N (usa los índices (…, fecha, id)).
+    Devuelve las reseñas y el valor de `antes` para la página siguiente, o None
+    si no hay más. Lanza ValueError si el cursor o el límite no son válidos.
+    """
+    limite = min(max(int(request.args.get('limite', limite_por_defecto)), 1), LIMITE_CALIFICACIONES_MAXIMO)
+    antes = request.args.get('antes')
+    if antes:
+        fecha, _, calificacion_id = antes.rpartition(',')
+        consulta = consulta.filter(
+            tuple_(Calificacion.fecha, Calificacion.id) < (datetime.fromisoformat(fecha), int(calificacion_id))
+        )
+    calificaciones = consulta.order_by(Calificacion.fecha.desc(), Calificacion.id.desc()).limit(limite + 1).all()
+    if len(calificaciones) <= limite:
+        return calificaciones, None
+    ultima = calificaciones[limite - 1]
+    return calificaciones[:limite], f'{ultima.fecha.isoformat()},{ultima.id}'
+
+def _barberia_local_a_dict(barberia: Barberia, distancia: float) -> dict[str, Any]:
+    """
+    Serializa una barbería de la base de datos para las búsquedas por ubicación.
+    Las filas replicadas de Google Places se entregan igual que los resultados de Google.
+    """
+    if barberia.google_place_id:
+        return {
+            'id': f"gm_{barberia.google_place_id}",
+            'nombre': barberia.nombre,
+            'direccion': barberia.direccion,
+            'telefono': barberia.telefono or 'No disponible',
+            'horario': barberia.horario or 'No disponible',
+            'latitud': barberia.latitud,
+            'longitud': barberia.longitud,
+            'lat': barberia.latitud,
+            'lng': barberia.longitud,
+            'calificacion_promedio': barberia.calificacion_google or 0.0,
+            'total_calificaciones': barberia.total_calificaciones_google or 0,
+            'distancia': distancia,
+            'fuente': 'google',
+            'google_place_id': barberia.google_place_id
+        }
+    return {
+        'id': barberia.id,
+        'nombre': barberia.nombre,
+        'direccion': barberia.direccion,
+        'telefono': barberia.telefono,
+        'horario': barberia.horario,
+        'latitud': barberia.latitud,
+        'longitud': barberia.longitud,
+        'lat': barberia.latitud,
+        'lng': barberia.longitud,
+        'calificacion_promedio': round(barberia.calificacion_promedio, 1),
+        'total_calificaciones': barberia.total_calificaciones,
+        'distancia': distancia,
+        'fuente': 'local'
+    }
+
 def obtener_barberias() -> list[dict[str, Any]]:
     try:
-        barberias = Barberia.query.all()
-        return [
+        respuesta = cache_respuestas.obtener('barberias')
+        if respuesta is not None:
+            return respuesta
+        
+        # Solo las barberías registradas en la app, no la réplica de Google Places
+        barberias = Barberia.query.filter(Barberia.google_place_id.is_(None)).all()
+        respuesta = [
             {
                 'id': b.id,
                 'nombre': b.nombre,
@@ -59,6 +165,8 @@ def obtener_barberias() -> list[dict[str, Any]]:
                 'total_calificaciones': b.total_calificaciones
             } for b in barberias
         ]
+        cache_respuestas.guardar('barberias', respuesta)
+        return respuesta
     except Exception as e:
         print(f"Error en obtener_barberias: {e}")
         return []
@@ -72,17 +180,29 @@ def crear_barberia() -> tuple[dict[str, Any], int]:
         nombre=data.get('nombre', ''),
         direccion=data.get('direccion', ''),
         telefono=data.get('telefono', ''),
-        horario=data.get('horario', '')
+        horario=data.get('horario', ''),
+        latitud=data.get('latitud'),
+        longitud=data.get('longitud')
     )
     db.session.add(nueva_barberia)
     db.session.commit()
+    cache_respuestas.eliminar('barberias')
     return {'mensaje': 'Barbería creada exitosamente', 'id': nueva_barberia.id}, 201
 
 def obtener_barberia(barberia_id: int) -> dict[str, Any]:
-    barberia = Barberia.query.get_or_404(barberia_id)
-    calificaciones = Calificacion.query.filter_by(barberia_id=barberia_id).order_by(Calificacion.fecha.desc()).all()
+    """
+    Detalle de una barbería con una página de sus reseñas (?antes=<fecha,id>&limite=N);
+    el valor de `antes` para la página siguiente viaja en la cabecera X-Siguiente-Cursor.
+    """
+    barberia = Barberia.query.options(joinedload(Barberia.estadistica)).get_or_404(barberia_id)
+    try:
+        calificaciones, siguiente = _pagina_calificaciones(
+            Calificacion.query.options(joinedload(Calificacion.usuario)).filter_by(barberia_id=barberia_id)
+        )
+    except ValueError:
+        return {'error': 'Parámetros de paginación inválidos'}, 400
     
-    return {
+    detalle = {
         'id': barberia.id,
         'nombre': barberia.nombre,
         'direccion': barberia.direccion,
@@ -90,6 +210,7 @@ def obtener_barberia(barberia_id: int) -> dict[str, Any]:
         'horario': barberia.horario,
         'calificacion_promedio': round(barberia.calificacion_promedio, 1),
         'total_calificaciones': barberia.total_calificaciones,
+        'estadisticas': resumen_estadisticas(barberia),
         'calificaciones': [
             {
                 'id': c.id,
@@ -100,6 +221,14 @@ def obtener_barberia(barberia_id: int) -> dict[str, Any]:
             } for c in calificaciones
         ]
     }
+    if siguiente:
+        return detalle, 200, {'X-Siguiente-Cursor': siguiente}
+    return detalle
+
+def obtener_estadisticas_barberia(barberia_id: int) -> dict[str, Any]:
+    """Distribución de 1 a 5 estrellas de una barbería, leída de la tabla de estadísticas"""
+    barberia = Barberia.query.get_or_404(barberia_id)
+    return resumen_estadisticas(barberia)
 
 def calificar_barberia(barberia_id: int) -> tuple[dict[str, Any], int]:
     barberia = Barberia.query.get_or_404(barberia_id)
@@ -108,6 +237,10 @@ def calificar_barberia(barberia_id: int) -> tuple[dict[str, Any], int]:
     if not data:
         return {'error': 'Datos JSON requeridos'}, 400
     
+    valor = data.get('calificacion')
+    if isinstance(valor, bool) or not isinstance(valor, int) or valor not in ESTRELLAS:
+        return {'error': 'La calificación debe ser un entero de 1 a 5'}, 400
+    
     # Obtener usuario del token (si está autenticado)
     usuario_actual = None
     if 'Authorization' in request.headers:
@@ -120,129 +253,274 @@ def calificar_barberia(barberia_id: int) -> tuple[dict[str, Any], int]:
         except:
             pass
     
+    fecha = datetime.now(timezone.utc)
     nueva_calificacion = Calificacion(
         barberia_id=barberia_id,
         usuario_id=usuario_actual.id if usuario_actual else None,
-        calificacion=data.get('calificacion', 0),
+        calificacion=valor,
         comentario=data.get('comentario', ''),
-        nombre_usuario=data.get('nombre_usuario', '') if not usuario_actual else None
+        nombre_usuario=data.get('nombre_usuario', '') if not usuario_actual else None,
+        fecha=fecha
     )
     
     db.session.add(nueva_calificacion)
     
-    # Actualizar promedio de calificaciones
-    todas_calificaciones = Calificacion.query.filter_by(barberia_id=barberia_id).all()
-    total = len(todas_calificaciones) + 1
-    suma = sum(c.calificacion for c in todas_calificaciones) + data.get('calificacion', 0)
-    barberia.calificacion_promedio = suma / total
-    barberia.total_calificaciones = total
+    # Actualizar el promedio con un solo UPDATE atómico en la misma transacción:
+    # la base suma sobre los valores vigentes, así que dos calificaciones
+    # simultáneas desde distintos workers no se pisan
+    total_anterior = db.func.coalesce(Barberia.total_calificaciones, 0)
+    suma_anterior = db.func.coalesce(Barberia.suma_calificaciones, 0)
+    db.session.execute(
+        update(Barberia)
+        .where(Barberia.id == barberia.id)
+        .values(
+            total_calificaciones=total_anterior + 1,
+            suma_calificaciones=suma_anterior + valor,
+            calificacion_promedio=db.cast(suma_anterior + valor, db.Float) / (total_anterior + 1)
+        )
+        .execution_options(synchronize_session=False)
+    )
+    # Y el histograma de estrellas, también por incremento
+    registrar_calificacion(barberia.id, valor, fecha)
     
     db.session.commit()
+    cache_respuestas.eliminar('barberias')
     return {'mensaje': 'Calificación agregada exitosamente'}, 201
 
-def buscar_barberias() -> list[dict[str, Any]]:
+FORMATOS_FLUJO = {'ndjson': 'application/x-ndjson', 'sse': 'text/event-stream'}
+
+def _formato_flujo() -> str | None:
+    """'ndjson' o 'sse' si se pidió la respuesta en flujo (?stream= o cabecera Accept)"""
+    formato = request.args.get('stream', '').lower()
+    if formato in FORMATOS_FLUJO:
+        return formato
+    for nombre, mimetype in FORMATOS_FLUJO.items():
+        if request.accept_mimetypes.best == mimetype:
+            return nombre
+    return None
+
+def _evento_flujo(formato: str, evento: str, datos: Any) -> str:
+    """Un evento del flujo: una línea JSON {evento, datos} o un bloque de Server-Sent Events"""
+    if formato == 'sse':
+        return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+    return json.dumps({'evento': evento, 'datos': datos}, ensure_ascii=False) + '\n'
+
+def _barberias_google_de_texto(futuro: Any, place_ids_locales: set[str],
+                               lat: float, lng: float, ubicacion_usuario: bool) -> list[dict[str, Any]]:
+    """
+    Espera (con el plazo de las llamadas externas) la búsqueda de texto en Google,
+    quita las que ya salieron de la base local y las ordena por cercanía.
+    """
+    try:
+        resultados = futuro.result(timeout=plazo_por_defecto())
+    except FuturoVencido:
+        print("Plazo agotado en la búsqueda de texto de Google; se responde sin esos resultados")
+        return []
+    except Exception as e:
+        print(f"Error en la búsqueda de texto de Google: {e}")
+        return []
+    
+    vistos = set(place_ids_locales)
+    barberias_google = []
+    for barberia in resultados:
+        place_id = barberia.get('google_place_id')
+        if place_id in vistos:
+            continue
+        vistos.add(place_id)
+        barberias_google.append(barberia)
+    
+    # Calcular todas las distancias en lote y ordenar por cercanía si tenemos ubicación del usuario
+    if ubicacion_usuario and barberias_google:
+        distancias = calcular_distancias(
+            lat, lng,
+            [b['latitud'] for b in barberias_google],
+            [b['longitud'] for b in barberias_google]
+        )
+        orden = np.argsort(distancias, kind='stable')
+        distancias = np.nan_to_num(distancias, nan=0.0)
+    else:
+        distancias = np.zeros(len(barberias_google))
+        orden = range(len(barberias_google))
+    
+    # Agregar campos necesarios para el frontend
+    ordenadas = []
+    for i in orden:
+        barberia = barberias_google[i]
+        barberia['lat'] = barberia['latitud']
+        barberia['lng'] = barberia['longitud']
+        barberia['distancia'] = float(distancias[i])
+        ordenadas.append(barberia)
+    return ordenadas
+
+def _ordenar_por_puntaje(barberias: list[dict[str, Any]], query: str, lat: float, lng: float,
+                        ubicacion_usuario: bool, rangos: list[float | None] | None = None) -> list[dict[str, Any]]:
+    """
+    Ordena las barberías por el puntaje combinado de ranking (texto, calificación
+    y cercanía); `rangos` es el bm25() de las primeras, alineado con ellas.
+    """
+    if not barberias:
+        return barberias
+    distancias = None
+    if ubicacion_usuario:
+        distancias = calcular_distancias(
+            lat, lng,
+            [b.get('latitud') for b in barberias],
+            [b.get('longitud') for b in barberias]
+        )
+    puntajes = puntuar_barberias(barberias, distancias, query.strip() or None, rangos)
+    return [barberias[i] for i in np.argsort(-puntajes, kind='stable')]
+
+def buscar_barberias() -> Any:
+    """
+    Búsqueda por texto en la base local y en Google Places Text Search, que corren
+    a la vez; los resultados se ordenan con el ranking común (ranking.py). Con
+    ?stream=ndjson o ?stream=sse (o Accept: application/x-ndjson /
+    text/event-stream) la respuesta es un flujo: primero el evento 'locales',
+    después 'google' (sin las ya enviadas) y al final 'fin'.
+    """
     try:
         query: str = request.args.get('q', '').lower()
         # Obtener coordenadas del usuario si están disponibles
         lat_user = request.args.get('lat')
         lng_user = request.args.get('lng')
+        formato = _formato_flujo()
         
-        todas_barberias = []
+        # Usar coordenadas del usuario si están disponibles, sino usar CDMX como fallback
+        ubicacion_usuario = False
+        lat, lng = 19.432608, -99.133209
+        if lat_user and lng_user:
+            try:
+                lat = float(lat_user)
+                lng = float(lng_user)
+                ubicacion_usuario = True
+            except ValueError:
+                lat, lng = 19.432608, -99.133209
         
-        # Buscar en base de datos local
-        barberias_db = Barberia.query.filter(
-            db.or_(
-                db.func.lower(Barberia.nombre).ilike(f'%{query}%'),
-                db.func.lower(Barberia.direccion).ilike(f'%{query}%')
-            )
-        ).all()
+        # Google Places Text Search arranca antes que la consulta local para que corran a la vez
+        futuro_google = None
+        if query.strip():
+            futuro_google = obtener_executor().submit(buscar_barberias_por_texto, query, lat, lng)
+        
+        # Buscar en base de datos local (índice de texto, ordenado por relevancia;
+        # si hay pocos resultados se completa tolerando errores de escritura).
+        # Los rangos BM25 corresponden a las primeras, las que encontró el índice.
+        rangos: list[float | None] | None = None
+        if query.strip():
+            encontradas, rangos = buscar_por_texto(query, LIMITE_BUSQUEDA_LOCAL)
+            barberias_db = completar_con_difusa(query, encontradas, LIMITE_BUSQUEDA_LOCAL)
+        else:
+            # Sin texto solo las barberías propias: la réplica de Google puede ser de una ciudad entera
+            barberias_db = Barberia.query.filter(Barberia.google_place_id.is_(None)).all()
         
-        # Agregar barberías de la base de datos
+        # Agregar barberías de la base de datos (las replicadas de Google con su formato)
+        locales = []
         for barberia in barberias_db:
-            barberia_dict = {
-                'id': barberia.id,
-                'nombre': barberia.nombre,
-                'direccion': barberia.direccion,
-                'telefono': barberia.telefono,
-                'horario': barberia.horario,
-                'latitud': barberia.latitud,
-                'longitud': barberia.longitud,
-                'lat': barberia.latitud,
-                'lng': barberia.longitud,
-                'calificacion_promedio': round(barberia.calificacion_promedio, 1),
-                'total_calificaciones': barberia.total_calificaciones,
-                'fuente': 'local'
-            }
-            todas_barberias.append(barberia_dict)
+            barberia_dict = _barberia_local_a_dict(barberia, 0.0)
+            del barberia_dict['distancia']
+            locales.append(barberia_dict)
+        place_ids_locales = {b.google_place_id for b in barberias_db if b.google_place_id}
         
-        # Buscar en Google Places API usando Text Search
-        if query.strip():
-            # Usar coordenadas del usuario si están disponibles, sino usar CDMX como fallback
-            if lat_user and lng_user:
-                try:
-                    lat = float(lat_user)
-                    lng = float(lng_user)
-                except ValueError:
-                    lat = 19.432608
-                    lng = -99.133209
-            else:
-                lat = 19.432608
-                lng = -99.133209
-            
-            # Usar la nueva función de búsqueda por texto con la ubicación del usuario
-            barberias_google = buscar_barberias_por_texto(query, lat, lng)
-            
-            # Agregar campos necesarios para el frontend
-            for barberia in barberias_google:
-                barberia['lat'] = barberia['latitud']
-                barberia['lng'] = barberia['longitud']
-                # Calcular distancia si tenemos ubicación del usuario
-                if lat_user and lng_user:
-                    try:
-                        distancia = calcular_distancia(float(lat_user), float(lng_user), barberia['latitud'], barberia['longitud'])
-                        barberia['distancia'] = distancia
-                    except:
-                        barberia['distancia'] = 0
-                else:
-                    barberia['distancia'] = 0
-                todas_barberias.append(barberia)
+        def barberias_google() -> list[dict[str, Any]]:
+            if futuro_google is None:
+                return []
+            encontradas = _barberias_google_de_texto(futuro_google, place_ids_locales, lat, lng, ubicacion_usuario)
+            # Las consultas con resultados alimentan las sugerencias del autocompletado
+            if locales or encontradas:
+                consultas_frecuentes.registrar(query)
+            return encontradas
         
-        return todas_barberias
+        if formato is None:
+            return _ordenar_por_puntaje(locales + barberias_google(), query, lat, lng, ubicacion_usuario, rangos)
+        
+        def flujo() -> Any:
+            # Los locales ya están listos: se envían sin esperar a Google
+            locales_ordenados = _ordenar_por_puntaje(locales, query, lat, lng, ubicacion_usuario, rangos)
+            yield _evento_flujo(formato, 'locales', locales_ordenados)
+            google = _ordenar_por_puntaje(barberias_google(), query, lat, lng, ubicacion_usuario)
+            yield _evento_flujo(formato, 'google', google)
+            yield _evento_flujo(formato, 'fin', {'total': len(locales) + len(google)})
+        
+        return Response(flujo(), mimetype=FORMATOS_FLUJO[formato], headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',  # que nginx no acumule el flujo
+        })
         
     except Exception as e:
         print(f"Error en buscar_barberias: {e}")
         return []
 
+def autocompletar_barberias() -> list[dict[str, Any]]:
+    """
+    Sugerencias para el buscador mientras se escribe (?q=...&lat=..&lng=..&limit=N).
+    Se sirven desde el trie en memoria: no consultan la base de datos ni Google.
+    """
+    try:
+        query = request.args.get('q', '')
+        limite = min(max(int(request.args.get('limit', LIMITE_SUGERENCIAS)), 1), LIMITE_SUGERENCIAS_MAXIMO)
+        lat = request.args.get('lat', type=float)
+        lng = request.args.get('lng', type=float)
+        if lat is None or lng is None:
+            lat = lng = None
+        return sugerir(query, limite, lat, lng)
+    except ValueError:
+        return {'error': 'Parámetros inválidos'}, 400
+    except Exception as e:
+        print(f"Error en autocompletar_barberias: {e}")
+        return []
+
 def buscar_barberias_cercanas() -> list[dict[str, Any]]:
+    """
+    Barberías locales y de Google ordenadas por distancia, o con el ranking común
+    (cercanía, calificación y popularidad) con ?orden=relevancia. Se
+    pagina con ?limit=N&after=<cursor>; el cursor de la página siguiente viaja en
+    la cabecera X-Siguiente-Cursor. Con todas=true se devuelven todas desde el cursor.
+    """
     try:
         lat = float(request.args.get('lat', 0))
         lng = float(request.args.get('lng', 0))
         radio = int(request.args.get('radio', 5000))
         mostrar_todas = request.args.get('todas', 'false').lower() == 'true'
+        limite = min(max(int(request.args.get('limit', LIMITE_CERCANAS)), 1), LIMITE_CERCANAS_MAXIMO)
+        orden = request.args.get('orden', 'distancia').lower()
+        if orden not in ('relevancia', 'distancia'):
+            return {'error': 'Orden inválido (relevancia o distancia)'}, 400
+        if radio > radio_maximo_cobertura():
+            return {'error': f'Radio demasiado grande (máximo {radio_maximo_cobertura()} m)'}, 400
+        try:
+            cursor = _decodificar_cursor(request.args.get('after'))
+        except ValueError:
+            return {'error': 'Cursor inválido'}, 400
         
-        # Para radios grandes, hacer múltiples búsquedas
+        # Para radios grandes, cubrir el área con varias búsquedas cercanas en paralelo
+        clave_celda = clave_celda_places(lat, lng, radio)
         if radio > 25000:
+            barberias_google = buscar_barberias_por_cobertura(lat, lng, radio)
+        elif clave_celda in celdas_reflejadas([clave_celda]):
+            # La celda ya está completa en la réplica local: no hace falta llamar a Google
             barberias_google = []
-            # Hacer búsquedas con diferentes términos para obtener más resultados
-            search_terms = ['barbería', 'peluquería', 'salón de belleza', 'corte de cabello']
-            
-            for term in search_terms:
-                try:
-                    barberias_term = buscar_barberias_por_texto(term, lat, lng)
-                    barberias_google.extend(barberias_term)
-                except Exception as e:
-                    print(f"Error buscando con término '{term}': {e}")
-                    continue
         else:
             # Buscar en Google Places API para radios normales
             barberias_google = buscar_barberias_google_places(lat, lng, radio)
         
-        # Buscar en base de datos local
-        barberias_db = Barberia.query.all()
+        # Candidatos locales: el índice espacial (R*Tree o memoria) prefiltra por rectángulo
+        radio_km = radio / 1000
+        candidatos_indice = buscar_candidatos(lat, lng, radio)
+        ids_locales = np.array([c[0] for c in candidatos_indice], dtype=np.int64)
+        distancias_locales = calcular_distancias(
+            lat, lng,
+            [c[1] for c in candidatos_indice],
+            [c[2] for c in candidatos_indice]
+        )
+        dentro_del_radio = distancias_locales <= radio_km
+        ids_locales = ids_locales[dentro_del_radio]
+        distancias_locales = distancias_locales[dentro_del_radio]
         
-        # Eliminar duplicados de Google Places
+        # Eliminar duplicados de Google Places y los que ya salen como candidatos locales
+        # (la réplica se escribe en segundo plano: solo cuentan los ya leídos del índice)
         barberias_google_unicas = []
-        ids_google_vistos = set()
+        replicados = ids_replicados([b['google_place_id'] for b in barberias_google if b.get('google_place_id')])
+        ids_candidatos = set(ids_locales.tolist())
+        ids_google_vistos = {pid for pid, barberia_id in replicados.items() if barberia_id in ids_candidatos}
         
         for barberia in barberias_google:
             if barberia.get('google_place_id') and barberia['google_place_id'] not in ids_google_vistos:
@@ -254,48 +532,128 @@ def buscar_barberias_cercanas() -> list[dict[str, Any]]:
                     ids_google_vistos.add(barberia.get('id'))
                     barberias_google_unicas.append(barberia)
         
-        # Combinar resultados
-        todas_barberias = []
+        distancias_google = calcular_distancias(
+            lat, lng,
+            [b['latitud'] for b in barberias_google_unicas],
+            [b['longitud'] for b in barberias_google_unicas]
+        )
         
-        # Agregar barberías de la base de datos
-        for barberia in barberias_db:
-            distancia = calcular_distancia(lat, lng, barberia.latitud, barberia.longitud)
-            barberia_dict = {
-                'id': barberia.id,
-                'nombre': barberia.nombre,
-                'direccion': barberia.direccion,
-                'telefono': barberia.telefono,
-                'horario': barberia.horario,
-                'latitud': barberia.latitud,
-                'longitud': barberia.longitud,
-                'lat': barberia.latitud,
-                'lng': barberia.longitud,
-                'calificacion_promedio': round(barberia.calificacion_promedio, 1),
-                'total_calificaciones': barberia.total_calificaciones,
-                'distancia': distancia,
-                'fuente': 'local'
-            }
-            todas_barberias.append(barberia_dict)
+        # Los índices < total_locales son barberías locales, el resto son
+        # posiciones en barberias_google_unicas. Sin coordenadas van al final.
+        total_locales = len(ids_locales)
+        distancias = np.nan_to_num(
+            np.concatenate([distancias_locales, distancias_google]), nan=np.inf
+        )
+        claves_google = [f"g:{b.get('google_place_id') or b.get('id')}" for b in barberias_google_unicas]
         
-        # Agregar barberías de Google Places
-        for barberia in barberias_google_unicas:
-            distancia = calcular_distancia(lat, lng, barberia['latitud'], barberia['longitud'])
-            barberia['distancia'] = distancia
-            todas_barberias.append(barberia)
+        def clave(i: int) -> str:
+            return f'l:{ids_locales[i]}' if i < total_locales else claves_google[i - total_locales]
         
-        # Ordenar por distancia
-        todas_barberias.sort(key=lambda x: x.get('distancia', float('inf')))
+        # Valor por el que se ordena (de menor a mayor) y que guarda el cursor:
+        # la distancia o el puntaje del ranking con signo negativo
+        if orden == 'distancia':
+            valores = distancias
+        else:
+            promedios_locales, totales_locales = calificaciones_locales(ids_locales)
+            valores = -puntuar_lote(
+                distancias,
+                np.concatenate([promedios_locales, [b.get('calificacion_promedio') or 0.0 for b in barberias_google_unicas]]),
+                np.concatenate([totales_locales, [b.get('total_calificaciones') or 0 for b in barberias_google_unicas]])
+            )
+        
+        # Descartar lo que ya se entregó en páginas anteriores
+        indices = np.arange(len(valores))
+        if cursor is not None:
+            indices = indices[valores >= cursor[0]]
+        candidatos = ((float(valores[i]), clave(i), int(i)) for i in indices)
+        if cursor is not None:
+            candidatos = (c for c in candidatos if (c[0], c[1]) > cursor)
         
-        # Si no se pide mostrar todas, limitar a las 20 más cercanas
-        if not mostrar_todas:
-            return todas_barberias[:20]
+        # Selección top-k con un heap en lugar de ordenar todos los candidatos
+        if mostrar_todas:
+            seleccion = sorted(candidatos)
+            hay_mas = False
         else:
-            return todas_barberias
+            seleccion = heapq.nsmallest(limite + 1, candidatos)
+            hay_mas = len(seleccion) > limite
+            seleccion = seleccion[:limite]
+        
+        # Cargar de la base de datos solo las barberías locales que se devuelven
+        ids_devueltos = [int(ids_locales[i]) for _, _, i in seleccion if i < total_locales]
+        barberias_db = {b.id: b for b in Barberia.query.filter(Barberia.id.in_(ids_devueltos)).all()} if ids_devueltos else {}
+        
+        todas_barberias = []
+        for _, _, i in seleccion:
+            distancia = float(distancias[i])
+            if not math.isfinite(distancia):
+                distancia = 0.0
+            if i < total_locales:
+                barberia_id = int(ids_locales[i])
+                if barberia_id in barberias_db:
+                    todas_barberias.append(_barberia_local_a_dict(barberias_db[barberia_id], distancia))
+            else:
+                barberia = barberias_google_unicas[i - total_locales]
+                barberia['distancia'] = distancia
+                todas_barberias.append(barberia)
+        
+        cabeceras = {}
+        if hay_mas:
+            ultimo_valor, ultima_clave, _ = seleccion[-1]
+            cabeceras['X-Siguiente-Cursor'] = _codificar_cursor(ultimo_valor, ultima_clave)
+        if radio <= 25000:
+            # Más resultados de Google disponibles en /api/barberias/cercanas/google
+            if pagina_places_disponible(clave_celda, 2):
+                cabeceras['X-Google-Siguiente'] = _codificar_cursor(2, clave_celda)
+        if cabeceras:
+            return todas_barberias, 200, cabeceras
+        
+        return todas_barberias
         
     except Exception as e:
         print(f"Error en buscar_barberias_cercanas: {e}")
         return []
 
+def buscar_barberias_cercanas_google() -> list[dict[str, Any]]:
+    """
+    Páginas siguientes de Google Places para una búsqueda cercana. Recibe el cursor
+    de la cabecera X-Google-Siguiente en ?pagina= (y opcionalmente lat/lng para
+    calcular distancias) y devuelve los resultados de esa página; el cursor de la
+    página siguiente, si existe, viaja otra vez en X-Google-Siguiente.
+    """
+    try:
+        pagina, clave_celda = _decodificar_cursor(request.args.get('pagina'))
+        pagina = int(pagina)
+    except (TypeError, ValueError):
+        return {'error': 'Cursor de página inválido'}, 400
+    
+    try:
+        barberias = buscar_pagina_places(clave_celda, pagina)
+    except ValueError:
+        return {'error': 'Cursor de página inválido'}, 400
+    if barberias is None:
+        return {'error': 'Página no disponible'}, 404
+    
+    lat_user = request.args.get('lat')
+    lng_user = request.args.get('lng')
+    try:
+        distancias = calcular_distancias(
+            float(lat_user), float(lng_user),
+            [b['latitud'] for b in barberias],
+            [b['longitud'] for b in barberias]
+        )
+    except (TypeError, ValueError):
+        distancias = np.zeros(len(barberias))
+    distancias = np.nan_to_num(distancias, nan=0.0)
+    for barberia, distancia in zip(barberias, distancias):
+        barberia['lat'] = barberia['latitud']
+        barberia['lng'] = barberia['longitud']
+        barberia['distancia'] = float(distancia)
+    barberias.sort(key=lambda b: b['distancia'])
+    
+    if pagina_places_disponible(clave_celda, pagina + 1):
+        return barberias, 200, {'X-Google-Siguiente': _codificar_cursor(pagina + 1, clave_celda)}
+    return barberias
+
 # ==================== RUTAS DE AUTENTICACIÓN Y USUARIOS ====================
 
 def registrar_usuario() -> tuple[dict[str, Any], int]:
@@ -379,11 +737,17 @@ def cambiar_password_usuario(current_user: Usuario) -> tuple[dict[str, Any], int
 
 @token_required
 def obtener_calificaciones_usuario(current_user: Usuario) -> list[dict[str, Any]]:
-    """Obtiene las calificaciones del usuario autenticado"""
+    """
+    Obtiene las calificaciones del usuario autenticado, paginadas igual que las
+    reseñas del detalle de una barbería (?antes=<fecha,id>&limite=N)
+    """
     try:
-        calificaciones = Calificacion.query.filter_by(usuario_id=current_user.id).order_by(Calificacion.fecha.desc()).all()
+        calificaciones, siguiente = _pagina_calificaciones(
+            Calificacion.query.options(joinedload(Calificacion.barberia).load_only(Barberia.nombre))
+            .filter_by(usuario_id=current_user.id)
+        )
         
-        return [
+        resultado = [
             {
                 'id': c.id,
                 'barberia_id': c.barberia_id,
@@ -393,6 +757,11 @@ def obtener_calificaciones_usuario(current_user: Usuario) -> list[dict[str, Any]
                 'fecha': c.fecha.strftime('%d/%m/%Y %H:%M')
             } for c in calificaciones
         ]
+        if siguiente:
+            return resultado, 200, {'X-Siguiente-Cursor': siguiente}
+        return resultado
+    except ValueError:
+        return {'error': 'Parámetros de paginación inválidos'}, 400
     except Exception as e:
         print(f"Error al obtener calificaciones del usuario: {e}")
         return []
@@ -1,11 +1,22 @@
 import os
+import threading
+import time
 import googlemaps
-from functools import lru_cache
-from typing import Any
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Any, Callable
 import math
+import numpy as np
 import jwt
 from datetime import datetime, timedelta, timezone
 from .models import Usuario, db
+from .cache import Cache, cuantizar_ubicacion
+from .cobertura import planificar_cobertura, radio_maximo_cubrible
+from .replica import celdas_reflejadas, encolar
+from .concurrencia import LlamadaUnica, ejecutar_con_plazo, max_hilos, obtener_executor, plazo_por_defecto
+from .cuota import consumir
+from .resiliencia import InterruptorCircuito, LlamadaRechazada
 
 # Clave de API de Google (se lee de variables de entorno)
 GOOGLE_API_KEY: str | None = os.environ.get('GOOGLE_MAPS_API_KEY')
@@ -15,113 +26,625 @@ JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'tu-clave-secreta-cambiar-en-p
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
 
-@lru_cache(maxsize=32)
+# Cachés de Places compartidas por usuarios de la misma celda geográfica
+cache_places_cercanas = Cache('places:cercanas', ttl=300)
+cache_places_texto = Cache('places:texto', ttl=300)
+
+# Páginas 2+ de Places Nearby y los next_page_token para pedirlas
+cache_places_paginas = Cache('places:paginas', ttl=300)
+cache_tokens_pagina = Cache('places:tokens', ttl=120)
+ESPERA_TOKEN_PAGINA = 2.0  # segundos hasta que Google activa un next_page_token
+_config_paginas: dict[str, Any] = {
+    'max_paginas': 3,
+    'precargar': False,
+}
+
+# Llamadas a Places en curso, para no repetir la misma consulta en paralelo
+llamadas_places = LlamadaUnica()
+
+# Tras fallos repetidos de Google se deja de llamar un tiempo y se sirven datos locales
+circuito_places = InterruptorCircuito('google_places', umbral_fallos=5, tiempo_abierto=30)
+
+
+class TokenPaginaVencido(LlamadaRechazada):
+    """El next_page_token de la página ya no está en caché; Google no llegó a consultarse"""
+
+
+# Búsqueda por palabras clave de Places Nearby
+PALABRAS_CLAVE_PLACES = 'barbería OR peluquería OR "salón de belleza"'
+
+# Prioridad ante el gobernador de cuota y espera máxima (segundos) por tipo de llamada.
+# Las de las rutas no esperan: sin cuota se responde solo con datos locales.
+PRIORIDADES_GOOGLE: dict[str, tuple[str, float]] = {
+    'cercanas': ('alta', 0.0),
+    'texto': ('alta', 0.0),
+    'pagina': ('media', 0.0),
+    'detalles': ('baja', 5.0),  # trabajos en segundo plano
+    'siembra': ('baja', 5.0),   # comando sembrar-ciudad
+}
+
+# Tiempo extra (segundos) que una entrada vencida puede servirse mientras se refresca
+_ventana_obsoleta: dict[str, float] = {'segundos': 3600}
+
+# Respuestas serializadas de listados; se invalidan en cada escritura
+cache_respuestas = Cache('respuestas', ttl=60)
+
+# Cliente de Google Maps compartido por el proceso (se crea bajo demanda)
+_cliente_google: googlemaps.Client | None = None
+_lock_cliente_google = threading.Lock()
+_config_cliente_google: dict[str, Any] = {
+    'connect_timeout': 2.0,
+    'read_timeout': 5.0,
+    'reintentos': 2,
+    'retry_timeout': 6,
+    'pool_maxsize': 10,
+    'base_url': None,  # None = servidores de Google; p. ej. el simulador de scripts/places_simulado.py
+}
+
+# Búsquedas de radio grande por subcírculos
+_config_cobertura: dict[str, Any] = {
+    'radio_subcirculo': 10000,
+    'max_subcirculos': 19,
+    'objetivo': 60,
+}
+
+def init_app(app: Any) -> None:
+    """Aplica la configuración de la aplicación a los servicios externos"""
+    global _cliente_google
+    _config_cobertura.update({
+        'radio_subcirculo': app.config.get('COBERTURA_RADIO_SUBCIRCULO', _config_cobertura['radio_subcirculo']),
+        'max_subcirculos': app.config.get('COBERTURA_MAX_SUBCIRCULOS', _config_cobertura['max_subcirculos']),
+        'objetivo': app.config.get('COBERTURA_OBJETIVO', _config_cobertura['objetivo']),
+    })
+    ttl_places = app.config.get('PLACES_CACHE_TTL', 300)
+    cache_places_cercanas.ttl = ttl_places
+    cache_places_texto.ttl = ttl_places
+    cache_places_paginas.ttl = ttl_places
+    _config_paginas['max_paginas'] = app.config.get('GOOGLE_PAGINAS_MAX', _config_paginas['max_paginas'])
+    _config_paginas['precargar'] = app.config.get('GOOGLE_PAGINAS_PRECARGAR', _config_paginas['precargar'])
+    cache_respuestas.ttl = app.config.get('RESPUESTAS_CACHE_TTL', 60)
+    _ventana_obsoleta['segundos'] = app.config.get('PLACES_CACHE_VENTANA_OBSOLETA', _ventana_obsoleta['segundos'])
+    circuito_places.configurar(
+        umbral_fallos=app.config.get('GOOGLE_CIRCUITO_UMBRAL_FALLOS'),
+        tiempo_abierto=app.config.get('GOOGLE_CIRCUITO_TIEMPO_ABIERTO')
+    )
+    
+    with _lock_cliente_google:
+        _config_cliente_google.update({
+            'connect_timeout': app.config.get('GOOGLE_CONNECT_TIMEOUT', _config_cliente_google['connect_timeout']),
+            'read_timeout': app.config.get('GOOGLE_READ_TIMEOUT', _config_cliente_google['read_timeout']),
+            'reintentos': app.config.get('GOOGLE_REINTENTOS', _config_cliente_google['reintentos']),
+            'retry_timeout': app.config.get('GOOGLE_RETRY_TIMEOUT', _config_cliente_google['retry_timeout']),
+            'pool_maxsize': app.config.get('GOOGLE_POOL_MAXSIZE', _config_cliente_google['pool_maxsize']),
+            'base_url': app.config.get('GOOGLE_PLACES_BASE_URL', _config_cliente_google['base_url']),
+        })
+        # El cliente se recrea con la nueva configuración en el siguiente uso
+        _cliente_google = None
+
+def obtener_cliente_google() -> googlemaps.Client:
+    """
+    Devuelve el cliente de Google Maps del proceso. Reutiliza una sesión HTTP con
+    pool de conexiones keep-alive, timeouts de conexión y lectura explícitos y
+    reintentos acotados con jitter para errores de conexión.
+    Los reintentos propios de googlemaps (5xx, OVER_QUERY_LIMIT) quedan acotados
+    por retry_timeout.
+    """
+    global _cliente_google
+    if _cliente_google is not None:
+        return _cliente_google
+    
+    with _lock_cliente_google:
+        if _cliente_google is None:
+            config = _config_cliente_google
+            reintentos = Retry(
+                total=config['reintentos'],
+                connect=config['reintentos'],
+                read=config['reintentos'],
+                status=0,
+                backoff_factor=0.2,
+                backoff_jitter=0.3,
+                allowed_methods=frozenset(['GET']),
+            )
+            adaptador = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=config['pool_maxsize'],
+                max_retries=reintentos,
+            )
+            sesion = requests.Session()
+            sesion.mount('https://', adaptador)
+            sesion.mount('http://', adaptador)
+            
+            opciones: dict[str, Any] = {}
+            if config['base_url']:
+                opciones['base_url'] = config['base_url'].rstrip('/')
+            _cliente_google = googlemaps.Client(
+                key=GOOGLE_API_KEY,
+                connect_timeout=config['connect_timeout'],
+                read_timeout=config['read_timeout'],
+                retry_timeout=config['retry_timeout'],
+                requests_session=sesion,
+                **opciones
+            )
+        return _cliente_google
+
+def _reservar_llamada(endpoint: str) -> None:
+    """Pasa por el gobernador de cuota antes de cada llamada a Google (lanza CuotaAgotada)"""
+    prioridad, espera_maxima = PRIORIDADES_GOOGLE[endpoint]
+    consumir(endpoint, prioridad, espera_maxima)
+
+def _obtener_de_places(cache: Cache, clave: str, consultar: Callable[[], list[dict[str, Any]]]) -> list[dict[str, Any]] | None:
+    """
+    Resultados de Places con caché, coalescencia y circuito:
+    - entrada fresca: se devuelve tal cual;
+    - entrada obsoleta (dentro de la ventana): se devuelve y se refresca en segundo plano;
+    - sin entrada: se consulta a Google salvo que el circuito esté abierto o no
+      quede cuota.
+    Devuelve None si no hay datos y la consulta falló o se omitió; los errores
+    nunca se guardan en caché.
+    """
+    entrada = cache.obtener(clave)
+    if entrada is not None:
+        if time.time() - entrada['guardado'] >= cache.ttl and circuito_places.permite_llamada():
+            obtener_executor().submit(_refrescar_places, cache, clave, consultar)
+        return entrada['resultados']
+    
+    if not circuito_places.permite_llamada():
+        return None
+    try:
+        # Peticiones simultáneas para la misma clave comparten una sola llamada
+        return llamadas_places.ejecutar(
+            f'{cache.prefijo}:{clave}',
+            lambda: _consultar_y_guardar(cache, clave, consultar)
+        )
+    except LlamadaRechazada:
+        return None
+    except Exception as e:
+        print(f"Error al buscar en Google Places ({cache.prefijo}): {str(e)}")
+        return None
+
+def _consultar_y_guardar(cache: Cache, clave: str, consultar: Callable[[], list[dict[str, Any]]]) -> list[dict[str, Any]]:
+    """
+    Consulta a Google y guarda el resultado con su marca de tiempo. Cada función
+    `consultar` pasa por el circuito solo la petición a Google, para que los
+    errores locales (caché, cola de la réplica) no cuenten como fallos de Google.
+    """
+    # Otro hilo o proceso pudo refrescar la entrada mientras esperábamos el turno
+    entrada = cache.obtener(clave)
+    if entrada is not None and time.time() - entrada['guardado'] < cache.ttl:
+        return entrada['resultados']
+    
+    resultados = consultar()
+    # Se conserva más allá del TTL para poder servirla obsoleta si Google falla
+    cache.guardar(clave, {'guardado': time.time(), 'resultados': resultados}, cache.ttl + _ventana_obsoleta['segundos'])
+    return resultados
+
+def _refrescar_places(cache: Cache, clave: str, consultar: Callable[[], list[dict[str, Any]]]) -> None:
+    """Refresco en segundo plano de una entrada obsoleta"""
+    try:
+        llamadas_places.ejecutar(
+            f'{cache.prefijo}:{clave}',
+            lambda: _consultar_y_guardar(cache, clave, consultar)
+        )
+    except LlamadaRechazada:
+        pass
+    except Exception as e:
+        print(f"Error al refrescar Google Places ({cache.prefijo}): {str(e)}")
+
 def buscar_barberias_google_places(lat: float, lng: float, radio: int = 5000) -> list[dict[str, Any]]:
     """
     Busca barberías, peluquerías y salones de belleza cercanos usando la API de Google Places.
-    Utiliza caché para evitar llamadas repetidas a la API con las mismas coordenadas.
+    La ubicación se ajusta a una celda geográfica y el radio a una cubeta, de modo que
+    usuarios cercanos comparten la misma entrada de caché (con expiración).
+    Si Google falla o el circuito está abierto se devuelve una lista vacía y quien
+    llama sigue solo con los resultados locales.
     """
     if not GOOGLE_API_KEY:
         print("API Key de Google no configurada. Saltando búsqueda en Google Places.")
         return []
 
-    try:
-        gmaps = googlemaps.Client(key=GOOGLE_API_KEY)
+    lat_celda, lng_celda, radio_cubeta = cuantizar_ubicacion(lat, lng, radio)
+    return _buscar_places_cercanas(lat_celda, lng_celda, radio_cubeta)
+
+def _buscar_places_cercanas(lat: float, lng: float, radio: int) -> list[dict[str, Any]]:
+    """
+    Places Nearby con caché para exactamente ese centro y radio. La clave
+    'lat:lng:radio' es la misma que registran la réplica y las páginas siguientes.
+    """
+    barberias = _obtener_de_places(
+        cache_places_cercanas,
+        f'{lat}:{lng}:{radio}',
+        lambda: _consultar_places_cercanas(lat, lng, radio)
+    )
+    if barberias is None:
+        return []
+
+    # Copias para que quien llama pueda agregar campos sin alterar la caché
+    return [dict(b) for b in barberias]
+
+def _consultar_places_cercanas(lat: float, lng: float, radio: int) -> list[dict[str, Any]]:
+    """Llamada directa a Places Nearby; los errores se propagan a quien llama"""
+    gmaps = obtener_cliente_google()
+    _reservar_llamada('cercanas')
+    
+    # Se realiza una única búsqueda por palabras clave para mayor precisión
+    places_result = circuito_places.llamar(lambda: gmaps.places_nearby(  # type: ignore[attr-defined, unknown-member]
+        location=(lat, lng),
+        radius=radio,
+        keyword=PALABRAS_CLAVE_PLACES,
+        language='es'
+    ))
+    
+    # La página 2 se sirve después, cuando el cliente la pide con el cursor
+    clave_celda = f'{lat}:{lng}:{radio}'
+    token = places_result.get('next_page_token')
+    _guardar_token_pagina(clave_celda, 2, token)
+    barberias = _places_cercanos_a_barberias(places_result)
+    encolar(barberias, clave_celda, 1, completa=not token or _config_paginas['max_paginas'] <= 1)
+    return barberias
+
+def _places_cercanos_a_barberias(places_result: dict[str, Any]) -> list[dict[str, Any]]:
+    """Convierte una respuesta de Places Nearby al formato de barbería del frontend"""
+    barberias_encontradas: list[dict[str, Any]] = []
+    for place in places_result.get('results', []):
+        # Evitar duplicados por ID de lugar
+        if any(b['google_place_id'] == place.get('place_id') for b in barberias_encontradas):
+            continue
+
+        location = place.get('geometry', {}).get('location', {})
+        calificacion = float(place.get('rating', 0))
+        total_calificaciones = int(place.get('user_ratings_total', 0))
+
+        barberia = {
+            'id': f"gm_{place.get('place_id')}",
+            'nombre': place.get('name', 'Establecimiento'),
+            'direccion': place.get('vicinity', 'Dirección no disponible'),
+            'latitud': location.get('lat'),
+            'longitud': location.get('lng'),
+            'calificacion_promedio': calificacion,
+            'total_calificaciones': total_calificaciones,
+            'fuente': 'google',
+            'google_place_id': place.get('place_id'),
+            'telefono': 'No disponible', # Places Nearby no da teléfono, se necesitaría Place Details
+            'horario': 'No disponible', # Igual que el teléfono
+        }
+        barberias_encontradas.append(barberia)
         
-        # Se realiza una única búsqueda por palabras clave para mayor precisión
+    return barberias_encontradas
+
+# ==================== PÁGINAS SIGUIENTES DE PLACES NEARBY ====================
+# Places Nearby devuelve hasta 20 resultados por página y un next_page_token que
+# solo es válido unos segundos después. La primera página se entrega enseguida;
+# las siguientes se piden aparte con un cursor (celda, número de página).
+
+def _guardar_token_pagina(clave_celda: str, pagina: int, token: str | None) -> None:
+    if not token or pagina > _config_paginas['max_paginas']:
+        return
+    cache_tokens_pagina.guardar(f'{clave_celda}:{pagina}', {'token': token, 'emitido': time.time()})
+    if _config_paginas['precargar']:
+        # Pedir la página en segundo plano cuando el token ya sea válido
+        temporizador = threading.Timer(
+            ESPERA_TOKEN_PAGINA,
+            lambda: obtener_executor().submit(buscar_pagina_places, clave_celda, pagina)
+        )
+        temporizador.daemon = True
+        temporizador.start()
+
+def _validar_clave_celda(clave_celda: str) -> tuple[float, float, int]:
+    """Interpreta 'lat:lng:radio'; lanza ValueError si no es una clave de celda"""
+    lat, lng, radio = clave_celda.split(':')
+    return float(lat), float(lng), int(radio)
+
+def clave_celda_places(lat: float, lng: float, radio: int) -> str:
+    """Clave de la celda de caché que usa buscar_barberias_google_places"""
+    lat_celda, lng_celda, radio_cubeta = cuantizar_ubicacion(lat, lng, radio)
+    return f'{lat_celda}:{lng_celda}:{radio_cubeta}'
+
+def pagina_places_disponible(clave_celda: str, pagina: int) -> bool:
+    """Indica si se puede servir esa página (ya en caché o con token pendiente)"""
+    if pagina < 2 or pagina > _config_paginas['max_paginas']:
+        return False
+    clave = f'{clave_celda}:{pagina}'
+    return cache_places_paginas.obtener(clave) is not None or cache_tokens_pagina.obtener(clave) is not None
+
+def buscar_pagina_places(clave_celda: str, pagina: int) -> list[dict[str, Any]] | None:
+    """
+    Página `pagina` (>= 2) de la búsqueda cercana de una celda. Devuelve None si la
+    página no existe, su token expiró o Google falló.
+    """
+    _validar_clave_celda(clave_celda)
+    if not GOOGLE_API_KEY or not pagina_places_disponible(clave_celda, pagina):
+        return None
+    clave = f'{clave_celda}:{pagina}'
+    
+    def consultar() -> list[dict[str, Any]]:
+        datos_token = cache_tokens_pagina.obtener(clave)
+        if datos_token is None:
+            raise TokenPaginaVencido(f'Token de la página {pagina} vencido')
+        espera = ESPERA_TOKEN_PAGINA - (time.time() - datos_token['emitido'])
+        if espera > 0:
+            time.sleep(espera)
+        
+        places_result, _ = circuito_places.llamar(lambda: _pedir_pagina_nearby(datos_token['token'], 'pagina'))
+        token = places_result.get('next_page_token')
+        _guardar_token_pagina(clave_celda, pagina + 1, token)
+        resultados = _places_cercanos_a_barberias(places_result)
+        encolar(resultados, clave_celda, pagina, completa=not token or pagina >= _config_paginas['max_paginas'])
+        return resultados
+    
+    barberias = _obtener_de_places(cache_places_paginas, clave, consultar)
+    return None if barberias is None else [dict(b) for b in barberias]
+
+def _pedir_pagina_nearby(token: str, endpoint: str, max_intentos: int = 3) -> tuple[dict[str, Any], int]:
+    """
+    Pide a Places Nearby la página de un next_page_token ya emitido, reintentando
+    (hasta max_intentos llamadas) mientras Google aún no lo active.
+    Devuelve (respuesta, llamadas hechas). Si falla, la excepción lleva en
+    `llamadas` las peticiones que sí llegaron a enviarse.
+    """
+    gmaps = obtener_cliente_google()
+    intento = 1
+    while True:
+        try:
+            _reservar_llamada(endpoint)
+        except Exception as e:
+            e.llamadas = intento - 1
+            raise
+        try:
+            return gmaps.places_nearby(page_token=token), intento  # type: ignore[attr-defined, unknown-member]
+        except Exception as e:
+            # INVALID_REQUEST: el token aún no está activo en los servidores de Google
+            token_inactivo = isinstance(e, googlemaps.exceptions.ApiError) and e.status == 'INVALID_REQUEST'
+            if not token_inactivo or intento >= max_intentos:
+                e.llamadas = intento
+                raise
+        intento += 1
+        time.sleep(1.0)
+
+def recorrer_celda_places(lat: float, lng: float, radio: int,
+                          max_llamadas: int | None = None) -> tuple[list[dict[str, Any]], int, bool]:
+    """
+    Todas las páginas (hasta GOOGLE_PAGINAS_MAX) de Places Nearby para el centro
+    de una celda, sin caché ni cola: lo usa la siembra, que escribe la réplica
+    directamente. No hace más de max_llamadas llamadas (contando los reintentos
+    de tokens aún inactivos). Devuelve (barberías, llamadas hechas, completa);
+    completa es False si el presupuesto cortó el recorrido antes de la última página.
+    Los errores (incluida CuotaAgotada) se propagan a quien llama, con lo ya
+    pagado: la excepción lleva `barberias` (páginas obtenidas) y `llamadas`.
+    """
+    gmaps = obtener_cliente_google()
+    barberias: list[dict[str, Any]] = []
+    llamadas = 0
+    try:
+        _reservar_llamada('siembra')
+        llamadas = 1
         places_result = gmaps.places_nearby(  # type: ignore[attr-defined, unknown-member]
             location=(lat, lng),
             radius=radio,
-            keyword='barbería OR peluquería OR "salón de belleza"',
+            keyword=PALABRAS_CLAVE_PLACES,
             language='es'
         )
-        
-        barberias_encontradas: list[dict[str, Any]] = []
-        for place in places_result.get('results', []):
-            # Evitar duplicados por ID de lugar
-            if any(b['google_place_id'] == place.get('place_id') for b in barberias_encontradas):
-                continue
-
-            location = place.get('geometry', {}).get('location', {})
-            calificacion = float(place.get('rating', 0))
-            total_calificaciones = int(place.get('user_ratings_total', 0))
-
-            barberia = {
-                'id': f"gm_{place.get('place_id')}",
-                'nombre': place.get('name', 'Establecimiento'),
-                'direccion': place.get('vicinity', 'Dirección no disponible'),
-                'latitud': location.get('lat'),
-                'longitud': location.get('lng'),
-                'calificacion_promedio': calificacion,
-                'total_calificaciones': total_calificaciones,
-                'fuente': 'google',
-                'google_place_id': place.get('place_id'),
-                'telefono': 'No disponible', # Places Nearby no da teléfono, se necesitaría Place Details
-                'horario': 'No disponible', # Igual que el teléfono
-            }
-            barberias_encontradas.append(barberia)
-            
-        return barberias_encontradas
-
+        barberias = _places_cercanos_a_barberias(places_result)
+        pagina = 1
+        while places_result.get('next_page_token') and pagina < _config_paginas['max_paginas']:
+            restantes = 3 if max_llamadas is None else min(3, max_llamadas - llamadas)
+            if restantes <= 0:
+                return barberias, llamadas, False
+            time.sleep(ESPERA_TOKEN_PAGINA)
+            try:
+                places_result, hechas = _pedir_pagina_nearby(places_result['next_page_token'], 'siembra', restantes)
+            except googlemaps.exceptions.ApiError as e:
+                # El presupuesto no alcanzó para esperar a que Google activara el token
+                if e.status != 'INVALID_REQUEST' or restantes >= 3:
+                    raise
+                return barberias, llamadas + e.llamadas, False
+            llamadas += hechas
+            barberias.extend(_places_cercanos_a_barberias(places_result))
+            pagina += 1
+        return barberias, llamadas, True
     except Exception as e:
-        print(f"Error al buscar en Google Places: {str(e)}")
-        return []
+        e.llamadas = llamadas + getattr(e, 'llamadas', 0)
+        e.barberias = barberias
+        raise
 
 def buscar_barberias_por_texto(query: str, lat: float = 19.432608, lng: float = -99.133209) -> list[dict[str, Any]]:
     """
     Busca barberías usando Google Places Text Search API.
-    Más preciso para búsquedas por texto.
+    Más preciso para búsquedas por texto. Los resultados se guardan en caché por
+    texto normalizado y celda geográfica.
     """
     if not GOOGLE_API_KEY:
         print("API Key de Google no configurada. Saltando búsqueda en Google Places.")
         return []
 
+    lat_celda, lng_celda, _ = cuantizar_ubicacion(lat, lng, 25000)
+    barberias = _obtener_de_places(
+        cache_places_texto,
+        f'{query.strip().lower()}:{lat_celda}:{lng_celda}',
+        lambda: _consultar_places_texto(query, lat_celda, lng_celda)
+    )
+    if barberias is None:
+        return []
+
+    return [dict(b) for b in barberias]
+
+def _consultar_places_texto(query: str, lat: float, lng: float) -> list[dict[str, Any]]:
+    """Llamada directa a Places Text Search; los errores se propagan a quien llama"""
+    gmaps = obtener_cliente_google()
+    _reservar_llamada('texto')
+    
+    # Construir query de búsqueda más específica
+    search_query = f"{query} barbería peluquería"
+    
+    # Usar Text Search API para búsquedas más precisas
+    places_result = circuito_places.llamar(lambda: gmaps.places(  # type: ignore[attr-defined, unknown-member]
+        query=search_query,
+        location=(lat, lng),
+        radius=25000,  # Radio más pequeño para resultados más cercanos
+        language='es',
+        type='hair_care'  # Especificar tipo de negocio
+    ))
+    
+    barberias_encontradas: list[dict[str, Any]] = []
+    for place in places_result.get('results', []):
+        # Evitar duplicados por ID de lugar
+        if any(b['google_place_id'] == place.get('place_id') for b in barberias_encontradas):
+            continue
+
+        location = place.get('geometry', {}).get('location', {})
+        calificacion = float(place.get('rating', 0))
+        total_calificaciones = int(place.get('user_ratings_total', 0))
+
+        barberia = {
+            'id': f"gm_{place.get('place_id')}",
+            'nombre': place.get('name', 'Establecimiento'),
+            'direccion': place.get('formatted_address', place.get('vicinity', 'Dirección no disponible')),
+            'latitud': location.get('lat'),
+            'longitud': location.get('lng'),
+            'calificacion_promedio': calificacion,
+            'total_calificaciones': total_calificaciones,
+            'fuente': 'google',
+            'google_place_id': place.get('place_id'),
+            'telefono': 'No disponible',
+            'horario': 'No disponible',
+        }
+        barberias_encontradas.append(barberia)
+    
+    encolar(barberias_encontradas)
+    return barberias_encontradas
+
+def _detalle_place(place_id: str, campos: list[str]) -> dict[str, Any] | None:
+    """
+    Place Details con los campos pedidos. Devuelve None si Google ya no conoce el
+    lugar (NOT_FOUND no es una falla del servicio y no debe abrir el circuito);
+    los demás errores (incluida CuotaAgotada) se propagan a quien llama.
+    """
+    gmaps = obtener_cliente_google()
+    _reservar_llamada('detalles')
     try:
-        gmaps = googlemaps.Client(key=GOOGLE_API_KEY)
-        
-        # Construir query de búsqueda más específica
-        search_query = f"{query} barbería peluquería"
-        
-        # Usar Text Search API para búsquedas más precisas
-        places_result = gmaps.places(  # type: ignore[attr-defined, unknown-member]
-            query=search_query,
-            location=(lat, lng),
-            radius=25000,  # Radio más pequeño para resultados más cercanos
-            language='es',
-            type='hair_care'  # Especificar tipo de negocio
-        )
-        
-        barberias_encontradas: list[dict[str, Any]] = []
-        for place in places_result.get('results', []):
-            # Evitar duplicados por ID de lugar
-            if any(b['google_place_id'] == place.get('place_id') for b in barberias_encontradas):
-                continue
-
-            location = place.get('geometry', {}).get('location', {})
-            calificacion = float(place.get('rating', 0))
-            total_calificaciones = int(place.get('user_ratings_total', 0))
-
-            barberia = {
-                'id': f"gm_{place.get('place_id')}",
-                'nombre': place.get('name', 'Establecimiento'),
-                'direccion': place.get('formatted_address', place.get('vicinity', 'Dirección no disponible')),
-                'latitud': location.get('lat'),
-                'longitud': location.get('lng'),
-                'calificacion_promedio': calificacion,
-                'total_calificaciones': total_calificaciones,
-                'fuente': 'google',
-                'google_place_id': place.get('place_id'),
-                'telefono': 'No disponible',
-                'horario': 'No disponible',
-            }
-            barberias_encontradas.append(barberia)
-            
-        return barberias_encontradas
+        return gmaps.place(place_id, fields=campos, language='es').get('result', {})  # type: ignore[attr-defined, unknown-member]
+    except googlemaps.exceptions.ApiError as e:
+        if e.status == 'NOT_FOUND':
+            return None
+        raise
 
-    except Exception as e:
-        print(f"Error al buscar en Google Places Text Search: {str(e)}")
+def consultar_detalle_place(place_id: str) -> dict[str, Any] | None:
+    """Place Details de un lugar en formato de barbería; None si el lugar ya no existe"""
+    detalle = _detalle_place(
+        place_id,
+        ['place_id', 'name', 'formatted_address', 'geometry/location', 'rating', 'user_ratings_total']
+    )
+    if detalle is None:
+        return None
+    location = detalle.get('geometry', {}).get('location', {})
+    return {
+        'id': f"gm_{place_id}",
+        'nombre': detalle.get('name', 'Establecimiento'),
+        'direccion': detalle.get('formatted_address', 'Dirección no disponible'),
+        'latitud': location.get('lat'),
+        'longitud': location.get('lng'),
+        'calificacion_promedio': float(detalle.get('rating', 0)),
+        'total_calificaciones': int(detalle.get('user_ratings_total', 0)),
+        'fuente': 'google',
+        'google_place_id': place_id,
+        'telefono': 'No disponible',
+        'horario': 'No disponible',
+    }
+
+def consultar_contacto_place(place_id: str) -> dict[str, str | None] | None:
+    """
+    Teléfono y horario de un lugar con Place Details (solo campos de contacto).
+    Devuelve None si el lugar ya no existe.
+    """
+    detalle = _detalle_place(place_id, ['formatted_phone_number', 'international_phone_number', 'opening_hours'])
+    if detalle is None:
+        return None
+    telefono = detalle.get('formatted_phone_number') or detalle.get('international_phone_number')
+    dias = detalle.get('opening_hours', {}).get('weekday_text') or []
+    return {
+        'telefono': telefono[:20] if telefono else None,
+        'horario': _resumir_horario(dias)[:100] or None,
+    }
+
+def _resumir_horario(dias: list[str]) -> str:
+    """
+    Resume el weekday_text de Google ("lunes: 9:00–20:00", ...) agrupando días
+    seguidos con el mismo horario: "lunes–viernes: 9:00–20:00; sábado: 10:00–14:00".
+    """
+    grupos: list[list[str]] = []  # [primer día, último día, horas]
+    for texto in dias:
+        dia, _, horas = texto.partition(': ')
+        horas = horas.strip()
+        if grupos and grupos[-1][2] == horas:
+            grupos[-1][1] = dia
+        else:
+            grupos.append([dia, dia, horas])
+    return '; '.join(
+        f"{inicio}: {horas}" if inicio == fin else f"{inicio}–{fin}: {horas}"
+        for inicio, fin, horas in grupos
+    )
+
+def radio_maximo_cobertura() -> int:
+    """
+    Mayor radio (metros) que buscar_barberias_por_cobertura cubre sin huecos con
+    COBERTURA_MAX_SUBCIRCULOS. Descuenta 2 km por el centrado en la celda y el
+    redondeo al kilómetro que hace el plan.
+    """
+    return radio_maximo_cubrible(_config_cobertura['max_subcirculos']) - 2000
+
+def buscar_barberias_por_cobertura(lat: float, lng: float, radio: int, plazo: float | None = None) -> list[dict[str, Any]]:
+    """
+    Búsqueda para radios grandes: cubre el círculo con subcírculos del tamaño
+    adecuado para Places Nearby y los consulta en paralelo por tandas, del centro
+    hacia afuera. Se deduplica por google_place_id y se deja de consultar cuando
+    ya hay suficientes resultados o se agota el plazo. Los subcírculos cuya celda
+    ya está en la réplica local no se consultan (sus barberías salen de la base).
+    
+    Cada subcírculo se consulta con su centro y radio exactos (sin pasar por
+    cuantizar_ubicacion, que movería el centro y agrandaría el radio). Para que
+    usuarios de la misma celda compartan el plan y la caché, la malla se centra
+    en el centro de la celda del usuario con el radio agrandado lo necesario
+    para seguir cubriendo el círculo pedido, redondeado al kilómetro.
+    """
+    if not GOOGLE_API_KEY:
+        print("API Key de Google no configurada. Saltando búsqueda en Google Places.")
         return []
 
+    lat_celda, lng_celda, _ = cuantizar_ubicacion(lat, lng, radio)
+    desplazamiento = calcular_distancia(lat, lng, lat_celda, lng_celda) * 1000
+    radio_plan = int(math.ceil((radio + desplazamiento) / 1000) * 1000)
+    centros, radio_sub = planificar_cobertura(
+        lat_celda, lng_celda, radio_plan,
+        _config_cobertura['radio_subcirculo'],
+        _config_cobertura['max_subcirculos']
+    )
+    reflejadas = celdas_reflejadas([f'{c[0]}:{c[1]}:{radio_sub}' for c in centros])
+    centros = [c for c in centros if f'{c[0]}:{c[1]}:{radio_sub}' not in reflejadas]
+    plazo = plazo_por_defecto() if plazo is None else plazo
+    limite_tiempo = time.monotonic() + plazo
+    tanda = max(max_hilos(), 1)
+    
+    barberias: dict[str, dict[str, Any]] = {}
+    for inicio in range(0, len(centros), tanda):
+        restante = limite_tiempo - time.monotonic()
+        if restante <= 0 or len(barberias) >= _config_cobertura['objetivo']:
+            break
+        resultados = ejecutar_con_plazo(
+            [lambda c=centro: _buscar_places_cercanas(c[0], c[1], radio_sub) for centro in centros[inicio:inicio + tanda]],
+            restante
+        )
+        for resultado in resultados:
+            for barberia in resultado or []:
+                barberias.setdefault(barberia['google_place_id'] or barberia['id'], barberia)
+    
+    # Los subcírculos del borde alcanzan fuera del círculo pedido
+    encontradas = list(barberias.values())
+    distancias = calcular_distancias(
+        lat, lng,
+        [b['latitud'] for b in encontradas],
+        [b['longitud'] for b in encontradas]
+    )
+    return [b for b, d in zip(encontradas, distancias) if d <= radio / 1000]
+
 def calcular_distancia(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
     """Calcula la distancia entre dos puntos usando la fórmula de Haversine"""
     R = 6371  # Radio de la Tierra en km
@@ -139,6 +662,27 @@ def calcular_distancia(lat1: float, lng1: float, lat2: float, lng2: float) -> fl
     
     return R * c
 
+def calcular_distancias(lat: float, lng: float, lats: Any, lngs: Any) -> np.ndarray:
+    """
+    Versión vectorizada de calcular_distancia: distancias en km desde un origen
+    a arreglos de latitudes/longitudes en una sola pasada de NumPy.
+    Las coordenadas faltantes (None) producen NaN.
+    """
+    R = 6371  # Radio de la Tierra en km
+    
+    lat1_rad = math.radians(lat)
+    lng1_rad = math.radians(lng)
+    lat2_rad = np.radians(np.asarray(lats, dtype=float))
+    lng2_rad = np.radians(np.asarray(lngs, dtype=float))
+    
+    dlat = lat2_rad - lat1_rad
+    dlng = lng2_rad - lng1_rad
+    
+    a = np.sin(dlat/2)**2 + math.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlng/2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+    
+    return R * c
+
 # ==================== SERVICIOS DE USUARIOS ====================
 
 def crear_usuario(username: str, email: str, password: str, nombre_completo: str, telefono: str = None) -> dict[str, Any]:
@@ -0,0 +1,209 @@
+"""
+Siembra de una ciudad: cubre un rectángulo lat/lng con búsquedas de Places
+Nearby en malla hexagonal (separadas ~radio·√3, no una por celda) y guarda todos
+los resultados en la réplica local. Los puntos de siembra se ajustan al centro
+de una celda de la caché de Places (cache.cuantizar_ubicacion) para que su clave
+sea una clave de celda. Cada celda del rectángulo queda completa, y sus búsquedas
+cercanas se responden sin llamar a Google, cuando ya se sembraron todos los
+puntos cuyo círculo puede alcanzar su círculo de búsqueda.
+
+Es reanudable: los puntos completos y recientes se saltan al volver a correrla.
+"""
+
+import math
+import time
+from typing import Any, Callable
+
+from . import services
+from .cache import CELDA_GRADOS, cuantizar_ubicacion
+from .concurrencia import LimitadorTasa
+from .indice_espacial import KM_POR_GRADO_LATITUD
+from .models import db
+from .replica import celdas_reflejadas, guardar_en_replica, registrar_celda
+from .resiliencia import LlamadaRechazada
+
+
+def celdas_del_rectangulo(lat_min: float, lat_max: float, lng_min: float, lng_max: float,
+                          radio: int) -> list[tuple[float, float, str]]:
+    """
+    Centros (lat, lng, clave de celda) de las celdas que cubren el rectángulo,
+    del centro hacia afuera para que una siembra parcial cubra lo más céntrico.
+    """
+    filas = range(math.floor(lat_min / CELDA_GRADOS), math.floor(lat_max / CELDA_GRADOS) + 1)
+    columnas = range(math.floor(lng_min / CELDA_GRADOS), math.floor(lng_max / CELDA_GRADOS) + 1)
+    centro_lat = (lat_min + lat_max) / 2
+    centro_lng = (lng_min + lng_max) / 2
+
+    celdas = []
+    for fila in filas:
+        for columna in columnas:
+            lat, lng, radio_cubeta = cuantizar_ubicacion((fila + 0.5) * CELDA_GRADOS, (columna + 0.5) * CELDA_GRADOS, radio)
+            celdas.append((lat, lng, f'{lat}:{lng}:{radio_cubeta}'))
+    celdas.sort(key=lambda c: (c[0] - centro_lat) ** 2 + (c[1] - centro_lng) ** 2)
+    return celdas
+
+
+def puntos_de_siembra(lat_min: float, lat_max: float, lng_min: float, lng_max: float,
+                      radio: int) -> list[tuple[float, float, str]]:
+    """
+    Centros (lat, lng, clave de celda) de las búsquedas de radio `radio` que cubren
+    el rectángulo agrandado en `radio` (así también quedan cubiertos los círculos
+    de búsqueda de las celdas del borde), del centro hacia afuera.
+
+    La malla hexagonal usa un radio efectivo descontando lo que se mueve un punto
+    al ajustarlo al centro de su celda; si con eso la separación no llega al
+    tamaño de una celda, se siembra cada celda.
+    """
+    metros_por_grado = KM_POR_GRADO_LATITUD * 1000
+    margen_lat = radio / metros_por_grado
+    lat_sur, lat_norte = lat_min - margen_lat, lat_max + margen_lat
+    # La longitud más ancha (en metros) está en la latitud más cercana al ecuador
+    cos_max = math.cos(math.radians(0.0 if lat_sur <= 0 <= lat_norte else min(abs(lat_sur), abs(lat_norte))))
+    cos_min = max(math.cos(math.radians(max(abs(lat_sur), abs(lat_norte)))), 1e-6)
+    margen_lng = radio / (metros_por_grado * cos_min)
+    lng_oeste, lng_este = lng_min - margen_lng, lng_max + margen_lng
+
+    ajuste_maximo = math.hypot(CELDA_GRADOS / 2 * metros_por_grado, CELDA_GRADOS / 2 * metros_por_grado * cos_max)
+    radio_efectivo = radio - ajuste_maximo
+    if radio_efectivo * math.sqrt(3) < CELDA_GRADOS * metros_por_grado:
+        return celdas_del_rectangulo(lat_sur, lat_norte, lng_oeste, lng_este, radio)
+
+    separacion_lat = 1.5 * radio_efectivo / metros_por_grado
+    separacion_lng = math.sqrt(3) * radio_efectivo / (metros_por_grado * cos_max)
+    puntos: dict[str, tuple[float, float, str]] = {}
+    for fila in range(int(math.ceil((lat_norte - lat_sur) / separacion_lat)) + 1):
+        lat = lat_sur + fila * separacion_lat
+        desfase = separacion_lng / 2 if fila % 2 else 0.0
+        for columna in range(-1, int(math.ceil((lng_este - lng_oeste) / separacion_lng)) + 1):
+            lat_celda, lng_celda, radio_cubeta = cuantizar_ubicacion(lat, lng_oeste + desfase + columna * separacion_lng, radio)
+            clave = f'{lat_celda}:{lng_celda}:{radio_cubeta}'
+            puntos[clave] = (lat_celda, lng_celda, clave)
+
+    centro_lat = (lat_min + lat_max) / 2
+    centro_lng = (lng_min + lng_max) / 2
+    return sorted(puntos.values(), key=lambda c: (c[0] - centro_lat) ** 2 + (c[1] - centro_lng) ** 2)
+
+
+def _puntos_por_celda(celdas: list[tuple[float, float, str]], puntos: list[tuple[float, float, str]],
+                      radio: int) -> dict[str, set[str]]:
+    """
+    Para cada celda, las claves de los puntos de siembra a menos de 2·radio de su
+    centro: los únicos cuyo círculo puede tocar el círculo de búsqueda de la celda.
+    Una celda que es a la vez punto de siembra solo se requiere a sí misma (esa
+    búsqueda es exactamente la de la celda).
+    """
+    lats = [p[0] for p in puntos]
+    lngs = [p[1] for p in puntos]
+    claves_puntos = {p[2] for p in puntos}
+    requeridos = {}
+    for lat, lng, clave in celdas:
+        if clave in claves_puntos:
+            requeridos[clave] = {clave}
+            continue
+        distancias = services.calcular_distancias(lat, lng, lats, lngs)
+        requeridos[clave] = {puntos[i][2] for i in (distancias * 1000 < 2 * radio).nonzero()[0]}
+    return requeridos
+
+
+def sembrar_ciudad(lat_min: float, lat_max: float, lng_min: float, lng_max: float,
+                   radio: int = 5000, por_segundo: float = 1.0, max_llamadas: int | None = None,
+                   costo_por_llamada: float = 0.032,
+                   informar: Callable[[str], None] = print) -> dict[str, Any]:
+    """
+    Siembra los puntos del rectángulo que aún no estén en la réplica y marca como
+    completas las celdas que quedan cubiertas. Se detiene si se alcanza
+    max_llamadas (comprobado antes de cada página), se agota la cuota o se abre
+    el circuito. Requiere contexto de aplicación. Devuelve un resumen con
+    llamadas y costo.
+    """
+    _, _, radio_cubeta = cuantizar_ubicacion(lat_min, lng_min, radio)
+    celdas = celdas_del_rectangulo(lat_min, lat_max, lng_min, lng_max, radio_cubeta)
+    puntos = puntos_de_siembra(lat_min, lat_max, lng_min, lng_max, radio_cubeta)
+    hechos = set()
+    for inicio in range(0, len(puntos), 500):
+        hechos |= celdas_reflejadas([clave for _, _, clave in puntos[inicio:inicio + 500]])
+    pendientes = [p for p in puntos if p[2] not in hechos]
+
+    # Celdas que faltan marcar y los puntos de siembra que aún necesitan
+    celdas_marcadas = set()
+    for inicio in range(0, len(celdas), 500):
+        celdas_marcadas |= celdas_reflejadas([clave for _, _, clave in celdas[inicio:inicio + 500]])
+    faltantes = {
+        clave: requeridos - hechos
+        for clave, requeridos in _puntos_por_celda(
+            [c for c in celdas if c[2] not in celdas_marcadas], puntos, radio_cubeta
+        ).items()
+    }
+
+    informar(f"🌱 {len(puntos)} puntos de siembra con radio {radio_cubeta} m para {len(celdas)} celdas "
+             f"de {CELDA_GRADOS}°: {len(hechos)} ya sembrados, {len(pendientes)} pendientes "
+             f"(costo mínimo estimado: ${len(pendientes) * costo_por_llamada:.2f})")
+
+    limitador = LimitadorTasa(por_segundo=por_segundo)
+    resumen = {'celdas': len(celdas), 'puntos': len(puntos), 'saltadas': len(hechos), 'sembradas': 0,
+               'celdas_completas': len(celdas_marcadas), 'lugares': 0,
+               'llamadas': 0, 'costo': 0.0, 'detenida': None}
+    inicio_siembra = time.monotonic()
+
+    def marcar_celdas_cubiertas() -> None:
+        for clave in [c for c, requeridos in faltantes.items() if not requeridos]:
+            registrar_celda(clave, 1, 0, completa=True)
+            del faltantes[clave]
+            resumen['celdas_completas'] += 1
+
+    def contabilizar(barberias: list[dict[str, Any]], llamadas: int) -> None:
+        # Lo ya pagado se guarda y se cuenta aunque el punto no se haya completado
+        if barberias:
+            guardar_en_replica(barberias)
+        resumen['lugares'] += len(barberias)
+        resumen['llamadas'] += llamadas
+        resumen['costo'] = resumen['llamadas'] * costo_por_llamada
+
+    marcar_celdas_cubiertas()
+    for numero, (lat, lng, clave) in enumerate(pendientes, start=1):
+        presupuesto = None if max_llamadas is None else max_llamadas - resumen['llamadas']
+        if presupuesto is not None and presupuesto <= 0:
+            resumen['detenida'] = f'límite de {max_llamadas} llamadas'
+            break
+        limitador.esperar()
+        try:
+            barberias, llamadas, completa = services.circuito_places.llamar(
+                lambda: services.recorrer_celda_places(lat, lng, radio_cubeta, presupuesto)
+            )
+        except LlamadaRechazada as e:
+            contabilizar(getattr(e, 'barberias', []), getattr(e, 'llamadas', 0))
+            db.session.remove()
+            resumen['detenida'] = str(e)
+            break
+        except Exception as e:
+            contabilizar(getattr(e, 'barberias', []), getattr(e, 'llamadas', 0))
+            db.session.remove()
+            informar(f"   ❌ {clave}: {e} ({resumen['llamadas']} llamadas, ${resumen['costo']:.2f})")
+            continue
+
+        contabilizar(barberias, llamadas)
+        if not completa:
+            # Quedaron páginas sin pedir: el punto se repite en la próxima corrida
+            db.session.remove()
+            resumen['detenida'] = f'límite de {max_llamadas} llamadas'
+            break
+
+        registrar_celda(clave, 1, len(barberias), completa=True)
+        for requeridos in faltantes.values():
+            requeridos.discard(clave)
+        marcar_celdas_cubiertas()
+        db.session.remove()
+
+        resumen['sembradas'] += 1
+        transcurrido = time.monotonic() - inicio_siembra
+        restante = transcurrido / numero * (len(pendientes) - numero)
+        informar(f"   [{numero}/{len(pendientes)}] {clave}: {len(barberias)} lugares, "
+                 f"{resumen['llamadas']} llamadas, ${resumen['costo']:.2f}, "
+                 f"{resumen['celdas_completas']}/{len(celdas)} celdas completas, ~{restante / 60:.1f} min restantes")
+
+    if resumen['detenida']:
+        informar(f"⏸ Siembra detenida ({resumen['detenida']}); vuelve a correr el comando para continuar")
+    informar(f"✓ {resumen['sembradas']} puntos sembrados, {resumen['celdas_completas']}/{len(celdas)} celdas completas, "
+             f"{resumen['lugares']} lugares, "
+             f"{resumen['llamadas']} llamadas (${resumen['costo']:.2f})")
+    return resumen
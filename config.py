@@ -23,6 +23,28 @@ class Config:
     GOOGLE_MAPS_API_KEY = os.environ.get('GOOGLE_MAPS_API_KEY')
     GOOGLE_PLACES_API_KEY = os.environ.get('GOOGLE_PLACES_API_KEY') or GOOGLE_MAPS_API_KEY
     
+    # Cliente HTTP de Google Maps (uno por proceso, con pool de conexiones)
+    GOOGLE_CONNECT_TIMEOUT = float(os.environ.get('GOOGLE_CONNECT_TIMEOUT', 2.0))  # segundos
+    GOOGLE_READ_TIMEOUT = float(os.environ.get('GOOGLE_READ_TIMEOUT', 5.0))        # segundos
+    GOOGLE_REINTENTOS = int(os.environ.get('GOOGLE_REINTENTOS', 2))                 # errores de conexión
+    GOOGLE_RETRY_TIMEOUT = int(os.environ.get('GOOGLE_RETRY_TIMEOUT', 6))           # tope de reintentos de googlemaps
+    GOOGLE_POOL_MAXSIZE = int(os.environ.get('GOOGLE_POOL_MAXSIZE', 10))            # conexiones keep-alive
+    GOOGLE_PLACES_BASE_URL = os.environ.get('GOOGLE_PLACES_BASE_URL')  # p. ej. http://127.0.0.1:8765 (scripts/places_simulado.py)
+    GOOGLE_MAX_HILOS = int(os.environ.get('GOOGLE_MAX_HILOS', 8))                   # llamadas simultáneas
+    GOOGLE_PLAZO_SEGUNDOS = float(os.environ.get('GOOGLE_PLAZO_SEGUNDOS', 3.0))     # plazo por petición
+    GOOGLE_PAGINAS_MAX = int(os.environ.get('GOOGLE_PAGINAS_MAX', 3))  # páginas de Places Nearby (1 = solo la primera)
+    GOOGLE_PAGINAS_PRECARGAR = os.environ.get('GOOGLE_PAGINAS_PRECARGAR', 'False').lower() == 'true'
+    GOOGLE_CIRCUITO_UMBRAL_FALLOS = int(os.environ.get('GOOGLE_CIRCUITO_UMBRAL_FALLOS', 5))      # fallos seguidos
+    GOOGLE_CIRCUITO_TIEMPO_ABIERTO = float(os.environ.get('GOOGLE_CIRCUITO_TIEMPO_ABIERTO', 30))  # segundos
+    
+    # Cuota de Google compartida por todos los procesos (archivo SQLite)
+    CUOTA_ACTIVA = os.environ.get('CUOTA_ACTIVA', 'True').lower() == 'true'
+    CUOTA_URL = os.environ.get('CUOTA_URL')  # ruta del archivo; por defecto instance/cuota.db
+    CUOTA_POR_SEGUNDO = float(os.environ.get('CUOTA_POR_SEGUNDO', 10.0))  # llamadas por segundo
+    CUOTA_RAFAGA = int(os.environ.get('CUOTA_RAFAGA', 20))                 # llamadas seguidas
+    CUOTA_DIARIA = int(os.environ.get('CUOTA_DIARIA', 0))                  # llamadas por día UTC (0 = sin tope)
+    GOOGLE_COSTO_POR_LLAMADA = float(os.environ.get('GOOGLE_COSTO_POR_LLAMADA', 0.032))  # USD por Nearby Search
+    
     # Configuración JWT
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY')
     if not JWT_SECRET_KEY:
@@ -45,13 +67,59 @@ class Config:
         'http://0.0.0.0:3001',
         'https://192.168.1.125:3000',  # Agregado para acceso desde móvil en HTTPS
     ]
+    # Cabeceras que el frontend puede leer (cursores de paginación de cercanas)
+    CORS_EXPOSE_HEADERS = ['X-Siguiente-Cursor', 'X-Google-Siguiente']
     
     # Configuración de búsqueda
     DEFAULT_SEARCH_RADIUS = 5000  # metros
     MAX_SEARCH_RADIUS = 50000     # metros
     
+    # Radios grandes: el área se cubre con subcírculos de Places Nearby
+    COBERTURA_RADIO_SUBCIRCULO = int(os.environ.get('COBERTURA_RADIO_SUBCIRCULO', 10000))  # metros
+    COBERTURA_MAX_SUBCIRCULOS = int(os.environ.get('COBERTURA_MAX_SUBCIRCULOS', 19))
+    COBERTURA_OBJETIVO = int(os.environ.get('COBERTURA_OBJETIVO', 60))  # resultados suficientes
+    
+    # Réplica local de Google Places en la tabla de barberías
+    REPLICA_ACTIVA = os.environ.get('REPLICA_ACTIVA', 'True').lower() == 'true'
+    REPLICA_TTL_HORAS = int(os.environ.get('REPLICA_TTL_HORAS', 72))                     # filas y celdas obsoletas
+    REPLICA_LOTE = int(os.environ.get('REPLICA_LOTE', 200))                              # filas por upsert
+    REPLICA_INTERVALO_REFRESCO = int(os.environ.get('REPLICA_INTERVALO_REFRESCO', 600))  # segundos
+    REPLICA_REFRESCO_LOTE = int(os.environ.get('REPLICA_REFRESCO_LOTE', 20))             # filas por pasada
+    
+    # Teléfono y horario con Place Details, en segundo plano y con límite de tasa
+    DETALLES_ACTIVO = os.environ.get('DETALLES_ACTIVO', 'True').lower() == 'true'
+    DETALLES_POR_SEGUNDO = float(os.environ.get('DETALLES_POR_SEGUNDO', 2.0))  # llamadas por segundo
+    DETALLES_LOTE = int(os.environ.get('DETALLES_LOTE', 20))                   # llamadas por tanda
+    DETALLES_INTERVALO = int(os.environ.get('DETALLES_INTERVALO', 60))         # segundos
+    DETALLES_TTL_DIAS = int(os.environ.get('DETALLES_TTL_DIAS', 30))           # días hasta volver a pedirlos
+    
+    # Búsqueda tolerante a errores de escritura (índice de trigramas)
+    BUSQUEDA_DIFUSA_MAX_DISTANCIA = int(os.environ.get('BUSQUEDA_DIFUSA_MAX_DISTANCIA', 2))  # errores por palabra larga
+    BUSQUEDA_DIFUSA_CANDIDATOS = int(os.environ.get('BUSQUEDA_DIFUSA_CANDIDATOS', 200))      # filas verificadas
+    BUSQUEDA_DIFUSA_MINIMO = int(os.environ.get('BUSQUEDA_DIFUSA_MINIMO', 5))  # por debajo, se completa con la difusa
+    
+    # Autocompletado en memoria (trie de nombres)
+    AUTOCOMPLETAR_CANDIDATOS = int(os.environ.get('AUTOCOMPLETAR_CANDIDATOS', 32))    # barberías por nodo
+    AUTOCOMPLETAR_RECONSTRUIR = int(os.environ.get('AUTOCOMPLETAR_RECONSTRUIR', 300))  # segundos
+    AUTOCOMPLETAR_PESO_PROXIMIDAD = float(os.environ.get('AUTOCOMPLETAR_PESO_PROXIMIDAD', 0.5))  # 0 a 1
+    
+    # Ranking común de búsqueda y cercanas (los pesos se normalizan entre los componentes presentes)
+    RANKING_PESO_DISTANCIA = float(os.environ.get('RANKING_PESO_DISTANCIA', 0.4))
+    RANKING_PESO_CALIFICACION = float(os.environ.get('RANKING_PESO_CALIFICACION', 0.3))
+    RANKING_PESO_POPULARIDAD = float(os.environ.get('RANKING_PESO_POPULARIDAD', 0.1))
+    RANKING_PESO_TEXTO = float(os.environ.get('RANKING_PESO_TEXTO', 0.2))
+    RANKING_ESCALA_KM = float(os.environ.get('RANKING_ESCALA_KM', 2.0))  # a esta distancia la cercanía vale la mitad
+    
     # Configuración de caché
     CACHE_TIMEOUT = 300  # 5 minutos
+    # Backend compartido: 'memoria' (por proceso), 'sqlite' (archivo compartido) o 'redis'
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memoria')
+    CACHE_URL = os.environ.get('CACHE_URL')  # ruta del archivo SQLite o redis://host:puerto/db
+    CACHE_MAX_ENTRADAS = int(os.environ.get('CACHE_MAX_ENTRADAS', 512))
+    PLACES_CACHE_TTL = int(os.environ.get('PLACES_CACHE_TTL', CACHE_TIMEOUT))  # segundos
+    RESPUESTAS_CACHE_TTL = int(os.environ.get('RESPUESTAS_CACHE_TTL', 60))  # segundos
+    # Una entrada de Places vencida se sigue sirviendo este tiempo mientras se refresca
+    PLACES_CACHE_VENTANA_OBSOLETA = int(os.environ.get('PLACES_CACHE_VENTANA_OBSOLETA', 3600))  # segundos
     
     # Configuración de archivos
     UPLOAD_FOLDER = Path('uploads')
@@ -67,10 +135,10 @@ class Config:
         from flask_cors import CORS
         if app.config.get('DEBUG', False):
             # En desarrollo, permitir cualquier origen
-            CORS(app, origins='*', supports_credentials=True)
+            CORS(app, origins='*', supports_credentials=True, expose_headers=Config.CORS_EXPOSE_HEADERS)
         else:
             # En producción, usar orígenes específicos
-            CORS(app, origins=Config.CORS_ORIGINS, supports_credentials=True)
+            CORS(app, origins=Config.CORS_ORIGINS, supports_credentials=True, expose_headers=Config.CORS_EXPOSE_HEADERS)
 
 class DevelopmentConfig(Config):
     """Configuración para desarrollo"""
@@ -31,6 +31,7 @@ function App() {
   const [mostrarModal, setMostrarModal] = useState(false);
   const [mostrarCalificar, setMostrarCalificar] = useState(false);
   const [busqueda, setBusqueda] = useState('');
+  const [sugerencias, setSugerencias] = useState([]);
   const [cargando, setCargando] = useState(true);
   const [isMobile, setIsMobile] = useState(false);
   
@@ -68,6 +69,8 @@ function App() {
   
   // Ref para el debounce de búsqueda
   const searchTimeoutRef = useRef(null);
+  // Número de la última petición de sugerencias, para descartar respuestas viejas
+  const sugerenciasPedidaRef = useRef(0);
 
   const sortLabels = {
     distancia: 'Cercanía',
@@ -234,17 +237,64 @@ function App() {
     }
   };
 
+  const cargarSugerencias = async (query) => {
+    const pedida = ++sugerenciasPedidaRef.current;
+    try {
+      // El autocompletado responde desde memoria; la búsqueda completa solo al enviar o elegir
+      let url = `/api/barberias/autocompletar?q=${encodeURIComponent(query)}&limit=8`;
+      if (userLocation && userLocation.lat && userLocation.lng) {
+        url += `&lat=${userLocation.lat}&lng=${userLocation.lng}`;
+      }
+      const response = await api.get(url);
+      if (pedida === sugerenciasPedidaRef.current) {
+        setSugerencias(Array.isArray(response.data) ? response.data : []);
+      }
+    } catch (error) {
+      console.error('Error al cargar sugerencias:', error);
+      setSugerencias([]);
+    }
+  };
+
+  const cerrarSugerencias = () => {
+    if (searchTimeoutRef.current) {
+      clearTimeout(searchTimeoutRef.current);
+    }
+    sugerenciasPedidaRef.current += 1;
+    setSugerencias([]);
+  };
+
+  const handleEnviarBusqueda = (e) => {
+    e.preventDefault();
+    cerrarSugerencias();
+    if (busqueda.trim()) {
+      buscarBarberias(busqueda);
+    }
+  };
+
+  const handleSeleccionarSugerencia = (sugerencia) => {
+    const texto = sugerencia.tipo === 'consulta' ? sugerencia.texto : sugerencia.nombre;
+    cerrarSugerencias();
+    setBusqueda(texto);
+    buscarBarberias(texto);
+    // Al elegir una barbería, centrar el mapa en ella
+    if (sugerencia.tipo === 'barberia' && sugerencia.latitud != null && sugerencia.longitud != null) {
+      setMapCenter({ lat: sugerencia.latitud, lng: sugerencia.longitud });
+      setMapZoom(17);
+    }
+  };
+
   const handleBusqueda = (e) => {
     const query = e.target.value;
     setBusqueda(query);
     
-    // Cancelar búsqueda anterior si existe
+    // Cancelar sugerencias anteriores si existen
     if (searchTimeoutRef.current) {
       clearTimeout(searchTimeoutRef.current);
     }
     
     // Si la búsqueda está vacía, cargar según el filtro actual
     if (!query.trim()) {
+      cerrarSugerencias();
       if (currentView === 'favoritos') {
         // Si estamos en favoritos, mantener esa vista
         return;
@@ -255,10 +305,44 @@ function App() {
       return;
     }
     
-    // Esperar 500ms antes de ejecutar la búsqueda (debounce)
+    // Esperar 150ms antes de pedir sugerencias (debounce)
     searchTimeoutRef.current = setTimeout(() => {
-      buscarBarberias(query);
-    }, 500);
+      cargarSugerencias(query);
+    }, 150);
+  };
+
+  const renderSugerencias = () => {
+    if (!busqueda.trim() || sugerencias.length === 0) {
+      return null;
+    }
+    return (
+      <ul className="search-suggestions" role="listbox">
+        {sugerencias.map((sugerencia) => (
+          <li
+            key={sugerencia.tipo === 'consulta' ? `consulta-${sugerencia.texto}` : `barberia-${sugerencia.id}`}
+            className={`search-suggestion search-suggestion-${sugerencia.tipo}`}
+            role="option"
+            aria-selected="false"
+            onMouseDown={(e) => {
+              // Elegir antes de que el input pierda el foco y cierre la lista
+              e.preventDefault();
+              handleSeleccionarSugerencia(sugerencia);
+            }}
+          >
+            {sugerencia.tipo === 'consulta' ? (
+              <span className="search-suggestion-title">🔍 {sugerencia.texto}</span>
+            ) : (
+              <>
+                <span className="search-suggestion-title">{sugerencia.nombre}</span>
+                {sugerencia.direccion && (
+                  <span className="search-suggestion-subtitle">{sugerencia.direccion}</span>
+                )}
+              </>
+            )}
+          </li>
+        ))}
+      </ul>
+    );
   };
 
   const handleVerBarberia = async (barberia) => {
@@ -819,13 +903,15 @@ function App() {
             )}
             {/* Botón de perfil móvil eliminado */}
           </div>
-          <div className="mobile-search-wrapper">
+          <form className="mobile-search-wrapper" onSubmit={handleEnviarBusqueda}>
             <input
               type="text"
               className="mobile-search-input-redesign"
               placeholder={userLocation ? "Buscar barberías cerca de ti..." : "Buscar barberías..."}
               value={busqueda}
               onChange={handleBusqueda}
+              onBlur={cerrarSugerencias}
+              enterKeyHint="search"
             />
              <div className="search-icon-wrapper">
                 {cargando ? (
@@ -841,7 +927,8 @@ function App() {
                  </svg>
                </div>
              )}
-          </div>
+          </form>
+          {renderSugerencias()}
         </div>
         
         {/* --- TARJETA DE DETALLE INFERIOR --- */}
@@ -1053,13 +1140,18 @@ function App() {
             <h1 className="sidebar-logo">Cuts</h1>
           </div>
           <div className="sidebar-search-nav">
-            <input
-              type="text"
-              className="sidebar-search-input"
-              placeholder={userLocation ? "Buscar barberías cerca de ti..." : "Buscar barberías..."}
-              value={busqueda}
-              onChange={handleBusqueda}
-            />
+            <form className="sidebar-search-form" onSubmit={handleEnviarBusqueda}>
+              <input
+                type="text"
+                className="sidebar-search-input"
+                placeholder={userLocation ? "Buscar barberías cerca de ti..." : "Buscar barberías..."}
+                value={busqueda}
+                onChange={handleBusqueda}
+                onBlur={cerrarSugerencias}
+                enterKeyHint="search"
+              />
+              {renderSugerencias()}
+            </form>
             <nav className="sidebar-nav">
               <button 
                 onClick={() => setCurrentView('cercanos')} 
@@ -7,7 +7,7 @@ Usa la nueva estructura modular del backend
 import os
 import sys
 from backend.app import create_app
-from backend.models import db
+from backend.models import actualizar_esquema
 from config import config
 
 # Obtener configuración del entorno
@@ -17,7 +17,7 @@ app = create_app(config_name)
 def init_db():
     """Inicializa la base de datos"""
     with app.app_context():
-        db.create_all()
+        actualizar_esquema()
         print("✓ Base de datos inicializada")
 
 if __name__ == '__main__':
@@ -11,7 +11,7 @@ from datetime import datetime, timezone
 sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
 
 from backend.app import create_app
-from backend.models import db, Usuario, Calificacion
+from backend.models import db, Usuario, Calificacion, actualizar_esquema
 from backend.services import crear_usuario
 
 def migrar_base_datos():
@@ -22,7 +22,7 @@ def migrar_base_datos():
         print("🔄 Iniciando migración de base de datos...")
         
         # Crear todas las tablas
-        db.create_all()
+        actualizar_esquema()
         print("✓ Tablas creadas/actualizadas")
         
         # Verificar si ya existen usuarios
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita Google Places (Nearby, Text Search y Details) para
+probar el backend sin clave real ni red: sirve lugares de fixtures grabados o
+sintéticos, con latencia y errores inyectados configurables.
+
+Uso:
+    python scripts/places_simulado.py --puerto 8765 --latencia-ms 120 --tasa-error 0.05
+
+Y el backend apuntando a él (la clave debe empezar con "AIza" para googlemaps):
+    GOOGLE_MAPS_API_KEY=AIzaSimulado GOOGLE_PLACES_BASE_URL=http://127.0.0.1:8765 python main.py
+
+Formato de un fixture: lista JSON de lugares como los devuelve Places, por
+ejemplo scripts/fixtures/places_cdmx.json. Los campos de Details
+(formatted_phone_number, opening_hours, ...) se guardan en el mismo objeto.
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+RESULTADOS_POR_PAGINA = 20
+MAX_PAGINAS = 3
+RADIO_TIERRA_M = 6371000
+
+NOMBRES = ['Barbería', 'Peluquería', 'Estética', 'Salón de belleza', 'Barber Shop']
+APELLIDOS = ['El Güero', 'Don Pepe', 'La Navaja', 'Clásica', 'Moderna', 'Del Centro', 'Los Compadres', 'Estilo']
+CALLES = ['Av. Reforma', 'Calle Madero', 'Av. Insurgentes', 'Calle Durango', 'Av. Juárez', 'Calle Orizaba']
+
+
+def distancia_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Distancia Haversine en metros"""
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2
+    return 2 * RADIO_TIERRA_M * math.asin(math.sqrt(min(a, 1.0)))
+
+
+class Simulador:
+    """Estado del servidor: lugares conocidos, tokens de página y contadores"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.lugares: dict[str, dict] = {}
+        self.fijos: list[dict] = []
+        self.tokens: dict[str, tuple[float, list[dict]]] = {}
+        self.contadores = {'nearbysearch': 0, 'textsearch': 0, 'details': 0, 'errores': 0}
+        self.lock = threading.Lock()
+        self.azar = random.Random(args.semilla)
+
+        for ruta in args.fixtures or []:
+            with open(ruta, encoding='utf-8') as archivo:
+                for lugar in json.load(archivo):
+                    self.fijos.append(lugar)
+                    self.lugares[lugar['place_id']] = lugar
+
+    # ---------- lugares sintéticos ----------
+
+    def _sinteticos(self, lat: float, lng: float, radio: float, texto: str = '') -> list[dict]:
+        """Lugares deterministas para la celda (lat, lng, radio): la misma consulta da lo mismo"""
+        semilla = hashlib.sha1(f'{lat:.3f}:{lng:.3f}:{int(radio)}:{texto}'.encode()).hexdigest()
+        azar = random.Random(semilla)
+        total = azar.randint(self.args.sinteticos_min, self.args.sinteticos_max)
+        lugares = []
+        for i in range(total):
+            # Punto uniforme en el círculo
+            r = radio * math.sqrt(azar.random())
+            angulo = azar.uniform(0, 2 * math.pi)
+            dlat = r * math.cos(angulo) / 111320
+            dlng = r * math.sin(angulo) / (111320 * max(math.cos(math.radians(lat)), 1e-6))
+            nombre = f'{azar.choice(NOMBRES)} {azar.choice(APELLIDOS)}'
+            if texto:
+                nombre = f'{nombre} {texto.title()}'
+            place_id = f'sim_{semilla[:10]}_{i}'
+            direccion = f'{azar.choice(CALLES)} {azar.randint(1, 400)}'
+            lugares.append({
+                'place_id': place_id,
+                'name': nombre,
+                'vicinity': direccion,
+                'formatted_address': f'{direccion}, Ciudad de México, México',
+                'geometry': {'location': {'lat': round(lat + dlat, 7), 'lng': round(lng + dlng, 7)}},
+                'rating': round(azar.uniform(3.0, 5.0), 1),
+                'user_ratings_total': azar.randint(0, 900),
+                'business_status': 'OPERATIONAL',
+                'types': ['hair_care', 'point_of_interest', 'establishment'],
+                'formatted_phone_number': f'55 {azar.randint(1000, 9999)} {azar.randint(1000, 9999)}',
+                'opening_hours': {'weekday_text': [
+                    'lunes: 9:00–20:00', 'martes: 9:00–20:00', 'miércoles: 9:00–20:00',
+                    'jueves: 9:00–20:00', 'viernes: 9:00–20:00', 'sábado: 10:00–18:00', 'domingo: Cerrado'
+                ]},
+            })
+        with self.lock:
+            for lugar in lugares:
+                self.lugares[lugar['place_id']] = lugar
+        return lugares
+
+    def _en_radio(self, lat: float, lng: float, radio: float) -> list[dict]:
+        encontrados = [
+            lugar for lugar in self.fijos
+            if distancia_m(lat, lng, lugar['geometry']['location']['lat'], lugar['geometry']['location']['lng']) <= radio
+        ]
+        if self.args.solo_fixtures:
+            return encontrados
+        return encontrados + self._sinteticos(lat, lng, radio)
+
+    # ---------- endpoints ----------
+
+    def nearbysearch(self, parametros: dict[str, str]) -> dict:
+        if 'pagetoken' in parametros:
+            return self._pagina(parametros['pagetoken'])
+        lat, lng = (float(v) for v in parametros['location'].split(','))
+        radio = float(parametros.get('radius', 5000))
+        lugares = self._en_radio(lat, lng, radio)
+        lugares.sort(key=lambda l: -l.get('user_ratings_total', 0))  # "prominencia"
+        return self._paginar(lugares)
+
+    def textsearch(self, parametros: dict[str, str]) -> dict:
+        if 'pagetoken' in parametros:
+            return self._pagina(parametros['pagetoken'])
+        lat, lng = (float(v) for v in parametros.get('location', '19.432608,-99.133209').split(','))
+        radio = float(parametros.get('radius', 25000))
+        # El backend agrega "barbería peluquería" a la consulta del usuario
+        palabras = [p for p in parametros.get('query', '').lower().split() if p not in ('barbería', 'peluquería') and len(p) > 2]
+        encontrados = [
+            lugar for lugar in self.fijos
+            if any(p in f"{lugar.get('name', '')} {lugar.get('formatted_address', '')}".lower() for p in palabras)
+        ]
+        if not self.args.solo_fixtures:
+            encontrados += self._sinteticos(lat, lng, radio, ' '.join(palabras))
+        return self._paginar(encontrados)
+
+    def details(self, parametros: dict[str, str]) -> dict:
+        # googlemaps envía 'placeid' (nombre antiguo del parámetro)
+        lugar = self.lugares.get(parametros.get('place_id') or parametros.get('placeid', ''))
+        if lugar is None:
+            return {'status': 'NOT_FOUND'}
+        campos = parametros.get('fields')
+        if campos:
+            raices = {c.split('/')[0] for c in campos.split(',')}
+            lugar = {k: v for k, v in lugar.items() if k in raices}
+        return {'status': 'OK', 'result': lugar}
+
+    def _paginar(self, lugares: list[dict]) -> dict:
+        if not lugares:
+            return {'status': 'ZERO_RESULTS', 'results': []}
+        lugares = lugares[:RESULTADOS_POR_PAGINA * MAX_PAGINAS]
+        respuesta = {'status': 'OK', 'results': [self._resumen(l) for l in lugares[:RESULTADOS_POR_PAGINA]]}
+        resto = lugares[RESULTADOS_POR_PAGINA:]
+        if resto:
+            token = secrets.token_urlsafe(24)
+            with self.lock:
+                self.tokens[token] = (time.monotonic() + self.args.espera_token, resto)
+            respuesta['next_page_token'] = token
+        return respuesta
+
+    def _pagina(self, token: str) -> dict:
+        with self.lock:
+            activo_desde, resto = self.tokens.get(token, (None, None))
+        # Igual que Google: el token no sirve hasta unos segundos después de emitirse
+        if resto is None or time.monotonic() < activo_desde:
+            return {'status': 'INVALID_REQUEST', 'results': []}
+        return self._paginar(resto)
+
+    @staticmethod
+    def _resumen(lugar: dict) -> dict:
+        """Nearby y Text Search no incluyen los campos de Details"""
+        return {k: v for k, v in lugar.items() if k not in ('formatted_phone_number', 'international_phone_number', 'opening_hours')}
+
+
+def crear_manejador(simulador: Simulador) -> type[BaseHTTPRequestHandler]:
+    rutas = {
+        '/maps/api/place/nearbysearch/json': 'nearbysearch',
+        '/maps/api/place/textsearch/json': 'textsearch',
+        '/maps/api/place/details/json': 'details',
+    }
+
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, como el servidor real
+
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            endpoint = rutas.get(url.path)
+            if endpoint is None:
+                self._responder(404, {'status': 'NOT_FOUND'})
+                return
+            parametros = {k: v[0] for k, v in parse_qs(url.query).items()}
+            args = simulador.args
+
+            latencia = max(0.0, args.latencia_ms + simulador.azar.uniform(-args.jitter_ms, args.jitter_ms))
+            time.sleep(latencia / 1000)
+
+            with simulador.lock:
+                simulador.contadores[endpoint] += 1
+                fallar = simulador.azar.random() < args.tasa_error
+                if fallar:
+                    simulador.contadores['errores'] += 1
+            if fallar:
+                # Mitad errores HTTP 5xx, mitad respuestas de cuota agotada
+                if simulador.azar.random() < 0.5:
+                    self._responder(503, {'status': 'UNKNOWN_ERROR'})
+                else:
+                    self._responder(200, {'status': 'OVER_QUERY_LIMIT', 'results': []})
+                return
+
+            self._responder(200, getattr(simulador, endpoint)(parametros))
+
+        def _responder(self, codigo: int, cuerpo: dict) -> None:
+            datos = json.dumps(cuerpo, ensure_ascii=False).encode('utf-8')
+            self.send_response(codigo)
+            self.send_header('Content-Type', 'application/json; charset=UTF-8')
+            self.send_header('Content-Length', str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def log_message(self, formato: str, *args) -> None:
+            if simulador.args.verbose:
+                super().log_message(formato, *args)
+
+    return Manejador
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Servidor simulado de Google Places')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=8765)
+    parser.add_argument('--fixtures', nargs='*', help='Archivos JSON con lugares grabados')
+    parser.add_argument('--solo-fixtures', action='store_true', help='No generar lugares sintéticos')
+    parser.add_argument('--sinteticos-min', type=int, default=8)
+    parser.add_argument('--sinteticos-max', type=int, default=45)
+    parser.add_argument('--latencia-ms', type=float, default=0.0, help='Latencia media por petición')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Variación uniforme de la latencia')
+    parser.add_argument('--tasa-error', type=float, default=0.0, help='Fracción de peticiones que fallan (0-1)')
+    parser.add_argument('--espera-token', type=float, default=2.0, help='Segundos hasta que un next_page_token es válido')
+    parser.add_argument('--semilla', type=int, default=None, help='Semilla para latencias y errores reproducibles')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    simulador = Simulador(args)
+    servidor = ThreadingHTTPServer((args.host, args.puerto), crear_manejador(simulador))
+    print(f"🧪 Places simulado en http://{args.host}:{args.puerto} "
+          f"({len(simulador.fijos)} lugares de fixtures, latencia {args.latencia_ms} ms, errores {args.tasa_error:.0%})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Peticiones atendidas: {simulador.contadores}")
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Servidor local que habla el protocolo de Redis (RESP) con los comandos que usa
+la caché (GET, SET con PX/EX, DEL, SCAN, SELECT, AUTH, PING) para probar
+CACHE_BACKEND=redis sin instalar Redis, con latencia y errores inyectados.
+
+Uso:
+    python scripts/redis_simulado.py --puerto 6390 --latencia-ms 2 --tasa-error 0.05
+
+Y el backend apuntando a él:
+    CACHE_BACKEND=redis CACHE_URL=redis://127.0.0.1:6390/0 python main.py
+
+Los datos viven solo en memoria del proceso; las claves expiran con PX/EX
+igual que en Redis.
+"""
+
+import argparse
+import fnmatch
+import random
+import socketserver
+import threading
+import time
+
+
+class ErrorComando(Exception):
+    """Error que se devuelve al cliente como respuesta -ERR"""
+
+
+class Simulador:
+    """Bases de datos en memoria (una por número de SELECT) y contadores"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.bases: dict[int, dict[bytes, tuple[bytes, float | None]]] = {}
+        self.contadores: dict[str, int] = {'errores': 0}
+        self.lock = threading.Lock()
+        self.azar = random.Random(args.semilla)
+
+    def _vigente(self, base: dict, clave: bytes) -> bytes | None:
+        entrada = base.get(clave)
+        if entrada is None:
+            return None
+        valor, expira = entrada
+        if expira is not None and expira <= time.monotonic():
+            del base[clave]
+            return None
+        return valor
+
+    def ejecutar(self, sesion: dict, argumentos: list[bytes]) -> object:
+        """Ejecuta un comando y devuelve la respuesta como valor de Python"""
+        if not argumentos:
+            raise ErrorComando('empty command')
+        nombre = argumentos[0].decode('utf-8', 'replace').upper()
+        parametros = argumentos[1:]
+        with self.lock:
+            self.contadores[nombre] = self.contadores.get(nombre, 0) + 1
+            if self.args.tasa_error and self.azar.random() < self.args.tasa_error:
+                self.contadores['errores'] += 1
+                raise ErrorComando('simulated failure')
+
+        if nombre == 'AUTH':
+            if self.args.password is None or parametros[-1:] == [self.args.password.encode()]:
+                sesion['autenticado'] = True
+                return 'OK'
+            raise ErrorComando('invalid password')
+        if self.args.password is not None and not sesion.get('autenticado'):
+            raise ErrorComando('NOAUTH Authentication required.')
+        if nombre == 'PING':
+            return 'PONG'
+        if nombre == 'SELECT':
+            sesion['db'] = int(parametros[0])
+            return 'OK'
+
+        with self.lock:
+            base = self.bases.setdefault(sesion.get('db', 0), {})
+            if nombre == 'GET':
+                return self._vigente(base, parametros[0])
+            if nombre == 'SET':
+                return self._set(base, parametros)
+            if nombre == 'DEL':
+                return sum(1 for clave in parametros if self._vigente(base, clave) is not None and base.pop(clave))
+            if nombre == 'SCAN':
+                return self._scan(base, parametros)
+            if nombre == 'DBSIZE':
+                return sum(1 for clave in list(base) if self._vigente(base, clave) is not None)
+            if nombre == 'FLUSHDB':
+                base.clear()
+                return 'OK'
+        raise ErrorComando(f"unknown command '{nombre}'")
+
+    def _set(self, base: dict, parametros: list[bytes]) -> object:
+        clave, valor = parametros[0], parametros[1]
+        opciones = [p.decode().upper() for p in parametros[2:]]
+        expira = None
+        if 'PX' in opciones:
+            expira = time.monotonic() + int(opciones[opciones.index('PX') + 1]) / 1000
+        elif 'EX' in opciones:
+            expira = time.monotonic() + int(opciones[opciones.index('EX') + 1])
+        existe = self._vigente(base, clave) is not None
+        if ('NX' in opciones and existe) or ('XX' in opciones and not existe):
+            return None
+        base[clave] = (valor, expira)
+        return 'OK'
+
+    def _scan(self, base: dict, parametros: list[bytes]) -> object:
+        inicio = int(parametros[0])
+        opciones = [p.decode('utf-8', 'replace') for p in parametros[1:]]
+        patron = opciones[opciones.index('MATCH') + 1] if 'MATCH' in opciones else '*'
+        cantidad = int(opciones[opciones.index('COUNT') + 1]) if 'COUNT' in opciones else 10
+        claves = sorted(base)
+        lote = claves[inicio:inicio + cantidad]
+        siguiente = inicio + cantidad if inicio + cantidad < len(claves) else 0
+        encontradas = [
+            clave for clave in lote
+            if self._vigente(base, clave) is not None and fnmatch.fnmatchcase(clave.decode('utf-8', 'replace'), patron)
+        ]
+        return [str(siguiente).encode(), encontradas]
+
+
+def codificar(valor: object) -> bytes:
+    """Serializa una respuesta en RESP"""
+    if valor is None:
+        return b'$-1\r\n'
+    if isinstance(valor, ErrorComando):
+        mensaje = str(valor)
+        return f"-{mensaje if mensaje.startswith('NOAUTH') else 'ERR ' + mensaje}\r\n".encode()
+    if isinstance(valor, str):
+        return f'+{valor}\r\n'.encode()
+    if isinstance(valor, int):
+        return f':{valor}\r\n'.encode()
+    if isinstance(valor, bytes):
+        return b'$%d\r\n%s\r\n' % (len(valor), valor)
+    return b'*%d\r\n' % len(valor) + b''.join(codificar(elemento) for elemento in valor)
+
+
+def crear_manejador(simulador: Simulador) -> type[socketserver.StreamRequestHandler]:
+    class Manejador(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            sesion: dict = {}
+            while True:
+                argumentos = self._leer_comando()
+                if argumentos is None:
+                    return
+                if simulador.args.latencia_ms:
+                    time.sleep(simulador.args.latencia_ms / 1000)
+                try:
+                    respuesta = simulador.ejecutar(sesion, argumentos)
+                except ErrorComando as e:
+                    respuesta = e
+                except (ValueError, IndexError):
+                    respuesta = ErrorComando('syntax error')
+                if simulador.args.verbose:
+                    print(f"{argumentos[:1]} -> {str(respuesta)[:80]}")
+                self.wfile.write(codificar(respuesta))
+                self.wfile.flush()
+
+        def _leer_comando(self) -> list[bytes] | None:
+            linea = self.rfile.readline()
+            if not linea:
+                return None
+            if not linea.startswith(b'*'):
+                # Comando en línea (p. ej. "PING" desde telnet)
+                return linea.strip().split()
+            argumentos = []
+            for _ in range(int(linea[1:-2])):
+                longitud = int(self.rfile.readline()[1:-2])
+                argumentos.append(self.rfile.read(longitud + 2)[:-2])
+            return argumentos
+
+    return Manejador
+
+
+class Servidor(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Servidor RESP simulado para la caché')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--puerto', type=int, default=6390)
+    parser.add_argument('--password', default=None, help='Exigir AUTH con esta contraseña')
+    parser.add_argument('--latencia-ms', type=float, default=0.0, help='Latencia por comando')
+    parser.add_argument('--tasa-error', type=float, default=0.0, help='Fracción de comandos que fallan (0-1)')
+    parser.add_argument('--semilla', type=int, default=None, help='Semilla para errores reproducibles')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    simulador = Simulador(args)
+    servidor = Servidor((args.host, args.puerto), crear_manejador(simulador))
+    print(f"🧪 RESP simulado en redis://{args.host}:{args.puerto} "
+          f"(latencia {args.latencia_ms} ms, errores {args.tasa_error:.0%})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Comandos atendidos: {simulador.contadores}")
+        servidor.server_close()
+
+
+if __name__ == '__main__':
+    main()